@@ -1,13 +1,28 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, router, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
 import logging
 
-from .models import NewUsers, Debtor, AddDebtorUser
+from .models import (
+    ACTIVE_STATUSES, NewUsers, Debtor, AddDebtorUser, DebtSummary, Job, ModerationRequest,
+    invalidate_request_counts,
+)
+from .paginators import EstimatedCountPaginator
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Размер пачки для массовых вставок и обновлений в действиях администратора
+BULK_BATCH_SIZE = 500
+# Поля заявки, которые нужны для переноса в основную базу
+APPROVAL_FIELDS = ('user_id', 'name', 'surname', 'amount', 'address', 'region', 'city', 'index_key', 'status')
+# Сколько имен дебиторов перечислять в сообщении об ошибке
+FAILED_NAMES_LIMIT = 10
+
 # Регистрация моделей в админке
 admin.site.register(NewUsers)
 admin.site.register(Debtor)
@@ -23,12 +38,17 @@ class AddDebtorUserAdmin(admin.ModelAdmin):
 
     Атрибуты:
         list_display (tuple): Список полей, которые отображаются в административной панели.
+        list_filter (tuple): Фильтры боковой панели.
+        paginator (type): Пагинатор без полного COUNT(*) по таблице заявок.
         actions (list): Список доступных действий, которые могут быть применены к выбранным записям.
     """
     list_display = (
         'name', 'surname', 'amount', 'status', 'document', 'created_at',
         'updated_at', 'document_link', 'deletion_reason', 'deletion_document',
     )
+    list_filter = ('status',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = [
         'approve_selected', 'reject_selected', 'confirm_deletion',
         'approve_update', 'reject_update', 'confirm_update',
@@ -38,63 +58,108 @@ class AddDebtorUserAdmin(admin.ModelAdmin):
         """
         Одобрение выбранных дебиторов и добавление их в основную базу данных.
 
-        Для каждого выбранного дебитора проверяется его статус. Если статус 'pending',
-        дебитор добавляется в основную базу данных и статус меняется на 'approved' и 'added'.
-        В случае ошибки при добавлении дебитора в базу данных, выводится сообщение об ошибке.
+        Одобрение выполняется одной транзакцией: из выбранных записей в SQL отбираются заявки
+        со статусом 'pending', для них одним bulk_create создаются записи Debtor, после чего статус
+        заявок массово меняется на 'added'. Если пакетная вставка не удалась, заявки обрабатываются
+        по одной, и в базу попадают все записи, кроме ошибочных.
 
         Аргументы:
             request (HttpRequest): Запрос, поступивший от администратора.
             queryset (QuerySet): Список выбранных записей дебиторов.
 
         Сообщения:
-            Выводится сообщение об успешном добавлении дебитора в базу данных или
-            об ошибке, если что-то пошло не так.
+            Выводится одно итоговое сообщение с количеством одобренных и пропущенных заявок
+            и, при наличии, сообщение об ошибках.
 
         Логирование:
-            Ведется логирование успешных действий и ошибок, связанных с добавлением
+            Ведется логирование итогов одобрения и ошибок, связанных с добавлением
             дебиторов в основную базу.
         """
-        for debtor in queryset:
-            if debtor.status == 'pending':
-                try:
-                    main_debtor = Debtor(
-                        user=debtor.user,
-                        name=debtor.name,
-                        surname=debtor.surname,
-                        amount=debtor.amount,
-                        address=debtor.address,
-                        region=debtor.region,
-                        city=debtor.city,
-                        updated_at=debtor.updated_at,
-                        index_key=debtor.index_key,
+        with transaction.atomic():
+            pending = list(
+                queryset.filter(status='pending').only(*APPROVAL_FIELDS).order_by('pk')
+            )
+            skipped = queryset.exclude(status='pending').count()
+
+            try:
+                with transaction.atomic():
+                    Debtor.objects.bulk_create(
+                        [self._debtor_from_request(debtor) for debtor in pending], batch_size=BULK_BATCH_SIZE
                     )
-                    debtor.status = 'approved'
-                    main_debtor.save()
+                approved, failed = pending, []
+            except (IntegrityError, ValidationError) as e:
+                logger.warning("Пакетное одобрение не удалось (%s), заявки обрабатываются по одной.", e)
+                approved, failed = self._approve_one_by_one(pending)
+
+            approved_ids = [debtor.pk for debtor in approved]
+            now = timezone.now()
+            for start in range(0, len(approved_ids), BULK_BATCH_SIZE):
+                AddDebtorUser.objects.filter(pk__in=approved_ids[start:start + BULK_BATCH_SIZE]).update(
+                    status='added', updated_at=now
+                )
+        invalidate_request_counts(*(debtor.user_id for debtor in approved))
+
+        self.message_user(
+            request,
+            f"Одобрено и добавлено в основную базу: {len(approved)}. "
+            f"Пропущено (статус не 'pending'): {skipped}."
+        )
+        logger.info("Одобрено заявок: %s, пропущено: %s, с ошибкой: %s.", len(approved), skipped, len(failed))
+        if failed:
+            names = ', '.join(f"{debtor.name} {debtor.surname}" for debtor, _ in failed[:FAILED_NAMES_LIMIT])
+            self.message_user(
+                request,
+                f"Не удалось добавить в основную базу {len(failed)} дебиторов: {names}"
+                f"{'…' if len(failed) > FAILED_NAMES_LIMIT else ''}. Первая ошибка: {failed[0][1]}",
+                level="error"
+            )
+            for debtor, error in failed:
+                logger.error("Ошибка при добавлении дебитора %s в основную базу: %s", debtor.name, error)
+
+    @staticmethod
+    def _debtor_from_request(debtor):
+        """
+        Создает несохраненную запись Debtor по заявке.
 
-                    debtor.status = 'added'
-                    debtor.save()
+        Аргументы:
+            debtor (AddDebtorUser): Одобряемая заявка.
 
-                    self.message_user(
-                        request,
-                        f"Дебитор {debtor.name} {debtor.surname} успешно одобрен и добавлен в основную базу."
-                    )
-                    logger.info(f"Дебитор {debtor.name} {debtor.surname} одобрен и добавлен в основную базу.")
-                except ValidationError as e:
-                    self.message_user(
-                        request,
-                        f"Ошибка при добавлении дебитора в основную базу: {e}",
-                        level="error"
-                    )
-                    logger.error(f"Ошибка при добавлении дебитора {debtor.name} в основную базу: {e}")
-            else:
-                self.message_user(
-                    request,
-                    f"Дебитор {debtor.name} {debtor.surname} не может быть одобрен, так как его статус не 'pending'.",
-                    level="warning"
-                )
-                logger.warning(
-                    f"Дебитор {debtor.name} {debtor.surname} не был одобрен, его статус не 'pending'."
-                )
+        Возвращает:
+            Debtor: Запись для основной базы с тем же index_key, что и у заявки.
+        """
+        return Debtor(
+            user_id=debtor.user_id,
+            name=debtor.name,
+            surname=debtor.surname,
+            amount=debtor.amount,
+            address=debtor.address,
+            region=debtor.region,
+            city=debtor.city,
+            index_key=debtor.index_key,
+        )
+
+    def _approve_one_by_one(self, pending):
+        """
+        Построчно добавляет заявки в основную базу, пропуская ошибочные.
+
+        Каждая вставка выполняется в собственной точке сохранения, поэтому ошибка в одной
+        заявке не откатывает остальные.
+
+        Аргументы:
+            pending (list[AddDebtorUser]): Заявки со статусом 'pending'.
+
+        Возвращает:
+            tuple[list, list]: Успешно добавленные заявки и пары (заявка, ошибка).
+        """
+        approved, failed = [], []
+        for debtor in pending:
+            try:
+                with transaction.atomic():
+                    self._debtor_from_request(debtor).save()
+                approved.append(debtor)
+            except (IntegrityError, ValidationError) as e:
+                failed.append((debtor, e))
+        return approved, failed
 
     approve_selected.short_description = "Одобрить выбранных дебиторов"
 
@@ -131,7 +196,8 @@ class AddDebtorUserAdmin(admin.ModelAdmin):
                         "Выбраные дебиторы успешно отклонены с указанной причиной."
                     )
                     logger.info(
-                        f"Дебиторы {', '.join([debtor.name for debtor in queryset])} отклонены с причиной: {reason}"
+                        "Дебиторы %s отклонены с причиной: %s",
+                        ', '.join([debtor.name for debtor in queryset]), reason
                     )
         else:
             self.message_user(request, "Пожалуйста, укажите причину отклонения.")
@@ -153,7 +219,7 @@ class AddDebtorUserAdmin(admin.ModelAdmin):
             str: HTML-ссылка для скачивания документа, если он существует, или сообщение "Нет документа".
         """
         if obj.document:
-            return f'<a href="{obj.document.url}" download>Скачать документ</a>'
+            return format_html('<a href="{}">Скачать документ</a>', reverse('download_document', args=[obj.pk]))
         return 'Нет документа'
 
     document_link.short_description = 'Ссылка на документ'
@@ -162,57 +228,162 @@ class AddDebtorUserAdmin(admin.ModelAdmin):
         """
         Подтверждает удаление выбранных дебиторов из основной базы и базы заявок.
 
-        Этот метод обрабатывает удаление дебиторов с состоянием 'deleting'.
-        Для каждого такого дебитора из базы данных удаляется связанная запись в основной базе,
-        а сам дебитор удаляется из базы заявок. Если запись не найдена в основной базе, выводится предупреждение.
+        Этот метод обрабатывает удаление дебиторов со статусом 'deleting' в одной транзакции:
+        записи основной базы ищутся по уникальному индексу index_key выбранных заявок и сверяются
+        с их пользователем, совпавшие удаляются одним DELETE без сигналов (версия реестра
+        увеличивается в DebtorQuerySet), счетчики заявок сбрасываются явно. Затем удаляются сами заявки вместе с их
+        задачами (Job, CASCADE). Заявки без соответствующей записи в основной базе также удаляются
+        и учитываются в отчете.
 
         Аргументы:
             request (HttpRequest): Запрос, поступивший от администратора.
             queryset (QuerySet): Список выбранных дебиторов, которых нужно удалить.
 
         Сообщения:
-            Выводится сообщение об успешном удалении дебитора из обеих баз или предупреждение/ошибка,
-            если запись не найдена в основной базе или если статус дебитора не 'deleting'.
+            Выводится итоговое сообщение с количеством удаленных заявок, записей, не найденных
+            в основной базе, и заявок, пропущенных из-за неверного статуса.
 
         Логирование:
-            Ведется логирование успешного удаления дебитора и случаев, когда запись не была найдена,
-            или статус дебитора неверен.
+            Ведется логирование итогов удаления.
         """
-        for debtor in queryset:
-            if debtor.status == 'deleting':
-                try:
-                    main_debtor = Debtor.objects.get(
-                        user=debtor.user,
-                        index_key=debtor.index_key
-                    )
-                    main_debtor.delete()
-                    logger.info(f"Дебитор {debtor.name} {debtor.surname} удален из основной базы.")
-                except Debtor.DoesNotExist:
-                    self.message_user(
-                        request,
-                        f"Запись в основной базе для пользователя {debtor.user} "
-                        f"({debtor.name} {debtor.surname}) не найдена.",
-                        level="warning"
-                    )
-                    logger.warning(f"Запись в основной базе для {debtor.name} {debtor.surname} не найдена.")
-
-                debtor.delete()
-                self.message_user(
-                    request,
-                    f"Должник {debtor.name} {debtor.surname} успешно удален из обеих баз."
-                )
-                logger.info(f"Дебитор {debtor.name} {debtor.surname} успешно удален из обеих баз.")
-            else:
-                self.message_user(
-                    request,
-                    f"Невозможно удалить должника {debtor.name} {debtor.surname}, так как его статус не 'deleting'.",
-                    level="error"
-                )
-                logger.error(f"Дебитор {debtor.name} {debtor.surname} не может быть удален: неверный статус.")
+        with transaction.atomic():
+            deleting = queryset.filter(status='deleting')
+            skipped = queryset.exclude(status='deleting').count()
+            owners = dict(deleting.exclude(index_key=None).values_list('index_key', 'user_id'))
+            user_ids = list(deleting.values_list('user_id', flat=True).distinct())
+            using = router.db_for_write(Debtor)
+            debtor_ids = [
+                pk for pk, user_id, index_key in Debtor.objects.using(using).filter(
+                    index_key__in=owners
+                ).values_list('pk', 'user_id', 'index_key')
+                if owners[index_key] == user_id
+            ]
+            # Версию реестра увеличивает DebtorQuerySet._raw_delete
+            matched = Debtor.objects.filter(pk__in=debtor_ids)._raw_delete(using) if debtor_ids else 0
+            # delete() возвращает и число каскадно удаленных задач, поэтому берем счетчик заявок
+            _, deleted = AddDebtorUser.objects.filter(pk__in=deleting.values('pk')).delete()
+            removed = deleted.get(AddDebtorUser._meta.label, 0)
+        missing = removed - matched
+        invalidate_request_counts(*user_ids)
+
+        self.message_user(
+            request,
+            f"Удалено заявок: {removed}, из них найдено и удалено в основной базе: {matched}."
+        )
+        if missing > 0:
+            self.message_user(
+                request,
+                f"Для {missing} заявок запись в основной базе не найдена.",
+                level="warning"
+            )
+        if skipped:
+            self.message_user(
+                request,
+                f"Пропущено заявок со статусом не 'deleting': {skipped}.",
+                level="error"
+            )
+        logger.info(
+            "Подтверждено удаление: заявок %s, записей в основной базе %s, не найдено %s, пропущено %s.",
+            removed, matched, missing, skipped
+        )
 
     confirm_deletion.short_description = "Подтвердить удаление"
 
 
+@admin.register(DebtSummary)
+class DebtSummaryAdmin(admin.ModelAdmin):
+    """
+    Класс администратора для сводки долгов по регионам и городам.
+
+    Сводка поддерживается автоматически при изменении дебиторов, поэтому в админке она доступна
+    только для чтения.
+
+    Атрибуты:
+        list_display (tuple): Поля, отображаемые в списке.
+        list_filter (tuple): Фильтры боковой панели.
+        search_fields (tuple): Поля для поиска.
+    """
+    list_display = ('region', 'city', 'debtor_count', 'total_amount')
+    list_filter = ('region',)
+    search_fields = ('region', 'city')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Класс администратора для фоновых задач.
+
+    Задачи создаются представлениями и выполняются командой run_worker, поэтому в админке они
+    доступны только для просмотра и удаления.
+
+    Атрибуты:
+        list_display (tuple): Поля, отображаемые в списке.
+        list_filter (tuple): Фильтры боковой панели.
+        paginator (type): Пагинатор без полного COUNT(*) по таблице задач.
+    """
+    list_display = ('id', 'kind', 'status', 'attempts', 'run_after', 'locked_by', 'debtor_request', 'last_error')
+    list_filter = ('status', 'kind')
+    list_select_related = ('debtor_request',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ActiveStatusFilter(admin.SimpleListFilter):
+    """
+    Фильтр очереди модерации по статусам заявок, ожидающих решения.
+    """
+    title = 'Статус'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, label in AddDebtorUser.STATUS_CHOICES if value in ACTIVE_STATUSES]
+
+    def queryset(self, request, queryset):
+        if self.value() in ACTIVE_STATUSES:
+            return queryset.filter(status=self.value())
+        return queryset
+
+
+@admin.register(ModerationRequest)
+class ModerationQueueAdmin(AddDebtorUserAdmin):
+    """
+    Очередь модерации: заявки со статусами из ACTIVE_STATUSES, от старых к новым.
+
+    Выборка идет по частичному индексу request_active_created_idx (или по составному
+    request_status_created_idx при фильтре по статусу), пользователь подгружается тем же запросом,
+    а количество строк оценивается без полного COUNT(*), поэтому очередь открывается быстро
+    независимо от объема истории заявок. Действия те же, что и в AddDebtorUserAdmin.
+
+    Атрибуты:
+        list_display (tuple): Поля, отображаемые в списке.
+        list_filter (tuple): Фильтр по активным статусам.
+        list_select_related (tuple): Связи, загружаемые JOIN-ом вместе со списком.
+        ordering (tuple): Порядок заявок в очереди.
+    """
+    list_display = ('name', 'surname', 'amount', 'user', 'status', 'created_at', 'document_link', 'deletion_reason')
+    list_filter = (ActiveStatusFilter,)
+    list_select_related = ('user',)
+    ordering = ('created_at', 'pk')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(status__in=ACTIVE_STATUSES)
+
+
 class NewUsersAdmin(UserAdmin):
     """
     Административная модель для управления пользователями NewUsers.
@@ -0,0 +1,90 @@
+"""
+Сводная статистика долгов по регионам и городам.
+
+Таблица DebtSummary поддерживается триггерами базы данных при любом изменении Debtor, поэтому чтение
+итогов стоит O(число регионов), а не O(число дебиторов). Функции модуля дают доступ к итогам и
+позволяют пересобрать сводку с нуля, если она разошлась с основной таблицей.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Debtor, DebtSummary
+
+logger = logging.getLogger(__name__)
+
+
+def total_debtors():
+    """
+    Возвращает общее количество дебиторов по сводной таблице.
+
+    Возвращает:
+        int: Количество дебиторов в реестре.
+    """
+    return DebtSummary.objects.aggregate(total=Sum('debtor_count'))['total'] or 0
+
+
+def region_totals():
+    """
+    Возвращает итоги по регионам, суммируя строки сводки по городам.
+
+    Возвращает:
+        list[dict]: Словари с ключами region, debtor_count и total_amount.
+    """
+    return list(
+        DebtSummary.objects.values('region')
+        .annotate(debtor_count=Sum('debtor_count'), total_amount=Sum('total_amount'))
+        .order_by('region')
+    )
+
+
+def city_totals(region=None):
+    """
+    Возвращает итоги по парам (регион, город).
+
+    Аргументы:
+        region (str, optional): Если указан, возвращаются только города этого региона.
+
+    Возвращает:
+        list[dict]: Словари с ключами region, city, debtor_count и total_amount.
+    """
+    summary = DebtSummary.objects.all()
+    if region:
+        summary = summary.filter(region=region)
+    return list(summary.values('region', 'city', 'debtor_count', 'total_amount'))
+
+
+def reconcile():
+    """
+    Пересобирает сводную таблицу по текущему содержимому Debtor.
+
+    Пересборка выполняется одной транзакцией: сводка очищается и заполняется результатом GROUP BY.
+    На SQLite дальнейшая поддержка сводки выполняется триггерами; на других СУБД
+    команду нужно запускать периодически.
+
+    Возвращает:
+        tuple[int, int]: Количество строк сводки и количество учтенных дебиторов.
+    """
+    with transaction.atomic():
+        DebtSummary.objects.all().delete()
+        rows = (
+            Debtor.objects.values('region', 'city')
+            .annotate(debtor_count=Count('id'), total_amount=Sum('amount'))
+            .order_by()
+        )
+        DebtSummary.objects.bulk_create(
+            DebtSummary(
+                region=row['region'],
+                city=row['city'],
+                debtor_count=row['debtor_count'],
+                total_amount=row['total_amount'] or Decimal('0'),
+            )
+            for row in rows.iterator()
+        )
+    summary_rows = DebtSummary.objects.count()
+    debtors = total_debtors()
+    logger.info("Сводка по регионам пересобрана: %s строк, %s дебиторов.", summary_rows, debtors)
+    return summary_rows, debtors
+
@@ -0,0 +1,258 @@
+"""
+REST API реестра для машинных клиентов.
+
+* /api/debtors/ — дебиторы реестра (без авторизации);
+* /api/requests/ — заявки текущего пользователя, /api/requests/<id>/ — одна заявка;
+* /api/requests/bulk/ — создание сотен заявок за один вызов в одной транзакции.
+
+Списки постраничные через курсор (CursorPagination по паре created_at, id): позиция не сдвигается
+при добавлении записей, а стоимость страницы не растет с ее номером, в отличие от OFFSET.
+Параметр ?fields=name,amount сокращает ответ и набор читаемых столбцов. Фильтры: region, city,
+amount_min, amount_max, для заявок также status (несколько значений через запятую).
+Машинные клиенты передают токен в заголовке Authorization: Token <ключ> (токен выдается в админке
+или командой drf_create_token), браузер — сессию с CSRF-токеном. Пароли API не принимает.
+Частота запросов ограничивается счетчиками (см. модуль throttling) до проверки учетных данных:
+по пользователю сессии, по токену или, для анонимных клиентов, по IP-адресу.
+"""
+import json
+import logging
+import zipfile
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from rest_framework import mixins, status, viewsets
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+from rest_framework.throttling import BaseThrottle
+
+from . import bulk_upload, jobs, throttling
+from .forms import DebtorImportRowForm
+from .models import AddDebtorUser, Debtor, invalidate_request_counts
+from .serializers import DebtorRequestSerializer, DebtorSerializer, requested_fields
+
+logger = logging.getLogger(__name__)
+
+BULK_CREATE_MAX_ITEMS = 1000
+# Область лимита неверных токенов (THROTTLE_RATES['api_token_failure_ip'])
+TOKEN_FAILURE_SCOPE = 'api_token_failure'
+
+
+class RegistryCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация в порядке добавления записей.
+    """
+    ordering = ('created_at', 'id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class FixedWindowThrottle(BaseThrottle):
+    """
+    Ограничение частоты запросов к API лимитами THROTTLE_RATES['api_user'], ['api_token'] и ['api_ip'].
+
+    Проверяется до аутентификации (см. RegistryViewSetMixin.initial), поэтому ключ берется из
+    запроса Django: пользователь сессии (ее уже проверил AuthenticationMiddleware), токен из заголовка
+    Authorization без проверки или IP-адрес. С IP-адреса, исчерпавшего лимит неверных токенов
+    (THROTTLE_RATES['api_token_failure_ip']), запросы с токеном отклоняются до его проверки.
+    """
+    scope = 'api'
+
+    def allow_request(self, request, view):
+        request = request._request
+        if request.user.is_authenticated:
+            keys = ('user',)
+        elif throttling.authorization_token(request):
+            self.retry_after = throttling.failure_wait(request, TOKEN_FAILURE_SCOPE)
+            if self.retry_after:
+                return False
+            keys = ('token',)
+        else:
+            keys = ('ip',)
+        self.retry_after = throttling.check(request, self.scope, keys)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class ThrottledTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену, учитывающая неверные токены в лимите по IP-адресу клиента.
+    """
+
+    def authenticate(self, request):
+        try:
+            return super().authenticate(request)
+        except AuthenticationFailed:
+            throttling.record_failure(request._request, TOKEN_FAILURE_SCOPE)
+            raise
+
+
+def _parse_amount(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Ожидается число.'})
+
+
+def filter_registry(queryset, params, statuses=None):
+    """
+    Применяет фильтры из параметров запроса.
+
+    Аргументы:
+        queryset (QuerySet): Дебиторы или заявки.
+        params (QueryDict): Параметры запроса.
+        statuses (Iterable[str], optional): Допустимые статусы; если не переданы, фильтр status
+            не поддерживается.
+
+    Возвращает:
+        QuerySet: Отфильтрованный набор записей.
+
+    Исключения:
+        ValidationError: Если значение фильтра некорректно.
+    """
+    for name in ('region', 'city'):
+        if params.get(name):
+            queryset = queryset.filter(**{name: params[name]})
+    amount_min = _parse_amount(params, 'amount_min')
+    if amount_min is not None:
+        queryset = queryset.filter(amount__gte=amount_min)
+    amount_max = _parse_amount(params, 'amount_max')
+    if amount_max is not None:
+        queryset = queryset.filter(amount__lte=amount_max)
+    if statuses is not None and params.get('status'):
+        requested = {value.strip() for value in params['status'].split(',') if value.strip()}
+        unknown = requested.difference(statuses)
+        if unknown:
+            raise ValidationError({'status': f"Неизвестные статусы: {', '.join(sorted(unknown))}."})
+        queryset = queryset.filter(status__in=requested)
+    return queryset
+
+
+class RegistryViewSetMixin:
+    """
+    Общие настройки API: пагинация, ограничение частоты, фильтры и чтение только нужных столбцов.
+    """
+    # Basic-аутентификация не подключается: она проверяла бы пароль на каждом запросе
+    authentication_classes = [SessionAuthentication, ThrottledTokenAuthentication]
+    pagination_class = RegistryCursorPagination
+    throttle_classes = [FixedWindowThrottle]
+    statuses = None
+
+    def initial(self, request, *args, **kwargs):
+        # DRF проверяет лимиты после аутентификации; здесь — до нее, чтобы подбор токена
+        # упирался в ограничение частоты раньше, чем в базу
+        self.check_throttles(request)
+        self.throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, 'throttles_checked', False):
+            super().check_throttles(request)
+
+    def filter_queryset(self, queryset):
+        queryset = filter_registry(queryset, self.request.query_params, self.statuses)
+        columns = requested_fields(self.request, self.get_serializer_class().Meta.fields)
+        # Столбцы сортировки нужны курсору даже если клиент их не запросил
+        return queryset.only(*columns, *RegistryCursorPagination.ordering)
+
+
+class DebtorViewSet(RegistryViewSetMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Дебиторы реестра.
+    """
+    permission_classes = [AllowAny]
+    serializer_class = DebtorSerializer
+    queryset = Debtor.objects.all()
+
+
+class DebtorRequestViewSet(RegistryViewSetMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Заявки текущего пользователя на добавление дебиторов.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = DebtorRequestSerializer
+    statuses = {value for value, _ in AddDebtorUser.STATUS_CHOICES}
+
+    def get_queryset(self):
+        return AddDebtorUser.objects.filter(user=self.request.user)
+
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[MultiPartParser, FormParser])
+    def bulk(self, request):
+        """
+        Создает заявки из JSON-массива в поле requests и ZIP-архива с документами в поле documents.
+
+        Каждый элемент массива проверяется по тем же правилам, что и строка массовой загрузки
+        (поле document — имя файла в архиве). Если хотя бы один элемент некорректен, ни одна заявка
+        не создается и возвращается 400 с ошибками по номерам элементов; иначе все заявки
+        и задачи проверки документов записываются в одной транзакции.
+
+        Аргументы:
+            request (Request): Объект запроса.
+
+        Возвращает:
+            Response: 201 с количеством и идентификаторами созданных заявок или 400 с ошибками.
+        """
+        try:
+            items = json.loads(request.data.get('requests', ''))
+        except ValueError:
+            raise ValidationError({'requests': 'Ожидается JSON-массив заявок.'})
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'requests': 'Ожидается непустой JSON-массив заявок.'})
+        if len(items) > BULK_CREATE_MAX_ITEMS:
+            raise ValidationError({'requests': f'За один вызов можно создать не более {BULK_CREATE_MAX_ITEMS} заявок.'})
+        try:
+            archive = bulk_upload.DocumentArchive(request.FILES.get('documents'))
+        except zipfile.BadZipFile:
+            raise ValidationError({'documents': 'Архив с документами поврежден или не является ZIP-файлом.'})
+
+        try:
+            debtor_requests, errors = [], {}
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    errors[index] = {'non_field_errors': ['Ожидается объект заявки.']}
+                    continue
+                form = DebtorImportRowForm(item, archive_names=archive.names)
+                if not form.is_valid():
+                    errors[index] = {field: list(messages) for field, messages in form.errors.items()}
+                    continue
+                debtor_request = form.save(commit=False)
+                debtor_request.user = request.user
+                debtor_request.document.name = form.cleaned_data['document']
+                debtor_requests.append(debtor_request)
+            if errors:
+                logger.warning(
+                    "Пакет заявок пользователя %s отклонен: %s ошибочных из %s.",
+                    request.user.username, len(errors), len(items),
+                )
+                return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+            for debtor_request in debtor_requests:
+                debtor_request.document.name = archive.save(debtor_request.document.name)
+        finally:
+            archive.close()
+
+        with transaction.atomic():
+            created = AddDebtorUser.objects.bulk_create(debtor_requests)
+            jobs.enqueue_document_processing_many(created)
+        invalidate_request_counts(request.user.pk)
+        logger.info("Пользователь %s создал через API %s заявок.", request.user.username, len(created))
+        return Response(
+            {'created': len(created), 'ids': [debtor_request.pk for debtor_request in created]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+router = DefaultRouter()
+router.register('debtors', DebtorViewSet, basename='api-debtor')
+router.register('requests', DebtorRequestViewSet, basename='api-request')
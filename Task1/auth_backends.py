@@ -0,0 +1,27 @@
+"""
+Бэкенд аутентификации с кэшированием пользователя.
+
+AuthenticationMiddleware на каждом запросе вызывает get_user бэкенда, сохраненного в сессии.
+CachedModelBackend берет пользователя из кэша, а из базы данных читает его только при промахе.
+Кэш сбрасывается сигналами при сохранении или удалении пользователя (см. models.reset_user_cache),
+в том числе при изменении email, имени, Telegram и пароля в личном кабинете.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import USER_CACHE_TIMEOUT, user_cache_key
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который кэширует объект пользователя по его идентификатору.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
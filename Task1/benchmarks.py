@@ -0,0 +1,577 @@
+"""
+Бенчмарки горячих представлений реестра на разных объемах данных.
+
+Каждый сценарий выполняется несколько раз через тестовый клиент Django; для него измеряются
+медианное время выполнения, количество SQL-запросов и пиковый объем памяти Python (tracemalloc).
+Подготовка данных сценария (например, создание заявок для массовых действий администратора)
+в измерения не входит. Ответы get_debtors кэшируются до изменения реестра (registry.cache_by_version),
+поэтому они измеряются дважды: без кэша (перед каждым запуском увеличивается версия реестра) и
+из кэша (сценарии с суффиксом _cached). Результаты сохраняются в JSON и могут сравниваться
+с базовой линией.
+
+Отдельно (serving_throughput) измеряется пропускная способность при обслуживании через WSGI
+(пул потоков, как у gunicorn с gthread) и через ASGI (параллельные корутины в одном цикле событий,
+как у uvicorn). Приложения вызываются в процессе, без сети, поэтому сравнивается только
+стоимость обработки запроса Django.
+
+read_write_throughput сравнивает одновременные чтения и записи реестра из нескольких потоков
+при настройках SQLite по умолчанию (журнал отката, fsync на каждый COMMIT) и с SQLITE_PRAGMAS.
+"""
+import asyncio
+import io
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.parse import unquote, urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .models import AddDebtorUser, Debtor, NewUsers, invalidate_registry_version
+
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2
+# Объем заявок, обрабатываемых за один запуск массовых действий администратора
+ADMIN_ACTION_BATCH = 500
+# Доля реестра, которую составляют заявки «тяжелого» пользователя личного кабинета
+CABINET_REQUESTS_SHARE = 0.001
+CABINET_REQUESTS_MAX = 5000
+
+BENCH_USER = 'bench_creditor'
+# Владелец заявок для массовых действий, чтобы они не меняли объем личного кабинета BENCH_USER
+BENCH_BULK_USER = 'bench_bulk'
+BENCH_ADMIN = 'bench_admin'
+BENCH_PASSWORD = 'bench-password-123'
+
+# Адреса, на которых сравнивается обслуживание через WSGI и ASGI (личный кабинет — с сессией BENCH_USER)
+SERVING_PATHS = {
+    'get_debtors_page': '/get_debtors/?limit=100',
+    'search': '/search/?' + urlencode({'q': 'Казань'}),
+    'table_view': '/table/',
+    'personal_cabinet': '/cabinet/',
+}
+DEFAULT_SERVING_REQUESTS = 500
+DEFAULT_SERVING_CONCURRENCY = 16
+
+DEFAULT_READ_WRITE_DURATION = 5
+DEFAULT_READERS = 8
+DEFAULT_WRITERS = 2
+# Настройки SQLite по умолчанию; journal_mode хранится в файле базы, поэтому режим задается явно
+SQLITE_DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Scenario:
+    """
+    Сценарий бенчмарка.
+
+    Атрибуты:
+        name (str): Имя сценария в результатах.
+        run (Callable[[BenchmarkContext], None]): Измеряемое действие.
+        setup (Callable[[BenchmarkContext], None] | None): Подготовка перед каждым запуском, не измеряется.
+    """
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+
+class BenchmarkContext:
+    """
+    Общие данные сценариев: клиенты и объекты, созданные при подготовке.
+    """
+
+    def __init__(self):
+        self.user = None
+        self.bulk_user = None
+        self.admin = None
+        self.client = Client()
+        self.admin_client = Client()
+        self.anonymous = Client()
+        self.request_id = None
+        self.selected = []
+
+
+def prepare(context, scale, workers=1, stdout=None):
+    """
+    Доводит объем реестра до scale дебиторов и создает пользователей сценариев.
+
+    Аргументы:
+        context (BenchmarkContext): Контекст сценариев.
+        scale (int): Требуемое количество дебиторов.
+        workers (int): Количество процессов генерации данных.
+        stdout (TextIO, optional): Куда выводить ход генерации.
+    """
+    user, bulk_user = (
+        NewUsers.objects.filter(username=username).first() or NewUsers.objects.create_user(
+            username, f'{username}@example.com', BENCH_PASSWORD, name='Бенч', surname='Кредитор', age=30,
+            tg_account='@bench',
+        )
+        for username in (BENCH_USER, BENCH_BULK_USER)
+    )
+    admin = NewUsers.objects.filter(username=BENCH_ADMIN).first() or NewUsers.objects.create_superuser(
+        BENCH_ADMIN, f'{BENCH_ADMIN}@example.com', BENCH_PASSWORD, name='Бенч', surname='Админ',
+    )
+    context.user, context.bulk_user, context.admin = user, bulk_user, admin
+    context.client.force_login(user)
+    context.admin_client.force_login(admin)
+
+    missing = scale - Debtor.objects.count()
+    if missing > 0:
+        call_command(
+            'generate_debtors', count=missing, batch_size=10_000, workers=workers, seed=scale,
+            stdout=stdout or io.StringIO(),
+        )
+
+    cabinet_requests = min(int(scale * CABINET_REQUESTS_SHARE), CABINET_REQUESTS_MAX)
+    existing = AddDebtorUser.objects.filter(user=user).count()
+    if existing < cabinet_requests:
+        AddDebtorUser.objects.bulk_create(
+            [_request(user, status='added') for _ in range(cabinet_requests - existing)], batch_size=1000
+        )
+    context.request_id = AddDebtorUser.objects.filter(user=user).values_list('pk', flat=True).first()
+
+
+def _request(user, status='pending', **extra):
+    return AddDebtorUser(
+        user=user, name='Петр', surname='Петров', amount=Decimal('1000.00'), address='ул. Ленина, 1',
+        region='Татарстан', city='Казань', status=status, document='documents/bench.pdf', **extra
+    )
+
+
+def _consume(response):
+    """
+    Дочитывает ответ, включая потоковый, чтобы в измерение попала полная отдача.
+    """
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _cold_response_cache(context):
+    # Новая версия реестра меняет ключ кэша ответов, и запрос доходит до представления
+    invalidate_registry_version()
+
+
+def _get(client_name, path, params=None):
+    def run(context):
+        _consume(getattr(context, client_name).get(path, params))
+    return run
+
+
+def _setup_pending(context):
+    requests = AddDebtorUser.objects.bulk_create(
+        [_request(context.bulk_user) for _ in range(ADMIN_ACTION_BATCH)]
+    )
+    context.selected = [request.pk for request in requests]
+
+
+def _setup_deleting(context):
+    requests = AddDebtorUser.objects.bulk_create(
+        [_request(context.bulk_user, status='deleting') for _ in range(ADMIN_ACTION_BATCH)]
+    )
+    Debtor.objects.bulk_create([
+        Debtor(user=context.bulk_user, name=request.name, surname=request.surname, amount=request.amount,
+               address=request.address, region=request.region, city=request.city, index_key=request.index_key)
+        for request in requests
+    ])
+    context.selected = [request.pk for request in requests]
+
+
+def _admin_action(action):
+    def run(context):
+        _consume(context.admin_client.post(
+            '/admin/Task1/adddebtoruser/', {'action': action, '_selected_action': context.selected}
+        ))
+    return run
+
+
+def _add_debtor(context):
+    _consume(context.client.post('/add-debtor/', {
+        'name': 'Иван', 'surname': 'Иванов', 'amount': '1500.00', 'address': 'ул. Мира, 2',
+        'region': 'Татарстан', 'city': 'Казань',
+        'document': SimpleUploadedFile('contract.pdf', b'%PDF-1.4 benchmark'),
+    }))
+
+
+def _edit_debtor(context):
+    _consume(context.client.post(f'/edit-debtor/{context.request_id}/', {
+        'name': 'Иван', 'amount': '2000,00', 'city': 'Казань',
+    }))
+
+
+SCENARIOS = [
+    Scenario('get_debtors_full', _get('anonymous', '/get_debtors/'), setup=_cold_response_cache),
+    Scenario('get_debtors_full_cached', _get('anonymous', '/get_debtors/'), setup=_get('anonymous', '/get_debtors/')),
+    Scenario('get_debtors_page', _get('anonymous', '/get_debtors/', {'limit': 100}), setup=_cold_response_cache),
+    Scenario(
+        'get_debtors_page_cached', _get('anonymous', '/get_debtors/', {'limit': 100}),
+        setup=_get('anonymous', '/get_debtors/', {'limit': 100}),
+    ),
+    Scenario('get_debtors_stream', lambda c: _consume(c.anonymous.get('/get_debtors/', {'stream': 'ndjson'}))),
+    Scenario('table_view', lambda c: _consume(c.anonymous.get('/table/'))),
+    Scenario('table_data_sorted', lambda c: _consume(c.anonymous.get('/table/data/', {
+        'draw': 1, 'start': 1000, 'length': 50, 'order[0][column]': 2, 'order[0][dir]': 'desc',
+    }))),
+    Scenario('table_data_search', lambda c: _consume(c.anonymous.get('/table/data/', {
+        'draw': 1, 'start': 0, 'length': 50, 'search[value]': 'Казань',
+    }))),
+    Scenario('personal_cabinet', lambda c: _consume(c.client.get('/cabinet/'))),
+    Scenario('add_debtor', _add_debtor),
+    Scenario('edit_debtor', _edit_debtor),
+    Scenario('admin_approve_selected', _admin_action('approve_selected'), setup=_setup_pending),
+    Scenario('admin_confirm_deletion', _admin_action('confirm_deletion'), setup=_setup_deleting),
+]
+
+
+def measure(scenario, context, repeat=DEFAULT_REPEAT):
+    """
+    Выполняет сценарий repeat раз и возвращает его метрики.
+
+    Аргументы:
+        scenario (Scenario): Сценарий.
+        context (BenchmarkContext): Контекст сценариев.
+        repeat (int): Количество запусков.
+
+    Возвращает:
+        dict: wall_ms (медиана), wall_ms_min, queries (максимум) и peak_kb (максимум).
+    """
+    timings, queries, peaks = [], [], []
+    for _ in range(repeat):
+        if scenario.setup:
+            scenario.setup(context)
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            scenario.run(context)
+            timings.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        queries.append(len(captured))
+    return {
+        'wall_ms': round(statistics.median(timings), 2),
+        'wall_ms_min': round(min(timings), 2),
+        'queries': max(queries),
+        'peak_kb': round(max(peaks), 1),
+    }
+
+
+def run(scales=DEFAULT_SCALES, repeat=DEFAULT_REPEAT, only=None, workers=1, stdout=None):
+    """
+    Прогоняет сценарии на каждом объеме данных.
+
+    Аргументы:
+        scales (Iterable[int]): Объемы реестра по возрастанию.
+        repeat (int): Количество запусков каждого сценария.
+        only (Iterable[str], optional): Имена сценариев, которые нужно выполнить.
+        workers (int): Количество процессов генерации данных.
+        stdout (TextIO, optional): Куда выводить ход выполнения.
+
+    Возвращает:
+        dict: Результаты вида {'scales': {scale: {scenario: метрики}}}.
+    """
+    context = BenchmarkContext()
+    scenarios = [scenario for scenario in SCENARIOS if not only or scenario.name in only]
+    results = {}
+    for scale in sorted(scales):
+        prepare(context, scale, workers=workers, stdout=stdout)
+        results[str(scale)] = {}
+        for scenario in scenarios:
+            metrics = measure(scenario, context, repeat=repeat)
+            results[str(scale)][scenario.name] = metrics
+            if stdout:
+                stdout.write(
+                    f"{scale:>9} {scenario.name:<24} {metrics['wall_ms']:>10.2f} ms "
+                    f"{metrics['queries']:>5} запросов {metrics['peak_kb']:>10.1f} КБ\n"
+                )
+    return {'repeat': repeat, 'scales': results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает результаты с базовой линией.
+
+    Регрессией считается рост медианного времени или пиковой памяти больше чем на threshold
+    (доля), а также любое увеличение количества запросов.
+
+    Аргументы:
+        baseline (dict): Базовые результаты run().
+        current (dict): Текущие результаты run().
+        threshold (float): Допустимый относительный рост.
+
+    Возвращает:
+        list[str]: Описания обнаруженных регрессий.
+    """
+    regressions = []
+    for scale, scenarios in current['scales'].items():
+        for name, metrics in scenarios.items():
+            base = baseline.get('scales', {}).get(scale, {}).get(name)
+            if base is None:
+                continue
+            for metric in ('wall_ms', 'peak_kb'):
+                if base[metric] and metrics[metric] > base[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{scale} {name}: {metric} {base[metric]} → {metrics[metric]} "
+                        f"(+{(metrics[metric] / base[metric] - 1) * 100:.0f}%)"
+                    )
+            if metrics['queries'] > base['queries']:
+                regressions.append(f"{scale} {name}: queries {base['queries']} → {metrics['queries']}")
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+
+
+def _wsgi_get(app, path, cookie):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': unquote(path), 'QUERY_STRING': query,
+        'HTTP_HOST': 'testserver', 'SERVER_NAME': 'testserver', 'HTTP_COOKIE': cookie,
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(statuses[0][:3])
+
+
+async def _asgi_get(app, path, cookie):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': unquote(path), 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    body_sent = False
+    statuses = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Клиент не отключается: задачу ожидания отключения Django отменит после ответа
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+def _throughput(latencies, statuses, elapsed):
+    latencies.sort()
+    return {
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        'errors': sum(1 for status in statuses if status >= 400),
+    }
+
+
+def measure_wsgi(path, cookie, requests, concurrency):
+    """
+    Выполняет requests запросов к WSGI-приложению в пуле из concurrency потоков.
+
+    Возвращает:
+        dict: Запросов в секунду (rps), медиана и 95-й перцентиль задержки, количество ошибок.
+    """
+    app = get_wsgi_application()
+
+    def timed(_):
+        started = time.perf_counter()
+        status = _wsgi_get(app, path, cookie)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+    return _throughput([latency for latency, _ in results], [status for _, status in results], elapsed)
+
+
+def measure_asgi(path, cookie, requests, concurrency):
+    """
+    Выполняет requests запросов к ASGI-приложению, держа в работе не больше concurrency одновременно.
+
+    Возвращает:
+        dict: Запросов в секунду (rps), медиана и 95-й перцентиль задержки, количество ошибок.
+    """
+    app = get_asgi_application()
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                started = time.perf_counter()
+                status = await _asgi_get(app, path, cookie)
+                return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(timed() for _ in range(requests)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return _throughput([latency for latency, _ in results], [status for _, status in results], elapsed)
+
+
+def serving_throughput(scale, requests=DEFAULT_SERVING_REQUESTS, concurrency=DEFAULT_SERVING_CONCURRENCY,
+                       only=None, workers=1, stdout=None):
+    """
+    Сравнивает пропускную способность WSGI и ASGI на адресах SERVING_PATHS.
+
+    Аргументы:
+        scale (int): Объем реестра (количество дебиторов).
+        requests (int): Количество запросов на адрес и режим.
+        concurrency (int): Количество одновременно обрабатываемых запросов.
+        only (Iterable[str], optional): Имена адресов из SERVING_PATHS.
+        workers (int): Количество процессов генерации данных.
+        stdout (TextIO, optional): Куда выводить ход выполнения.
+
+    Возвращает:
+        dict: Результаты вида {'paths': {имя: {'wsgi': метрики, 'asgi': метрики}}}.
+    """
+    context = BenchmarkContext()
+    prepare(context, scale, workers=workers, stdout=stdout)
+    cookie = '; '.join(f'{name}={morsel.value}' for name, morsel in context.client.cookies.items())
+    results = {}
+    for name, path in SERVING_PATHS.items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        for mode, measure_mode in (('wsgi', measure_wsgi), ('asgi', measure_asgi)):
+            # Прогрев: кэши версии реестра, сессии и пользователя
+            measure_mode(path, cookie, concurrency, concurrency)
+            metrics = results[name][mode] = measure_mode(path, cookie, requests, concurrency)
+            if stdout:
+                stdout.write(
+                    f"{name:<20} {mode} {metrics['rps']:>9.1f} запр/с p50 {metrics['p50_ms']:>8.2f} ms "
+                    f"p95 {metrics['p95_ms']:>8.2f} ms ошибок {metrics['errors']}\n"
+                )
+    return {'scale': scale, 'requests': requests, 'concurrency': concurrency, 'paths': results}
+
+
+def _read_registry():
+    list(Debtor.objects.order_by('-id').values('name', 'surname', 'amount', 'region', 'city')[:100])
+
+
+def _write_registry(user):
+    Debtor.objects.create(
+        user=user, name='Иван', surname='Иванов', amount=Decimal('1500.00'), address='ул. Мира, 2',
+        region='Татарстан', city='Казань',
+    )
+
+
+def _operations(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        'ops': round(len(latencies) / elapsed, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+        'errors': errors,
+    }
+
+
+def measure_read_write(user, readers, writers, duration):
+    """
+    Читает и пишет реестр из readers и writers потоков в течение duration секунд.
+
+    Ошибки «database is locked» (истек busy_timeout) считаются и не прерывают поток.
+
+    Возвращает:
+        dict: Для чтений и записей — операций в секунду, 95-й перцентиль задержки и количество ошибок.
+    """
+    stop = threading.Event()
+
+    def worker(operation):
+        latencies, errors = [], 0
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    operation()
+                except OperationalError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return latencies, errors
+
+    with ThreadPoolExecutor(readers + writers) as pool:
+        started = time.perf_counter()
+        futures = [pool.submit(worker, _read_registry) for _ in range(readers)]
+        futures += [pool.submit(worker, lambda: _write_registry(user)) for _ in range(writers)]
+        time.sleep(duration)
+        stop.set()
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+
+    metrics = {}
+    for kind, part in (('reads', results[:readers]), ('writes', results[readers:])):
+        latencies = [latency for thread_latencies, _ in part for latency in thread_latencies]
+        metrics[kind] = _operations(latencies, sum(errors for _, errors in part), elapsed)
+    return metrics
+
+
+def read_write_throughput(scale, duration=DEFAULT_READ_WRITE_DURATION, readers=DEFAULT_READERS,
+                          writers=DEFAULT_WRITERS, workers=1, stdout=None):
+    """
+    Сравнивает одновременные чтения и записи реестра при настройках SQLite по умолчанию и с SQLITE_PRAGMAS.
+
+    Аргументы:
+        scale (int): Объем реестра (количество дебиторов).
+        duration (float): Длительность измерения каждого режима в секундах.
+        readers (int): Количество читающих потоков.
+        writers (int): Количество пишущих потоков.
+        workers (int): Количество процессов генерации данных.
+        stdout (TextIO, optional): Куда выводить ход выполнения.
+
+    Возвращает:
+        dict: Результаты вида {'modes': {'default' | 'tuned': {'reads': метрики, 'writes': метрики}}}.
+    """
+    context = BenchmarkContext()
+    prepare(context, scale, workers=workers, stdout=stdout)
+    results = {}
+    for mode, pragmas in (('default', SQLITE_DEFAULT_PRAGMAS), ('tuned', settings.SQLITE_PRAGMAS)):
+        # PRAGMA выполняются при открытии соединения: закрываем открытые, чтобы режим сменился
+        connections.close_all()
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            Debtor.objects.exists()
+            metrics = results[mode] = measure_read_write(context.user, readers, writers, duration)
+            connections.close_all()
+        if stdout:
+            for kind in ('reads', 'writes'):
+                stdout.write(
+                    f"{mode:<8} {kind:<6} {metrics[kind]['ops']:>9.1f} опер/с "
+                    f"p95 {metrics[kind]['p95_ms']} ms ошибок {metrics[kind]['errors']}\n"
+                )
+    return {'scale': scale, 'duration': duration, 'readers': readers, 'writers': writers, 'modes': results}
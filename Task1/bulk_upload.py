@@ -0,0 +1,291 @@
+"""
+Массовая загрузка заявок на добавление дебиторов из CSV или XLSX.
+
+Файл читается построчно, каждая строка проверяется формой DebtorImportRowForm (те же правила,
+что и при добавлении одной заявки), корректные строки записываются пачками через bulk_create,
+а по ошибочным строкам формируется CSV-отчет. Документы берутся из приложенного ZIP-архива:
+каждый файл архива сохраняется в хранилище один раз, даже если на него ссылаются многие строки.
+"""
+import csv
+import io
+import logging
+import os
+import uuid
+import zipfile
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import jobs
+from .forms import DebtorImportRowForm
+from .models import AddDebtorUser, invalidate_request_counts
+
+try:
+    import openpyxl
+except ImportError:  # XLSX поддерживается только при установленном openpyxl
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+REPORT_DIR = 'import_reports'
+# Допустимые заголовки колонок: имена полей и подписи на русском
+COLUMN_ALIASES = {
+    'name': 'name', 'имя': 'name',
+    'surname': 'surname', 'фамилия': 'surname',
+    'amount': 'amount', 'сумма': 'amount', 'сумма долга': 'amount',
+    'address': 'address', 'адрес': 'address',
+    'region': 'region', 'регион': 'region',
+    'city': 'city', 'город': 'city',
+    'document': 'document', 'документ': 'document',
+}
+
+
+class BulkImportError(Exception):
+    """
+    Ошибка, из-за которой файл загрузки не может быть обработан целиком.
+    """
+
+
+class ImportResult:
+    """
+    Итог массовой загрузки.
+
+    Атрибуты:
+        created (int): Количество созданных заявок.
+        errors (list[tuple[int, str]]): Номера строк файла и описания ошибок.
+        report_name (str | None): Путь к CSV-отчету об ошибках в хранилище.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+        self.report_name = None
+
+    @property
+    def total(self):
+        return self.created + len(self.errors)
+
+
+def read_rows(file, filename):
+    """
+    Построчно читает таблицу дебиторов из CSV или XLSX.
+
+    Аргументы:
+        file (File): Файл с таблицей.
+        filename (str): Имя файла, по расширению которого определяется формат.
+
+    Возвращает:
+        Iterator[tuple[int, dict]]: Номер строки в файле и словарь значений по именам полей.
+
+    Исключения:
+        BulkImportError: Если формат не поддерживается или в файле нет обязательных колонок.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        if openpyxl is None:
+            raise BulkImportError('Для загрузки XLSX необходим пакет openpyxl, используйте CSV.')
+        rows = _xlsx_rows(file)
+    elif extension in ('.csv', '.txt'):
+        rows = _csv_rows(file)
+    else:
+        raise BulkImportError('Поддерживаются только файлы CSV и XLSX.')
+
+    header = next(rows, None)
+    if header is None:
+        raise BulkImportError('Файл пуст.')
+    fields = [COLUMN_ALIASES.get(str(column or '').strip().lower()) for column in header]
+    missing = set(DebtorImportRowForm.Meta.fields) - set(fields)
+    if missing:
+        raise BulkImportError(f"В файле нет обязательных колонок: {', '.join(sorted(missing))}.")
+
+    for line_number, values in enumerate(rows, start=2):
+        if not any(values):
+            continue
+        row = {
+            field: '' if value is None else str(value).strip()
+            for field, value in zip(fields, values) if field
+        }
+        if 'amount' in row:
+            # Сумма из Excel может содержать запятую и пробелы между разрядами
+            row['amount'] = row['amount'].replace(',', '.').replace(' ', '').replace('\xa0', '')
+        yield line_number, row
+
+
+def _csv_rows(file):
+    """
+    Читает CSV в кодировке UTF-8 (с BOM или без), разделитель определяется автоматически.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    finally:
+        # Генератор могут закрыть уже после закрытия загруженного файла
+        if not text.closed:
+            text.detach()
+
+
+def _xlsx_rows(file):
+    """
+    Читает первый лист XLSX в потоковом режиме openpyxl.
+    """
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+class DocumentArchive:
+    """
+    Доступ к документам из ZIP-архива загрузки с однократным сохранением каждого файла.
+
+    Атрибуты:
+        names (set[str]): Имена файлов в архиве.
+    """
+
+    def __init__(self, file=None):
+        self._zip = zipfile.ZipFile(file) if file is not None else None
+        self.names = {
+            info.filename for info in self._zip.infolist() if not info.is_dir()
+        } if self._zip else set()
+        self._saved = {}
+
+    def save(self, name):
+        """
+        Сохраняет документ из архива в хранилище и возвращает его имя в хранилище.
+
+        Аргументы:
+            name (str): Имя файла в архиве.
+
+        Возвращает:
+            str: Имя сохраненного файла, пригодное для AddDebtorUser.document.
+        """
+        if name not in self._saved:
+            field = AddDebtorUser._meta.get_field('document')
+            target = field.generate_filename(None, os.path.basename(name))
+            with self._zip.open(name) as member:
+                self._saved[name] = field.storage.save(target, File(member))
+        return self._saved[name]
+
+    def close(self):
+        if self._zip:
+            self._zip.close()
+
+
+def import_debtor_requests(user, file, filename, documents=None, chunk_size=CHUNK_SIZE):
+    """
+    Создает заявки на добавление дебиторов из таблицы.
+
+    Строки проверяются по одной, корректные накапливаются и записываются пачками по chunk_size
+    через bulk_create вместе с задачами проверки документов (каждая пачка — отдельная транзакция).
+    Ошибочные строки пропускаются и попадают в отчет.
+
+    Аргументы:
+        user (NewUsers): Пользователь, от имени которого создаются заявки.
+        file (File): Таблица с дебиторами (CSV или XLSX).
+        filename (str): Имя файла таблицы.
+        documents (File, optional): ZIP-архив с документами.
+        chunk_size (int): Размер пачки для bulk_create.
+
+    Возвращает:
+        ImportResult: Итог загрузки.
+
+    Исключения:
+        BulkImportError: Если файл или архив не могут быть прочитаны.
+    """
+    result = ImportResult()
+    try:
+        archive = DocumentArchive(documents)
+    except zipfile.BadZipFile as e:
+        raise BulkImportError('Архив с документами поврежден или не является ZIP-файлом.') from e
+
+    batch = []
+    try:
+        for line_number, row in read_rows(file, filename):
+            form = DebtorImportRowForm(row, archive_names=archive.names)
+            if not form.is_valid():
+                result.errors.append((line_number, _format_errors(form)))
+                continue
+            debtor_request = form.save(commit=False)
+            debtor_request.user = user
+            debtor_request.document.name = archive.save(form.cleaned_data['document'])
+            batch.append(debtor_request)
+            if len(batch) >= chunk_size:
+                result.created += _flush(batch)
+        result.created += _flush(batch)
+    finally:
+        archive.close()
+        invalidate_request_counts(user.pk)
+
+    if result.errors:
+        result.report_name = write_error_report(user, result.errors)
+    logger.info(
+        "Массовая загрузка пользователя %s: создано %s, ошибок %s.",
+        user.username, result.created, len(result.errors),
+    )
+    return result
+
+
+def _flush(batch):
+    """
+    Записывает накопленную пачку заявок и задачи проверки их документов и очищает пачку.
+    """
+    if not batch:
+        return 0
+    with transaction.atomic():
+        jobs.enqueue_document_processing_many(AddDebtorUser.objects.bulk_create(batch))
+    created = len(batch)
+    batch.clear()
+    return created
+
+
+def _format_errors(form):
+    """
+    Собирает ошибки формы строки в одну строку текста.
+    """
+    return '; '.join(
+        f"{field}: {' '.join(messages)}" if field != '__all__' else ' '.join(messages)
+        for field, messages in form.errors.items()
+    )
+
+
+def report_path(user_id, report_id):
+    """
+    Возвращает путь к отчету об ошибках загрузки в хранилище.
+
+    Аргументы:
+        user_id (int): Владелец отчета.
+        report_id (str): Идентификатор отчета.
+
+    Возвращает:
+        str: Путь к файлу отчета.
+    """
+    return f'{REPORT_DIR}/{user_id}/{report_id}.csv'
+
+
+def write_error_report(user, errors):
+    """
+    Сохраняет CSV-отчет об ошибочных строках загрузки.
+
+    Аргументы:
+        user (NewUsers): Владелец отчета.
+        errors (list[tuple[int, str]]): Номера строк и описания ошибок.
+
+    Возвращает:
+        str: Путь к отчету в хранилище.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(['Строка', 'Ошибка'])
+    writer.writerows(errors)
+    content = ContentFile(('\ufeff' + buffer.getvalue()).encode('utf-8'))
+    return default_storage.save(report_path(user.pk, uuid.uuid4().hex), content)
@@ -0,0 +1,167 @@
+"""
+Отдача документов заявок с поддержкой условных запросов и HTTP Range.
+
+Функция serve_document формирует ответ для уже проверенного (по правам доступа) файла:
+
+* ETag — SHA-256 из имени файла в хранилище с дедупликацией, иначе размер и время изменения;
+  при совпадении If-None-Match возвращается 304;
+* Range — один диапазон байтов (``bytes=начало-конец``, ``bytes=начало-``, ``bytes=-N``) отдается
+  ответом 206, с учетом If-Range; несколько диапазонов не поддерживаются, и тогда отдается весь файл;
+* файл читается блоками через FileResponse, поэтому в памяти не держится целиком.
+
+Если настройка DOCUMENT_SENDFILE_BACKEND равна 'x-accel-redirect' (nginx) или 'x-sendfile'
+(Apache, lighttpd), ответ содержит только заголовки, а сам файл отдает фронтовый сервер; рабочий
+процесс Django при этом освобождается сразу.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from .storage import BLOB_PREFIX
+
+CACHE_CONTROL = 'private, no-cache'
+BLOCK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """
+    Обертка над открытым файлом, читающая не больше length байт начиная с позиции start.
+
+    Аргументы:
+        file (File): Открытый файл.
+        start (int): Позиция первого байта.
+        length (int): Количество байт.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def document_etag(fieldfile, size, modified):
+    """
+    Возвращает ETag документа.
+
+    Для файлов хранилища с дедупликацией имя уже содержит хеш содержимого, поэтому файл не читается.
+
+    Аргументы:
+        fieldfile (FieldFile): Файл документа.
+        size (int): Размер файла.
+        modified (float): Время изменения файла (Unix).
+
+    Возвращает:
+        str: Значение ETag в кавычках.
+    """
+    if fieldfile.name.startswith(BLOB_PREFIX + '/'):
+        return quote_etag(os.path.splitext(os.path.basename(fieldfile.name))[0])
+    return quote_etag(f'{size:x}-{int(modified):x}')
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байтов.
+
+    Аргументы:
+        header (str): Значение заголовка Range.
+        size (int): Размер файла.
+
+    Возвращает:
+        tuple[int, int] | None: Позиции первого и последнего байта или None, если диапазон
+        не поддерживается и нужно отдать весь файл.
+
+    Исключения:
+        ValueError: Если диапазон не пересекается с файлом (ответ 416).
+    """
+    match = RANGE_PATTERN.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise ValueError('Диапазон вне файла.')
+    return start, end
+
+
+def serve_document(request, fieldfile, filename):
+    """
+    Формирует ответ с документом.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+        fieldfile (FieldFile): Файл документа (доступ уже проверен).
+        filename (str): Имя файла для заголовка Content-Disposition.
+
+    Возвращает:
+        HttpResponse: Ответ 200, 206, 304 или 416 либо ответ с заголовком для фронтового сервера.
+    """
+    storage = fieldfile.storage
+    path = storage.path(fieldfile.name)
+    stat = os.stat(path)
+    etag = document_etag(fieldfile, stat.st_size, stat.st_mtime)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    disposition = f"attachment; filename*=UTF-8''{quote(filename)}"
+
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    backend = settings.DOCUMENT_SENDFILE_BACKEND
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        if backend == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.DOCUMENT_ACCEL_REDIRECT_PREFIX + quote(fieldfile.name)
+        else:
+            response['X-Sendfile'] = path
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if 'Range' in request.headers and (if_range is None or if_range == etag):
+            try:
+                byte_range = parse_range(request.headers['Range'], stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+        file = storage.open(fieldfile.name, 'rb')
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(file, content_type=content_type)
+            response['Content-Length'] = stat.st_size
+        response.block_size = BLOCK_SIZE
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = disposition
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,103 @@
+"""
+Потоковая выгрузка реестра дебиторов в CSV.
+
+Строки читаются из базы серверным итератором пачками и сразу кодируются в CSV, поэтому выгрузка
+любого размера занимает постоянный объем памяти и начинает отдаваться клиенту сразу.
+Файл пишется в UTF-8 с BOM и разделителем «;», чтобы Excel корректно открывал кириллицу.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.utils.dateformat import format as date_format
+from django.utils.timezone import localtime, make_aware
+
+from .models import Debtor
+
+CHUNK_SIZE = 2000
+BOM = '\ufeff'
+COLUMNS = (
+    ('name', 'Имя'),
+    ('surname', 'Фамилия'),
+    ('amount', 'Сумма долга'),
+    ('address', 'Адрес'),
+    ('region', 'Регион'),
+    ('city', 'Город'),
+    ('created_at', 'Дата создания'),
+    ('updated_at', 'Дата изменения'),
+)
+
+
+class ExportFilterError(ValueError):
+    """
+    Некорректное значение фильтра выгрузки.
+    """
+
+
+class _Echo:
+    """
+    Объект с интерфейсом файла, который возвращает записанную строку вместо ее сохранения.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError as e:
+        raise ExportFilterError(f'Параметр {name} должен быть датой в формате ГГГГ-ММ-ДД.') from e
+
+
+def filter_debtors(region=None, city=None, created_from=None, created_to=None):
+    """
+    Возвращает QuerySet дебиторов для выгрузки с учетом фильтров.
+
+    Границы дат преобразуются в моменты времени текущего часового пояса, чтобы фильтр
+    по created_at мог использовать индекс.
+
+    Аргументы:
+        region (str, optional): Регион.
+        city (str, optional): Город.
+        created_from (str, optional): Начальная дата создания (включительно), ГГГГ-ММ-ДД.
+        created_to (str, optional): Конечная дата создания (включительно), ГГГГ-ММ-ДД.
+
+    Возвращает:
+        QuerySet: Строки дебиторов (values_list) в порядке создания.
+
+    Исключения:
+        ExportFilterError: Если дата указана в неверном формате.
+    """
+    debtors = Debtor.objects.all()
+    if region:
+        debtors = debtors.filter(region=region)
+    if city:
+        debtors = debtors.filter(city=city)
+    if created_from:
+        start = _parse_date(created_from, 'created_from')
+        debtors = debtors.filter(created_at__gte=make_aware(datetime.combine(start, time.min)))
+    if created_to:
+        end = _parse_date(created_to, 'created_to') + timedelta(days=1)
+        debtors = debtors.filter(created_at__lt=make_aware(datetime.combine(end, time.min)))
+    return debtors.order_by('created_at', 'id').values_list(*(field for field, _ in COLUMNS))
+
+
+def iter_csv(debtors, chunk_size=CHUNK_SIZE):
+    """
+    Генерирует CSV-выгрузку построчно.
+
+    Аргументы:
+        debtors (QuerySet): Результат filter_debtors.
+        chunk_size (int): Количество строк, читаемых из базы за один раз.
+
+    Возвращает:
+        Iterator[str]: BOM и строки CSV, начиная с заголовка.
+    """
+    writer = csv.writer(_Echo(), delimiter=';')
+    yield BOM + writer.writerow([title for _, title in COLUMNS])
+    for name, surname, amount, address, region, city, created_at, updated_at in debtors.iterator(chunk_size):
+        yield writer.writerow([
+            name, surname, amount, address, region, city,
+            date_format(localtime(created_at), 'd.m.Y H:i'),
+            date_format(localtime(updated_at), 'd.m.Y H:i'),
+        ])
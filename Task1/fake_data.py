@@ -0,0 +1,62 @@
+"""
+Генерация случайных данных дебиторов для нагрузочного тестирования.
+
+Модуль не импортирует Django, поэтому его функции можно выполнять в дочерних процессах пула
+без настройки приложения: процессы только генерируют строки, запись в базу остается
+в основном процессе.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from faker import Faker
+
+REGIONS = ['Московская область', 'Ленинградская область', 'Татарстан', 'Краснодарский край', 'Кемеровская область']
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Краснодар']
+# Глубина истории, на которую распределяются даты создания записей
+HISTORY_DAYS = 5 * 365
+
+_fake = None
+
+
+def _faker():
+    global _fake
+    if _fake is None:
+        _fake = Faker('ru_RU')
+    return _fake
+
+
+def generate_batch(seed, size, user_ids, now=None):
+    """
+    Генерирует пачку строк дебиторов.
+
+    Результат детерминирован для одинаковых seed и size, что позволяет воспроизводить наборы данных.
+
+    Аргументы:
+        seed (int): Начальное значение генератора для этой пачки.
+        size (int): Количество строк.
+        user_ids (list[int]): Идентификаторы пользователей, между которыми распределяются дебиторы.
+        now (datetime, optional): Верхняя граница дат; по умолчанию текущее время UTC.
+
+    Возвращает:
+        list[dict]: Значения полей дебиторов, включая исторические created_at и updated_at.
+    """
+    fake = _faker()
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    rows = []
+    for _ in range(size):
+        created_at = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 24 * 3600))
+        updated_at = created_at + (now - created_at) * rng.random()
+        rows.append({
+            'user_id': rng.choice(user_ids),
+            'name': fake.first_name(),
+            'surname': fake.last_name(),
+            'amount': round(rng.uniform(1000, 100000), 2),
+            'address': fake.address()[:100],
+            'region': rng.choice(REGIONS),
+            'city': rng.choice(CITIES),
+            'created_at': created_at,
+            'updated_at': updated_at,
+        })
+    return rows
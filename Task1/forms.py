@@ -236,6 +236,63 @@ class DebtorRequestForm(forms.ModelForm):
         return document
 
 
+class DebtorImportRowForm(DebtorRequestForm):
+    """
+    Форма проверки одной строки файла массовой загрузки дебиторов.
+
+    Повторяет проверки DebtorRequestForm, но вместо загруженного файла поле 'document' содержит
+    имя документа в ZIP-архиве, приложенном к загрузке.
+
+    Атрибуты:
+        document (forms.CharField): Имя файла документа в архиве.
+    """
+
+    document = forms.CharField(max_length=255, required=False)
+
+    class Meta(DebtorRequestForm.Meta):
+        fields = ['name', 'surname', 'amount', 'address', 'region', 'city']
+
+    def __init__(self, *args, archive_names=frozenset(), **kwargs):
+        """
+        Инициализирует форму строки.
+
+        Args:
+            archive_names (set[str]): Имена файлов, имеющихся в приложенном ZIP-архиве.
+        """
+        super().__init__(*args, **kwargs)
+        self.archive_names = archive_names
+
+    def clean_document(self):
+        """
+        Валидирует поле 'document' строки.
+
+        Проверяет, что имя документа указано и такой файл есть в приложенном архиве.
+
+        Returns:
+            str: Имя документа в архиве.
+
+        Raises:
+            forms.ValidationError: Если документ не указан или отсутствует в архиве.
+        """
+        document = super().clean_document().strip()
+        if document not in self.archive_names:
+            raise forms.ValidationError(f'Документ {document} не найден в архиве.')
+        return document
+
+
+class BulkDebtorUploadForm(forms.Form):
+    """
+    Форма массовой загрузки заявок на добавление дебиторов.
+
+    Поля:
+    - file: Таблица с дебиторами в формате CSV или XLSX (обязательное поле).
+    - documents: ZIP-архив с документами, на которые ссылаются строки таблицы.
+    """
+
+    file = forms.FileField(label='Файл с дебиторами (CSV или XLSX)')
+    documents = forms.FileField(label='Архив с документами (ZIP)', required=False)
+
+
 class DeletionRequestForm(forms.Form):
     """
     Форма для отправки запроса на удаление дебитора.
@@ -0,0 +1,284 @@
+"""
+Очередь фоновых задач на базе таблицы Job.
+
+Представления ставят задачи в очередь (enqueue) и сразу отвечают пользователю, а команда
+run_worker захватывает задачи (claim) и выполняет их (run) в текущем процессе или в пуле процессов.
+Захват — это условный UPDATE, который переводит задачу в статус 'running' и выставляет аренду
+до locked_until; два обработчика не получат одну задачу, а задача упавшего обработчика снова
+станет доступна после окончания аренды. Ошибки повторяются с экспоненциальной задержкой,
+PermanentJobError завершает задачу сразу.
+
+Обработчики регистрируются декоратором handler по типу задачи.
+"""
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import AddDebtorUser, Job
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 5 * 60
+RETRY_BASE_DELAY = 30
+PROCESS_DOCUMENT = 'process_document'
+
+HANDLERS = {}
+
+
+class PermanentJobError(Exception):
+    """
+    Ошибка, после которой задачу нет смысла повторять.
+    """
+
+
+def handler(kind):
+    """
+    Регистрирует функцию как обработчик задач указанного типа.
+
+    Аргументы:
+        kind (str): Тип задачи.
+
+    Возвращает:
+        callable: Декоратор, принимающий функцию func(job) -> dict | None.
+    """
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, debtor_request=None, max_attempts=3, delay=0):
+    """
+    Ставит задачу в очередь.
+
+    Аргументы:
+        kind (str): Тип задачи.
+        payload (dict, optional): Параметры задачи.
+        debtor_request (AddDebtorUser, optional): Заявка, к которой относится задача.
+        max_attempts (int): Максимальное количество попыток.
+        delay (float): Через сколько секунд задачу можно начинать выполнять.
+
+    Возвращает:
+        Job: Созданная задача.
+    """
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        debtor_request=debtor_request,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_document_processing(debtor_request, field='document'):
+    """
+    Ставит в очередь проверку документа заявки, если документ загружен.
+
+    Аргументы:
+        debtor_request (AddDebtorUser): Заявка.
+        field (str): Поле документа: 'document' или 'deletion_document'.
+
+    Возвращает:
+        Job | None: Созданная задача или None, если документа нет.
+    """
+    if not getattr(debtor_request, field):
+        return None
+    return enqueue(PROCESS_DOCUMENT, {'field': field}, debtor_request=debtor_request)
+
+
+def enqueue_document_processing_many(debtor_requests):
+    """
+    Ставит в очередь проверку документов нескольких заявок одним запросом INSERT.
+
+    Аргументы:
+        debtor_requests (Iterable[AddDebtorUser]): Сохраненные заявки.
+
+    Возвращает:
+        list[Job]: Созданные задачи (только для заявок с документом).
+    """
+    now = timezone.now()
+    return Job.objects.bulk_create([
+        Job(kind=PROCESS_DOCUMENT, payload={'field': 'document'}, debtor_request=debtor_request, run_after=now)
+        for debtor_request in debtor_requests if debtor_request.document
+    ])
+
+
+def claim(worker_id, limit, lease=LEASE_SECONDS):
+    """
+    Захватывает до limit задач, готовых к выполнению.
+
+    Готовы задачи в очереди, время которых наступило, и выполняющиеся задачи с истекшей арендой.
+    Задачи с истекшей арендой, исчерпавшие попытки, помечаются как неудачные.
+
+    Аргументы:
+        worker_id (str): Идентификатор обработчика.
+        limit (int): Максимальное количество задач.
+        lease (float): Длительность аренды в секундах.
+
+    Возвращает:
+        list[tuple[int, datetime]]: Идентификаторы захваченных задач и срок их аренды; срок
+        передается в run и отличает этот захват от повторного захвата той же задачи.
+    """
+    now = timezone.now()
+    expired = Q(status='running', locked_until__lt=now)
+    with transaction.atomic():
+        Job.objects.filter(expired, attempts__gte=F('max_attempts')).update(
+            status='failed', last_error='Истекла аренда задачи.', locked_by='', locked_until=None, updated_at=now
+        )
+        ready = Q(status='queued', run_after__lte=now) | expired
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True).filter(ready)
+            .order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        locked_until = now + timedelta(seconds=lease)
+        # Условие ready повторяется в UPDATE, поэтому задачу, захваченную параллельно, он не тронет
+        Job.objects.filter(ready, id__in=ids).update(
+            status='running', locked_by=worker_id, locked_until=locked_until,
+            attempts=F('attempts') + 1, updated_at=now,
+        )
+        return [
+            (job_id, locked_until) for job_id in
+            Job.objects.filter(id__in=ids, locked_by=worker_id, locked_until=locked_until)
+            .order_by('run_after', 'id').values_list('id', flat=True)
+        ]
+
+
+def run(job_id, worker_id, locked_until):
+    """
+    Выполняет захваченную задачу и сохраняет результат.
+
+    Результат записывается, только если задача все еще арендована этим захватом: процессы пула
+    используют общий worker_id, поэтому после истечения аренды задачу может снова захватить тот же
+    обработчик, и результат устаревшего выполнения отличается только сроком аренды.
+
+    Аргументы:
+        job_id (int): Идентификатор задачи.
+        worker_id (str): Идентификатор обработчика.
+        locked_until (datetime): Срок аренды, который вернул claim.
+
+    Возвращает:
+        str: Итоговый статус задачи.
+    """
+    job = Job.objects.get(pk=job_id)
+    mine = Job.objects.filter(pk=job_id, locked_by=worker_id, locked_until=locked_until, status='running')
+    now = timezone.now()
+    try:
+        func = HANDLERS.get(job.kind)
+        if func is None:
+            raise PermanentJobError(f'Неизвестный тип задачи {job.kind}.')
+        result = func(job)
+    except PermanentJobError as e:
+        logger.warning("Задача %s (%s) завершилась ошибкой: %s", job_id, job.kind, e)
+        status, changes = 'failed', {'last_error': str(e)}
+    except Exception as e:
+        if job.attempts >= job.max_attempts:
+            logger.exception("Задача %s (%s) исчерпала попытки.", job_id, job.kind)
+            status, changes = 'failed', {'last_error': repr(e)}
+        else:
+            delay = RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+            logger.warning("Задача %s (%s) будет повторена через %s с: %r", job_id, job.kind, delay, e)
+            status, changes = 'queued', {'last_error': repr(e), 'run_after': now + timedelta(seconds=delay)}
+    else:
+        status, changes = 'done', {'result': result, 'last_error': ''}
+    mine.update(status=status, locked_by='', locked_until=None, updated_at=timezone.now(), **changes)
+    return status
+
+
+def init_worker_process():
+    """
+    Подготавливает дочерний процесс пула.
+
+    Повторный django.setup() заново настраивает логирование: поток слушателя очереди логов
+    не переживает fork. Соединения с базой родитель закрывает до создания пула, поэтому дочерний
+    процесс открывает собственные.
+    """
+    import django
+    django.setup()
+
+
+# Обработчики задач
+
+MAX_DOCUMENT_SIZE = 20 * 1024 * 1024
+SNIFF_BYTES = 8
+# Сигнатуры начала файла для определения типа документа
+MIME_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+)
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+# Сколько байт предыдущего блока учитывать при поиске страниц PDF на границе блоков
+PDF_PAGE_OVERLAP = 32
+
+
+def sniff_mime_type(head):
+    """
+    Определяет тип документа по первым байтам.
+
+    Аргументы:
+        head (bytes): Начало файла.
+
+    Возвращает:
+        str | None: MIME-тип или None, если тип не распознан.
+    """
+    for signature, mime_type in MIME_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+@handler(PROCESS_DOCUMENT)
+def process_document(job):
+    """
+    Проверяет документ заявки: считает SHA-256 и размер, определяет тип и число страниц PDF.
+
+    Аргументы:
+        job (Job): Задача с payload {'field': 'document' | 'deletion_document'}.
+
+    Возвращает:
+        dict: Контрольная сумма, размер, MIME-тип и количество страниц (для PDF).
+
+    Исключения:
+        PermanentJobError: Если документа нет, он слишком большой или его тип не поддерживается.
+    """
+    field = job.payload.get('field', 'document')
+    try:
+        document = getattr(AddDebtorUser.objects.only(field).get(pk=job.debtor_request_id), field)
+    except AddDebtorUser.DoesNotExist:
+        raise PermanentJobError('Заявка удалена.')
+    if not document:
+        raise PermanentJobError('У заявки нет документа.')
+
+    digest = hashlib.sha256()
+    size = pages = 0
+    head = tail = b''
+    with document.open('rb') as file:
+        for chunk in file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+            if size > MAX_DOCUMENT_SIZE:
+                raise PermanentJobError(f'Документ больше {MAX_DOCUMENT_SIZE // (1024 * 1024)} МБ.')
+            if len(head) < SNIFF_BYTES:
+                head += chunk[:SNIFF_BYTES - len(head)]
+            window = tail + chunk
+            pages += len(PDF_PAGE.findall(window)) - len(PDF_PAGE.findall(tail))
+            tail = window[-PDF_PAGE_OVERLAP:]
+
+    mime_type = sniff_mime_type(head)
+    if mime_type is None:
+        raise PermanentJobError('Неподдерживаемый тип документа.')
+    return {
+        'sha256': digest.hexdigest(),
+        'size': size,
+        'mime_type': mime_type,
+        'pages': pages if mime_type == 'application/pdf' else None,
+    }
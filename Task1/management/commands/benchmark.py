@@ -0,0 +1,61 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from Task1 import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время, количество запросов и память горячих представлений на разных объемах данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', type=int, nargs='+', default=list(benchmarks.DEFAULT_SCALES),
+            help='Объемы реестра (количество дебиторов)',
+        )
+        parser.add_argument('--repeat', type=int, default=benchmarks.DEFAULT_REPEAT, help='Запусков на сценарий')
+        parser.add_argument('--only', nargs='+', help='Выполнить только указанные сценарии')
+        parser.add_argument('--workers', type=int, default=1, help='Процессов для генерации данных')
+        parser.add_argument('--output', default='benchmark_results.json', help='Куда сохранить результаты')
+        parser.add_argument('--compare', help='Базовая линия для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=benchmarks.DEFAULT_THRESHOLD,
+            help='Допустимый относительный рост времени и памяти (0.2 = 20%%)',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу, чтобы не генерировать данные заново при следующем запуске',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['only'] or ()) - {scenario.name for scenario in benchmarks.SCENARIOS}
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+        baseline = benchmarks.load(options['compare']) if options['compare'] else None
+
+        # Бенчмарк работает на отдельной тестовой базе и не трогает рабочие данные и файлы
+        setup_test_environment()
+        old_config = setup_databases(verbosity=options['verbosity'], interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='benchmark-media-')):
+                results = benchmarks.run(
+                    scales=options['scales'], repeat=options['repeat'], only=options['only'],
+                    workers=options['workers'], stdout=self.stdout,
+                )
+        finally:
+            teardown_databases(old_config, verbosity=options['verbosity'], keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        benchmarks.save(results, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+        if baseline is not None:
+            regressions = benchmarks.compare(baseline, results, options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                raise CommandError(f'Обнаружено регрессий: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно базовой линии не обнаружено'))
@@ -0,0 +1,46 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from Task1 import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает одновременные чтения и записи реестра при настройках SQLite по умолчанию и с SQLITE_PRAGMAS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=100_000, help='Объем реестра (количество дебиторов)')
+        parser.add_argument(
+            '--duration', type=float, default=benchmarks.DEFAULT_READ_WRITE_DURATION,
+            help='Длительность измерения каждого режима в секундах',
+        )
+        parser.add_argument('--readers', type=int, default=benchmarks.DEFAULT_READERS, help='Читающих потоков')
+        parser.add_argument('--writers', type=int, default=benchmarks.DEFAULT_WRITERS, help='Пишущих потоков')
+        parser.add_argument('--workers', type=int, default=1, help='Процессов для генерации данных')
+        parser.add_argument('--output', default='read_write_results.json', help='Куда сохранить результаты')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу, чтобы не генерировать данные заново при следующем запуске',
+        )
+
+    def handle(self, *args, **options):
+        # Бенчмарк работает на отдельной тестовой базе и не трогает рабочие данные и файлы
+        setup_test_environment()
+        old_config = setup_databases(verbosity=options['verbosity'], interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='benchmark-media-')):
+                results = benchmarks.read_write_throughput(
+                    options['scale'], duration=options['duration'], readers=options['readers'],
+                    writers=options['writers'], workers=options['workers'], stdout=self.stdout,
+                )
+        finally:
+            teardown_databases(old_config, verbosity=options['verbosity'], keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
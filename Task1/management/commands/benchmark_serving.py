@@ -0,0 +1,53 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from Task1 import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность представлений реестра при обслуживании через WSGI и ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=100_000, help='Объем реестра (количество дебиторов)')
+        parser.add_argument(
+            '--requests', type=int, default=benchmarks.DEFAULT_SERVING_REQUESTS,
+            help='Запросов на адрес и режим',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=benchmarks.DEFAULT_SERVING_CONCURRENCY,
+            help='Одновременно обрабатываемых запросов',
+        )
+        parser.add_argument('--only', nargs='+', help='Измерить только указанные адреса')
+        parser.add_argument('--workers', type=int, default=1, help='Процессов для генерации данных')
+        parser.add_argument('--output', default='serving_results.json', help='Куда сохранить результаты')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу, чтобы не генерировать данные заново при следующем запуске',
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['only'] or ()) - set(benchmarks.SERVING_PATHS)
+        if unknown:
+            raise CommandError(f"Неизвестные адреса: {', '.join(sorted(unknown))}")
+
+        # Бенчмарк работает на отдельной тестовой базе и не трогает рабочие данные и файлы
+        setup_test_environment()
+        old_config = setup_databases(verbosity=options['verbosity'], interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='benchmark-media-')):
+                results = benchmarks.serving_throughput(
+                    options['scale'], requests=options['requests'], concurrency=options['concurrency'],
+                    only=options['only'], workers=options['workers'], stdout=self.stdout,
+                )
+        finally:
+            teardown_databases(old_config, verbosity=options['verbosity'], keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
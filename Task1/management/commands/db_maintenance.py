@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Task1 import sqlite_tuning
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживает базу SQLite: ANALYZE, PRAGMA optimize, VACUUM и контрольная точка WAL. '
+        'auto_vacuum=INCREMENTAL из SQLITE_PRAGMAS действует только для новых баз и после полного VACUUM '
+        '(--vacuum); режим WAL сохраняется в файле базы, в том числе в db.sqlite3 из репозитория, '
+        'и не отключается настройкой SQLITE_TUNING=0 (вернуть журнал: PRAGMA journal_mode=DELETE)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Алиас базы')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Полный VACUUM вместо инкрементального (блокирует запись на время работы)',
+        )
+        parser.add_argument('--pages', type=int, help='Сколько свободных страниц вернуть инкрементальным VACUUM')
+
+    def handle(self, *args, **options):
+        if options['database'] not in settings.DATABASES:
+            raise CommandError(f"Неизвестная база: {options['database']}")
+        try:
+            result = sqlite_tuning.maintain(
+                options['database'], vacuum=options['vacuum'], incremental_pages=options['pages'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for step, elapsed in result['steps'].items():
+            self.stdout.write(f'{step:<20} {elapsed:.3f} с')
+        for label in ('before', 'after'):
+            size = result[label]
+            self.stdout.write(
+                f"{'До' if label == 'before' else 'После':<6} база {size['file_bytes']} байт, "
+                f"WAL {size['wal_bytes']} байт, свободных страниц {size['freelist_count']} из {size['page_count']}"
+            )
+        before = result['before']['file_bytes'] + result['before']['wal_bytes']
+        after = result['after']['file_bytes'] + result['after']['wal_bytes']
+        self.stdout.write(self.style.SUCCESS(f'Освобождено {before - after} байт'))
+        if result['auto_vacuum'] == 'none':
+            self.stdout.write(self.style.WARNING(
+                'auto_vacuum выключен: свободные страницы возвращает только полный VACUUM. '
+                'Выполните db_maintenance --vacuum, чтобы включить auto_vacuum=INCREMENTAL.'
+            ))
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Task1 import export, replicas
+
+
+class Command(BaseCommand):
+    help = 'Выгружает реестр дебиторов в CSV (UTF-8 с BOM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--region', help='Регион')
+        parser.add_argument('--city', help='Город')
+        parser.add_argument('--from', dest='created_from', help='Начальная дата создания, ГГГГ-ММ-ДД')
+        parser.add_argument('--to', dest='created_to', help='Конечная дата создания, ГГГГ-ММ-ДД')
+        parser.add_argument('--output', '-o', help='Путь к файлу; по умолчанию вывод в stdout')
+
+    def handle(self, *args, **options):
+        try:
+            debtors = export.filter_debtors(
+                region=options['region'],
+                city=options['city'],
+                created_from=options['created_from'],
+                created_to=options['created_to'],
+            )
+        except export.ExportFilterError as e:
+            raise CommandError(str(e))
+        # Выгрузка читается с реплики, если она настроена и не слишком отстает
+        debtors = replicas.on_replica(debtors)
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        rows = -1  # заголовок не считается
+        try:
+            for line in export.iter_csv(debtors):
+                output.write(line)
+                rows += 1
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Выгружено дебиторов: {rows} в {options['output']}"))
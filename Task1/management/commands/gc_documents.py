@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Task1.storage import collect_garbage, document_storage
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из хранилища документов файлы, на которые не ссылается ни одна заявка'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help='Не удалять файлы, загруженные меньше указанного количества часов назад',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, сколько файлов будет удалено')
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0:
+            raise CommandError('Параметр --grace-hours не может быть отрицательным')
+        removed, freed = collect_garbage(
+            document_storage(), timedelta(hours=options['grace_hours']), dry_run=options['dry_run']
+        )
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {removed}, освобождается {freed / 1024 / 1024:.1f} МБ'
+        ))
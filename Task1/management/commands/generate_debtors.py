@@ -1,37 +1,88 @@
 import random
-from django.core.management.base import BaseCommand
-from faker import Faker
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Task1.fake_data import generate_batch
 from Task1.models import Debtor, NewUsers
 
+
+@contextmanager
+def historical_timestamps(model):
+    """
+    Временно отключает auto_now и auto_now_add у created_at и updated_at, чтобы bulk_create
+    сохранил сгенерированные исторические даты.
+    """
+    fields = [model._meta.get_field('created_at'), model._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
 class Command(BaseCommand):
-    help = 'Генерирует 50 случайных должников для базы данных'
-
-    def handle(self, *args, **kwargs):
-        fake = Faker('ru_RU')  # Используем русскую локализацию для Faker
-
-        # Получаем всех пользователей (можно заменить на конкретных пользователей, если нужно)
-        users = NewUsers.objects.all()
-
-        regions = ['Московская область', 'Ленинградская область', 'Татарстан', 'Краснодарский край', 'Кемеровская область']
-        cities = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Краснодар']
-
-        # Генерация 50 должников
-        for _ in range(100):
-            # Выбираем случайного пользователя
-            user = random.choice(users)
-
-            # Генерация случайных данных для должника
-            debtor = Debtor(
-                user=user,
-                name=fake.first_name(),
-                surname=fake.last_name(),
-                amount=round(random.uniform(1000, 100000), 2),  # Генерируем случайную сумму долга от 1000 до 100000
-                address=fake.address(),
-                region=random.choice(regions),
-                city=random.choice(cities),
-                created_at=fake.date_this_decade(),
-                updated_at=fake.date_this_year()
-            )
-            debtor.save()
-
-        self.stdout.write(self.style.SUCCESS('Успешно созданы 50 случайных должников'))
+    help = 'Генерирует случайных должников для базы данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100, help='Количество должников')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Размер пачки генерации и bulk_create')
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов для генерации данных')
+        parser.add_argument('--seed', type=int, help='Начальное значение генератора для воспроизводимых данных')
+
+    def handle(self, *args, **options):
+        count, batch_size, workers = options['count'], options['batch_size'], options['workers']
+        if count < 1 or batch_size < 1 or workers < 1:
+            raise CommandError('Параметры --count, --batch-size и --workers должны быть положительными')
+
+        # Получаем идентификаторы всех пользователей один раз
+        user_ids = list(NewUsers.objects.values_list('id', flat=True))
+        if not user_ids:
+            raise CommandError('В базе нет пользователей, которым можно назначить должников')
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 31)
+        sizes = [min(batch_size, count - start) for start in range(0, count, batch_size)]
+        started = time.monotonic()
+        created = 0
+        with historical_timestamps(Debtor):
+            for rows in self._generate(seed, sizes, user_ids, workers):
+                with transaction.atomic():
+                    Debtor.objects.bulk_create(
+                        [Debtor(**dict(row, amount=Decimal(str(row['amount'])))) for row in rows]
+                    )
+                created += len(rows)
+                self.stdout.write(f'Создано {created} из {count}', ending='\r')
+                self.stdout.flush()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Успешно созданы {created} случайных должников за {elapsed:.1f} с (seed={seed})'
+        ))
+
+    @staticmethod
+    def _generate(seed, sizes, user_ids, workers):
+        """
+        Возвращает пачки строк по порядку; при workers > 1 пачки генерируются в пуле процессов,
+        причем вперед генерируется не больше 2 * workers пачек, чтобы не накапливать их в памяти.
+        """
+        if workers == 1:
+            for index, size in enumerate(sizes):
+                yield generate_batch(seed + index, size, user_ids)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            for index, size in enumerate(sizes):
+                pending.append(executor.submit(generate_batch, seed + index, size, user_ids))
+                if len(pending) >= 2 * workers:
+                    yield pending.pop(0).result()
+            for future in pending:
+                yield future.result()
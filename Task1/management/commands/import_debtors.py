@@ -0,0 +1,49 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from Task1 import bulk_upload
+from Task1.models import NewUsers
+
+
+class Command(BaseCommand):
+    help = 'Создает заявки на добавление дебиторов из файла CSV или XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Путь к таблице дебиторов (CSV или XLSX)')
+        parser.add_argument('--user', required=True, help='Логин пользователя, от имени которого создаются заявки')
+        parser.add_argument('--documents', help='Путь к ZIP-архиву с документами')
+        parser.add_argument('--chunk-size', type=int, default=bulk_upload.CHUNK_SIZE, help='Размер пачки bulk_create')
+        parser.add_argument('--report', help='Куда сохранить CSV-отчет об ошибках')
+
+    def handle(self, *args, **options):
+        try:
+            user = NewUsers.objects.get(username=options['user'])
+        except NewUsers.DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+
+        documents = open(options['documents'], 'rb') if options['documents'] else None
+        try:
+            with open(options['file'], 'rb') as file:
+                result = bulk_upload.import_debtor_requests(
+                    user, file, os.path.basename(options['file']),
+                    documents=documents, chunk_size=options['chunk_size'],
+                )
+        except bulk_upload.BulkImportError as e:
+            raise CommandError(str(e))
+        finally:
+            if documents:
+                documents.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано заявок: {result.created}, строк с ошибками: {len(result.errors)}'
+        ))
+        if result.errors:
+            if options['report']:
+                with default_storage.open(result.report_name, 'rb') as report, \
+                        open(options['report'], 'wb') as target:
+                    target.write(report.read())
+                self.stdout.write(f"Отчет об ошибках сохранен в {options['report']}")
+            else:
+                self.stdout.write(f'Отчет об ошибках: {result.report_name}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Task1 import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс реестра дебиторов'
+
+    def handle(self, *args, **kwargs):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING('Полнотекстовый индекс поддерживается только для SQLite'))
+            return
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Индекс перестроен, проиндексировано дебиторов: {indexed}'))
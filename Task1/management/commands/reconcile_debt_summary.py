@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from Task1 import aggregates
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводку долгов по регионам и городам из таблицы дебиторов'
+
+    def handle(self, *args, **kwargs):
+        summary_rows, debtors = aggregates.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводка пересобрана: строк {summary_rows}, дебиторов {debtors}'
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Task1 import replicas
+
+
+class Command(BaseCommand):
+    help = 'Обновляет локальные реплики SQLite копированием основной базы через backup API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias', nargs='+',
+            help='Алиасы реплик; по умолчанию DATABASE_REPLICAS или replica, если список пуст',
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Обновлять раз в указанное количество секунд, пока команду не остановят',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=replicas.BACKUP_PAGES, help='Страниц, копируемых за один шаг',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['alias'] or settings.DATABASE_REPLICAS or ['replica']
+        unknown = set(aliases) - set(settings.DATABASES)
+        if unknown:
+            raise CommandError(f"Неизвестные базы: {', '.join(sorted(unknown))}")
+        while True:
+            for alias in aliases:
+                try:
+                    elapsed = replicas.refresh_sqlite_replica(alias, pages=options['pages'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f'Реплика {alias} обновлена за {elapsed:.2f} с')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,93 @@
+import logging
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Task1 import jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Количество процессов-исполнителей')
+        parser.add_argument('--lease', type=float, default=jobs.LEASE_SECONDS, help='Длительность аренды задачи, с')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--once', action='store_true', help='Завершиться, когда в очереди не останется готовых задач')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['lease'] <= 0 or options['poll_interval'] < 0:
+            raise CommandError('Параметры --concurrency и --lease должны быть положительными')
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.options = options
+        try:
+            if options['concurrency'] == 1:
+                processed = self._run_inline()
+            else:
+                processed = self._run_pool()
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено пользователем')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {processed}'))
+
+    def _run_inline(self):
+        processed = 0
+        while True:
+            claimed = jobs.claim(self.worker_id, 1, lease=self.options['lease'])
+            if not claimed:
+                if self.options['once']:
+                    return processed
+                time.sleep(self.options['poll_interval'])
+                continue
+            for job_id, locked_until in claimed:
+                jobs.run(job_id, self.worker_id, locked_until)
+                processed += 1
+
+    def _run_pool(self):
+        """
+        Захватывает задачи в основном процессе и выполняет их в пуле, держа заняты все процессы.
+
+        Непредвиденная ошибка задачи записывается в лог и не останавливает обработчик. Если дочерний
+        процесс аварийно завершился, пул создается заново; его незавершенные задачи вернутся
+        в очередь по истечении аренды.
+        """
+        concurrency = self.options['concurrency']
+        processed = 0
+        while True:
+            # Дочерние процессы не должны наследовать открытые соединения с базой
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=concurrency, initializer=jobs.init_worker_process) as executor:
+                running = {}
+                broken = False
+                while not broken:
+                    free = concurrency - len(running)
+                    claimed = jobs.claim(self.worker_id, free, lease=self.options['lease']) if free else []
+                    try:
+                        for job_id, locked_until in claimed:
+                            running[executor.submit(jobs.run, job_id, self.worker_id, locked_until)] = job_id
+                    except BrokenProcessPool:
+                        broken = True
+                    if not running:
+                        if self.options['once'] and not broken:
+                            return processed
+                        time.sleep(self.options['poll_interval'])
+                        continue
+                    done, _ = wait(running, timeout=self.options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            future.result()
+                        except BrokenProcessPool:
+                            broken = True
+                        except Exception:
+                            logger.exception("Задача %s завершилась непредвиденной ошибкой.", job_id)
+                        else:
+                            processed += 1
+            logger.error("Процесс пула аварийно завершился, пул обработчиков создается заново.")
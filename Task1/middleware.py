@@ -0,0 +1,205 @@
+"""
+Промежуточные слои приложения Task1.
+
+QueryInstrumentationMiddleware собирает статистику SQL-запросов каждого HTTP-запроса без включения
+DEBUG: количество запросов, суммарное время, самые медленные запросы и повторяющиеся «формы»
+запросов (признак N+1). Статистика отдается в заголовке Server-Timing и пишется одной
+структурированной строкой JSON в лог Task1.sql.
+
+ReplicaRoutingMiddleware задает режим чтения с реплик базы данных для запроса (см. Task1.replicas).
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import replicas
+
+sql_logger = logging.getLogger('Task1.sql')
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+class _JsonMessage:
+    # Строка JSON собирается только при форматировании записи: выборочное логирование
+    # (SamplingFilter) отбрасывает запись раньше, а форматирует ее поток QueueListener
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return json.dumps(self.data, ensure_ascii=False)
+
+
+def query_shape(sql):
+    """
+    Приводит SQL-запрос к «форме», не зависящей от значений параметров.
+
+    Числа и строковые литералы заменяются на ?, списки IN любой длины сворачиваются в IN (...).
+    Запросы, отличающиеся только параметрами, получают одинаковую форму.
+
+    Аргументы:
+        sql (str): Текст запроса.
+
+    Возвращает:
+        str: Форма запроса.
+    """
+    shape = _IN_LIST_RE.sub('IN (...)', sql)
+    shape = _STRING_RE.sub('?', shape)
+    shape = _NUMBER_RE.sub('?', shape)
+    return shape.replace('%s', '?')
+
+
+def repeated_shapes(queries, threshold):
+    """
+    Находит формы запросов, повторившиеся не меньше threshold раз.
+
+    Аргументы:
+        queries (Iterable[str]): Тексты запросов.
+        threshold (int): Минимальное количество повторов.
+
+    Возвращает:
+        list[tuple[str, int]]: Формы запросов и число повторов, от самых частых.
+    """
+    counts = Counter(query_shape(sql) for sql in queries)
+    return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+class QueryRecorder:
+    """
+    Обертка выполнения запросов (connection.execute_wrapper), запоминающая текст и длительность.
+
+    Атрибуты:
+        queries (list[tuple[str, float]]): Текст запроса и время выполнения в миллисекундах.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    @property
+    def total_ms(self):
+        return sum(duration for _, duration in self.queries)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Промежуточный слой, измеряющий SQL-запросы каждого HTTP-запроса.
+
+    Настройки (все необязательные):
+        SQL_INSTRUMENTATION_SLOWEST (int): Сколько самых медленных запросов писать в лог (3).
+        SQL_INSTRUMENTATION_REPEAT_THRESHOLD (int): С какого числа повторов одной формы
+            запроса выдавать предупреждение о N+1 (5).
+        SQL_INSTRUMENTATION_SERVER_TIMING (bool): Добавлять ли заголовок Server-Timing (True).
+
+    Запросы, выполняемые при чтении потокового ответа, в статистику не попадают.
+    Работает и в синхронной (WSGI), и в асинхронной (ASGI) цепочке промежуточных слоев.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slowest = getattr(settings, 'SQL_INSTRUMENTATION_SLOWEST', 3)
+        self.repeat_threshold = getattr(settings, 'SQL_INSTRUMENTATION_REPEAT_THRESHOLD', 5)
+        self.server_timing = getattr(settings, 'SQL_INSTRUMENTATION_SERVER_TIMING', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _instrument(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self._instrument(recorder):
+            response = self.get_response(request)
+        return self._report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        # Соединения с базой привязаны к потоку: асинхронный ORM выполняет запросы в потоке
+        # sync_to_async(thread_sensitive=True), поэтому и обертка ставится в этом потоке
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = await sync_to_async(self._instrument)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._report(request, response, recorder, started)
+
+    def _report(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+
+        if self.server_timing:
+            timing = (
+                f'db;dur={recorder.total_ms:.2f};desc="{len(recorder.queries)} queries", '
+                f'app;dur={total_ms:.2f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        repeated = repeated_shapes((sql for sql, _ in recorder.queries), self.repeat_threshold)
+        if sql_logger.isEnabledFor(logging.INFO) or repeated:
+            slowest = sorted(recorder.queries, key=lambda query: query[1], reverse=True)[:self.slowest]
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': len(recorder.queries),
+                'db_ms': round(recorder.total_ms, 2),
+                'total_ms': round(total_ms, 2),
+                'slowest': [{'sql': sql[:500], 'ms': round(duration, 2)} for sql, duration in slowest],
+            }
+            if repeated:
+                record['repeated'] = [{'shape': shape[:500], 'count': count} for shape, count in repeated]
+                sql_logger.warning('%s', _JsonMessage(record))
+            else:
+                sql_logger.info('%s', _JsonMessage(record))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Промежуточный слой, включающий чтение реестра с реплик для безопасных запросов.
+
+    Должен стоять выше SessionMiddleware, чтобы сохранение сессии тоже считалось записью.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = replicas.request_state(request)
+        return replicas.finish_request(self.get_response(request), token)
+
+    async def __acall__(self, request):
+        token = replicas.request_state(request)
+        return replicas.finish_request(await self.get_response(request), token)
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0005_adddebtoruser_index_key_debtor_index_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adddebtoruser',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В обработке'), ('approved', 'Одобрено'), ('added', 'Добавлено в базу'), ('rejected', 'Отклонено'), ('deleting', 'Удаляется'), ('deleted', 'Удалено'), ('update_requested', 'Запрос на обновление'), ('under_review', 'На проверке'), ('approved_for_update', 'Одобрено для обновления'), ('updated_in_db', 'Обновлено в базе')], default='pending', max_length=20, verbose_name='Статус'),
+        ),
+        migrations.AlterField(
+            model_name='debtor',
+            name='address',
+            field=models.CharField(max_length=100, verbose_name='Адрес должника'),
+        ),
+        migrations.AlterField(
+            model_name='debtor',
+            name='city',
+            field=models.CharField(max_length=100, verbose_name='Город'),
+        ),
+        migrations.AlterField(
+            model_name='debtor',
+            name='index_key',
+            field=models.IntegerField(null=True, unique=True, verbose_name='Индекс'),
+        ),
+        migrations.AlterField(
+            model_name='debtor',
+            name='region',
+            field=models.CharField(max_length=100, verbose_name='Регион'),
+        ),
+        migrations.AddIndex(
+            model_name='debtor',
+            index=models.Index(fields=['created_at'], name='debtor_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debtor',
+            index=models.Index(fields=['updated_at'], name='debtor_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debtor',
+            index=models.Index(fields=['amount'], name='debtor_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debtor',
+            index=models.Index(fields=['surname'], name='debtor_surname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='debtor',
+            index=models.Index(fields=['region', 'city'], name='debtor_region_city_idx'),
+        ),
+    ]
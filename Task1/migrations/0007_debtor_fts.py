@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# Значение поля в том виде, в котором оно попадает в индекс: «ё» заменяется на «е»,
+# регистр приводит токенизатор unicode61.
+FOLD = "replace(replace({row}.{field}, 'ё', 'е'), 'Ё', 'Е')"
+FIELDS = ('name', 'surname', 'address', 'region', 'city')
+
+
+def _values(row):
+    return ', '.join(FOLD.format(row=row, field=field) for field in FIELDS)
+
+
+COLUMNS = ', '.join(FIELDS)
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE task1_debtor_fts USING fts5(
+        {COLUMNS}, content='', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER task1_debtor_fts_ai AFTER INSERT ON Task1_debtor BEGIN
+        INSERT INTO task1_debtor_fts(rowid, {COLUMNS}) VALUES (new.id, {_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER task1_debtor_fts_ad AFTER DELETE ON Task1_debtor BEGIN
+        INSERT INTO task1_debtor_fts(task1_debtor_fts, rowid, {COLUMNS})
+        VALUES ('delete', old.id, {_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER task1_debtor_fts_au AFTER UPDATE OF {COLUMNS} ON Task1_debtor BEGIN
+        INSERT INTO task1_debtor_fts(task1_debtor_fts, rowid, {COLUMNS})
+        VALUES ('delete', old.id, {_values('old')});
+        INSERT INTO task1_debtor_fts(rowid, {COLUMNS}) VALUES (new.id, {_values('new')});
+    END
+    """,
+    f"""
+    INSERT INTO task1_debtor_fts(rowid, {COLUMNS}) SELECT id, {_values('Task1_debtor')} FROM Task1_debtor
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS task1_debtor_fts_au',
+    'DROP TRIGGER IF EXISTS task1_debtor_fts_ad',
+    'DROP TRIGGER IF EXISTS task1_debtor_fts_ai',
+    'DROP TABLE IF EXISTS task1_debtor_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0006_debtor_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+# Триггеры поддерживают сводку в той же транзакции, что и изменение Task1_debtor.
+INCREMENT = """
+    INSERT INTO Task1_debtsummary(region, city, debtor_count, total_amount)
+    VALUES ({row}.region, {row}.city, 1, {row}.amount)
+    ON CONFLICT(region, city) DO UPDATE SET
+        debtor_count = debtor_count + 1,
+        total_amount = total_amount + excluded.total_amount;
+"""
+DECREMENT = """
+    UPDATE Task1_debtsummary
+    SET debtor_count = debtor_count - 1, total_amount = total_amount - {row}.amount
+    WHERE region = {row}.region AND city = {row}.city;
+    DELETE FROM Task1_debtsummary
+    WHERE region = {row}.region AND city = {row}.city AND debtor_count = 0;
+"""
+
+CREATE_SQL = [
+    f"""
+    CREATE TRIGGER task1_debtsummary_ai AFTER INSERT ON Task1_debtor BEGIN
+        {INCREMENT.format(row='new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER task1_debtsummary_ad AFTER DELETE ON Task1_debtor BEGIN
+        {DECREMENT.format(row='old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER task1_debtsummary_au AFTER UPDATE OF amount, region, city ON Task1_debtor BEGIN
+        {DECREMENT.format(row='old')}
+        {INCREMENT.format(row='new')}
+    END
+    """,
+    """
+    INSERT INTO Task1_debtsummary(region, city, debtor_count, total_amount)
+    SELECT region, city, COUNT(*), SUM(amount) FROM Task1_debtor GROUP BY region, city
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS task1_debtsummary_au',
+    'DROP TRIGGER IF EXISTS task1_debtsummary_ad',
+    'DROP TRIGGER IF EXISTS task1_debtsummary_ai',
+]
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0007_debtor_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=100, verbose_name='Регион')),
+                ('city', models.CharField(max_length=100, verbose_name='Город')),
+                ('debtor_count', models.PositiveIntegerField(default=0, verbose_name='Количество дебиторов')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Общая сумма долга')),
+            ],
+            options={
+                'verbose_name': 'Сводка по региону',
+                'verbose_name_plural': 'Сводка по регионам',
+                'ordering': ['region', 'city'],
+                'constraints': [models.UniqueConstraint(fields=('region', 'city'), name='debtsummary_region_city_uniq')],
+            },
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
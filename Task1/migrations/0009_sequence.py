@@ -0,0 +1,36 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:17
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_index_key(apps, schema_editor):
+    # Продолжаем нумерацию с максимального index_key среди заявок и дебиторов
+    db_alias = schema_editor.connection.alias
+    initial = max(
+        apps.get_model('Task1', model_name).objects.using(db_alias).aggregate(Max('index_key'))['index_key__max'] or 0
+        for model_name in ('AddDebtorUser', 'Debtor')
+    )
+    apps.get_model('Task1', 'Sequence').objects.using(db_alias).create(name='index_key', value=initial)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0008_debtsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Имя последовательности')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Последнее выданное значение')),
+            ],
+            options={
+                'verbose_name': 'Последовательность',
+                'verbose_name_plural': 'Последовательности',
+            },
+        ),
+        migrations.RunPython(seed_index_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:40
+
+import time
+
+from django.db import migrations
+
+# Версия реестра дебиторов хранится в двух строках Task1_sequence: счетчик изменений и время
+# последнего изменения в миллисекундах Unix. Их увеличивает models.invalidate_registry_version
+# один раз за транзакцию, изменяющую Task1_debtor.
+SEQUENCES = ('debtor_registry', 'debtor_registry_modified')
+
+
+def create_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Sequence = apps.get_model('Task1', 'Sequence')
+    db_alias = schema_editor.connection.alias
+    initial = {'debtor_registry': 0, 'debtor_registry_modified': int(time.time() * 1000)}
+    for name in SEQUENCES:
+        Sequence.objects.using(db_alias).get_or_create(name=name, defaults={'value': initial[name]})
+
+
+def delete_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    apps.get_model('Task1', 'Sequence').objects.using(schema_editor.connection.alias).filter(name__in=SEQUENCES).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0009_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequences, delete_sequences),
+    ]
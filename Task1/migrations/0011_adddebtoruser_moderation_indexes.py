@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0010_registry_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationRequest',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Заявка на модерации',
+                'verbose_name_plural': 'Очередь модерации',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('Task1.adddebtoruser',),
+        ),
+        migrations.AddIndex(
+            model_name='adddebtoruser',
+            index=models.Index(fields=['status', 'created_at'], name='request_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adddebtoruser',
+            index=models.Index(fields=['user', 'status'], name='request_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adddebtoruser',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'deleting', 'update_requested'))), fields=['created_at'], name='request_active_created_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.1.3 on 2026-10-18 20:34
+
+import Task1.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+# Счетчик ссылок DocumentBlob равен числу полей document и deletion_document заявок, указывающих
+# на файл. Триггеры поддерживают его при любой записи в Task1_adddebtoruser, включая bulk_create
+# и массовые UPDATE/DELETE.
+ADJUST = """
+    UPDATE Task1_documentblob SET ref_count = ref_count {sign} 1 WHERE name = {row}.{column};
+"""
+
+
+def adjust(sign, row, *columns):
+    return ''.join(ADJUST.format(sign=sign, row=row, column=column) for column in columns)
+
+
+CREATE_SQL = [
+    f"""
+    CREATE TRIGGER task1_documentblob_ai AFTER INSERT ON Task1_adddebtoruser BEGIN
+        {adjust('+', 'new', 'document', 'deletion_document')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER task1_documentblob_ad AFTER DELETE ON Task1_adddebtoruser BEGIN
+        {adjust('-', 'old', 'document', 'deletion_document')}
+    END
+    """,
+] + [
+    f"""
+    CREATE TRIGGER task1_documentblob_au_{column} AFTER UPDATE OF {column} ON Task1_adddebtoruser
+    WHEN old.{column} IS NOT new.{column} BEGIN
+        {adjust('-', 'old', column)}
+        {adjust('+', 'new', column)}
+    END
+    """
+    for column in ('document', 'deletion_document')
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS task1_documentblob_au_deletion_document',
+    'DROP TRIGGER IF EXISTS task1_documentblob_au_document',
+    'DROP TRIGGER IF EXISTS task1_documentblob_ad',
+    'DROP TRIGGER IF EXISTS task1_documentblob_ai',
+]
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Task1', '0011_adddebtoruser_moderation_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adddebtoruser',
+            name='deletion_document',
+            field=models.FileField(blank=True, null=True, storage=Task1.storage.document_storage, upload_to='deletion_documents/', verbose_name='Документ удаления'),
+        ),
+        migrations.AlterField(
+            model_name='adddebtoruser',
+            name='document',
+            field=models.FileField(storage=Task1.storage.document_storage, upload_to='documents/', verbose_name='Документ'),
+        ),
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Размер, байт')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='Количество ссылок')),
+                ('uploaded_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время загрузки')),
+            ],
+            options={
+                'verbose_name': 'Файл документа',
+                'verbose_name_plural': 'Файлы документов',
+                'indexes': [models.Index(fields=['ref_count', 'uploaded_at'], name='documentblob_gc_idx')],
+            },
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -1,11 +1,18 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password, check_password
 import logging
-from django.db.models.signals import pre_save
+import time
+from django.core.cache import cache
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db.models import Max
+from . import sqlite_tuning
+from .sequences import IndexKeyManager, IndexKeyQuerySet, index_keys
+from .storage import document_storage
 
 # Настроим логирование
 logger = logging.getLogger(__name__)
@@ -164,14 +171,18 @@ class NewUsers(AbstractBaseUser, PermissionsMixin):
         Переопределенный метод сохранения, который хэширует пароль перед сохранением.
 
         Если пароль не был предварительно захэширован, он будет захэширован с использованием метода make_password.
+        При сохранении с update_fields без поля password проверка пропускается.
         Вызывается метод save() родительского класса после этого.
 
         Параметры:
             *args: Дополнительные позиционные аргументы.
             **kwargs: Дополнительные именованные аргументы.
         """
-        if not self.password.startswith('pbkdf2_sha256$'):
-            self.password = make_password(self.password)
+        update_fields = kwargs.get('update_fields')
+        # Пароль проверяется, только если он сохраняется: обновление профиля его не трогает
+        if update_fields is None or 'password' in update_fields:
+            if not self.password.startswith('pbkdf2_sha256$'):
+                self.password = make_password(self.password)
         super().save(*args, **kwargs)
 
     def check_password(self, raw_password):
@@ -187,6 +198,39 @@ class NewUsers(AbstractBaseUser, PermissionsMixin):
         return check_password(raw_password, self.password)
 
 
+class DebtorQuerySet(IndexKeyQuerySet):
+    """
+    QuerySet дебиторов, увеличивающий версию реестра при массовых изменениях.
+
+    bulk_create, update (и bulk_update через него) и быстрое удаление _raw_delete не отправляют
+    сигналы post_save и post_delete, поэтому версия реестра увеличивается здесь. Изменения таблицы
+    дебиторов сырым SQL должны вызывать invalidate_registry_version явно.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            invalidate_registry_version(self.db)
+        return objs
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            invalidate_registry_version(self.db)
+        return rows
+
+    update.alters_data = True
+
+    def _raw_delete(self, using):
+        rows = super()._raw_delete(using)
+        if rows:
+            invalidate_registry_version(using)
+        return rows
+
+
+DebtorManager = models.Manager.from_queryset(DebtorQuerySet)
+
+
 class Debtor(models.Model):
     """
     Модель для должников.
@@ -231,6 +275,110 @@ class Debtor(models.Model):
     # Уникальный индекс
     index_key = models.IntegerField(null=True, verbose_name='Индекс', unique=True)
 
+    # Менеджер, выдающий index_key и при bulk_create и обновляющий версию реестра при массовых изменениях
+    objects = DebtorManager()
+
+    class Meta:
+        # Индексы под серверную сортировку таблицы дебиторов (см. views.debtors_datatable)
+        indexes = [
+            models.Index(fields=['created_at'], name='debtor_created_at_idx'),
+            models.Index(fields=['updated_at'], name='debtor_updated_at_idx'),
+            models.Index(fields=['amount'], name='debtor_amount_idx'),
+            models.Index(fields=['surname'], name='debtor_surname_idx'),
+            models.Index(fields=['region', 'city'], name='debtor_region_city_idx'),
+        ]
+
+
+class Sequence(models.Model):
+    """
+    Модель именованного счетчика для выдачи уникальных значений.
+
+    Каждая строка — отдельная последовательность. Значения выдаются функциями модуля sequences,
+    которые увеличивают поле value атомарным UPDATE внутри транзакции.
+
+    Атрибуты:
+        name (str): Имя последовательности.
+        value (int): Последнее выданное значение.
+    """
+
+    name = models.CharField(max_length=50, primary_key=True, verbose_name='Имя последовательности')
+    value = models.BigIntegerField(default=0, verbose_name='Последнее выданное значение')
+
+    class Meta:
+        verbose_name = 'Последовательность'
+        verbose_name_plural = 'Последовательности'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class DebtSummary(models.Model):
+    """
+    Модель сводной статистики долгов по регионам и городам.
+
+    Каждая строка хранит количество дебиторов и общую сумму их долга для пары (регион, город).
+    Таблица поддерживается триггерами базы данных (см. миграцию 0008_debtsummary) в той же транзакции,
+    что и изменение Debtor, поэтому учитывает любые способы записи: save(), bulk_create(), update(),
+    delete() и действия администратора. Для полной пересборки используется команда reconcile_debt_summary.
+
+    Атрибуты:
+        region (str): Регион.
+        city (str): Город.
+        debtor_count (int): Количество дебиторов в регионе и городе.
+        total_amount (Decimal): Общая сумма долга.
+    """
+
+    region = models.CharField(max_length=100, verbose_name='Регион')
+    city = models.CharField(max_length=100, verbose_name='Город')
+    debtor_count = models.PositiveIntegerField(default=0, verbose_name='Количество дебиторов')
+    total_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Общая сумма долга')
+
+    class Meta:
+        verbose_name = 'Сводка по региону'
+        verbose_name_plural = 'Сводка по регионам'
+        ordering = ['region', 'city']
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'city'], name='debtsummary_region_city_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.region}, {self.city}: {self.debtor_count}"
+
+
+class DocumentBlob(models.Model):
+    """
+    Модель уникального файла в хранилище документов с дедупликацией.
+
+    Запись создается хранилищем DeduplicatingStorage при сохранении файла. Счетчик ссылок
+    поддерживают триггеры базы данных на таблице заявок: он равен количеству полей document
+    и deletion_document, указывающих на файл.
+
+    Атрибуты:
+        name (str): Имя файла в хранилище (содержит SHA-256 содержимого).
+        size (int): Размер файла в байтах.
+        ref_count (int): Количество ссылок на файл из заявок.
+        uploaded_at (datetime): Время последней загрузки этого содержимого.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True, verbose_name='Имя файла')
+    size = models.BigIntegerField(default=0, verbose_name='Размер, байт')
+    ref_count = models.IntegerField(default=0, verbose_name='Количество ссылок')
+    uploaded_at = models.DateTimeField(default=timezone.now, verbose_name='Время загрузки')
+
+    class Meta:
+        verbose_name = 'Файл документа'
+        verbose_name_plural = 'Файлы документов'
+        indexes = [
+            models.Index(fields=['ref_count', 'uploaded_at'], name='documentblob_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+# Статусы заявок, ожидающих решения администратора
+ACTIVE_STATUSES = ('pending', 'deleting', 'update_requested')
+
 
 class AddDebtorUser(models.Model):
     """
@@ -293,11 +441,27 @@ class AddDebtorUser(models.Model):
         default='pending',
         verbose_name="Статус"
     )
-    document = models.FileField(upload_to='documents/', verbose_name="Документ")
+    document = models.FileField(upload_to='documents/', storage=document_storage, verbose_name="Документ")
     index_key = models.IntegerField(unique=True, verbose_name="Индекс", null=True, blank=True)
     deletion_reason = models.TextField(null=True, blank=True, verbose_name='Причина удаления')
-    deletion_document = models.FileField(upload_to='deletion_documents/', null=True, blank=True,
-                                         verbose_name='Документ удаления')
+    deletion_document = models.FileField(upload_to='deletion_documents/', storage=document_storage, null=True,
+                                         blank=True, verbose_name='Документ удаления')
+
+    # Менеджер, выдающий index_key и при bulk_create
+    objects = IndexKeyManager()
+
+    class Meta:
+        indexes = [
+            # Фильтр по статусу с сортировкой по дате в админке и очереди модерации
+            models.Index(fields=['status', 'created_at'], name='request_status_created_idx'),
+            # Заявки и счетчики личного кабинета
+            models.Index(fields=['user', 'status'], name='request_user_status_idx'),
+            # Частичный индекс только по заявкам, ожидающим модерации
+            models.Index(
+                fields=['created_at'], name='request_active_created_idx',
+                condition=models.Q(status__in=ACTIVE_STATUSES),
+            ),
+        ]
 
     def __str__(self):
         """
@@ -322,7 +486,7 @@ class AddDebtorUser(models.Model):
 
         Логирует процесс добавления должника в основную таблицу.
         """
-        logger.info(f"Начинаем перенос данных для {self.name} {self.surname} в таблицу Debtor.")
+        logger.info("Начинаем перенос данных для %s %s в таблицу Debtor.", self.name, self.surname)
         debtor = Debtor.objects.create(
             user=self.user,
             name=self.name,
@@ -334,29 +498,295 @@ class AddDebtorUser(models.Model):
         )
         self.status = 'added'
         self.save()
-        logger.info(f"Дебитор {self.name} {self.surname} успешно добавлен в таблицу Debtor.")
+        logger.info("Дебитор %s %s успешно добавлен в таблицу Debtor.", self.name, self.surname)
         return debtor
 
 
+class Job(models.Model):
+    """
+    Модель фоновой задачи в очереди на базе данных.
+
+    Задачи ставятся в очередь функцией jobs.enqueue и выполняются командой run_worker. Обработчик
+    захватывает задачу на время аренды (locked_until); если обработчик не завершил задачу до
+    окончания аренды, ее может захватить другой обработчик. Неудачные попытки повторяются
+    с экспоненциальной задержкой до max_attempts раз.
+
+    Атрибуты:
+        STATUS_CHOICES (list): Возможные статусы задачи.
+        kind (str): Тип задачи, по которому выбирается функция-обработчик.
+        payload (dict): Параметры задачи.
+        status (str): Текущий статус задачи.
+        attempts (int): Количество начатых попыток выполнения.
+        max_attempts (int): Максимальное количество попыток.
+        run_after (datetime): Время, раньше которого задачу не нужно выполнять.
+        locked_by (str): Идентификатор обработчика, захватившего задачу.
+        locked_until (datetime): Время окончания аренды задачи.
+        result (dict): Результат выполнения задачи.
+        last_error (str): Текст последней ошибки.
+        debtor_request (ForeignKey): Заявка, к которой относится задача (если применимо).
+        created_at (datetime): Дата и время постановки задачи в очередь.
+        updated_at (datetime): Дата и время последнего изменения задачи.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=50, verbose_name='Тип задачи')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Параметры')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name='Статус')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name='Максимум попыток')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Выполнить после')
+    locked_by = models.CharField(max_length=100, blank=True, default='', verbose_name='Обработчик')
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name='Аренда до')
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    last_error = models.TextField(blank=True, default='', verbose_name='Последняя ошибка')
+    debtor_request = models.ForeignKey(
+        AddDebtorUser, null=True, blank=True, on_delete=models.CASCADE, related_name='jobs', verbose_name='Заявка'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.get_status_display()}"
+
+
+class ModerationRequest(AddDebtorUser):
+    """
+    Прокси-модель заявок для очереди модерации в админке.
+
+    Содержит те же данные, что и AddDebtorUser; очередь показывает только заявки
+    со статусами из ACTIVE_STATUSES.
+    """
+
+    class Meta:
+        proxy = True
+        verbose_name = 'Заявка на модерации'
+        verbose_name_plural = 'Очередь модерации'
+
+
+@receiver(pre_save, sender=Debtor)
 @receiver(pre_save, sender=AddDebtorUser)
-def set_index_key(sender, instance, **kwargs):
+def set_index_key(sender, instance, using, **kwargs):
+    """
+    Выдает уникальный index_key новому объекту AddDebtorUser или Debtor.
+
+    Эта функция срабатывает перед сохранением нового объекта (не имеющего первичного ключа `pk`),
+    у которого еще нет `index_key`. Значение берется из общего счетчика последовательности
+    (см. модуль sequences), который увеличивается атомарным UPDATE, поэтому параллельные запросы
+    не могут получить одинаковый ключ. Заявки и дебиторы используют один счетчик: при одобрении
+    заявки ее ключ переносится в Debtor и не пересекается с ключами дебиторов, созданных напрямую.
+
+    Аргументы:
+        sender (Model): Модель, которая отправила сигнал (AddDebtorUser или Debtor).
+        instance (Model): Экземпляр объекта, для которого генерируется уникальный `index_key`.
+        using (str): Алиас базы, в которую сохраняется объект.
+        **kwargs: Дополнительные параметры сигнала (не используются).
+    """
+    if instance.pk is None and instance.index_key is None:  # Новый объект без ключа
+        instance.index_key = index_keys.allocate_one(using)
+
+
+# Статусы заявок, которые считаются одобренными в счетчиках личного кабинета
+APPROVED_STATUSES = ('approved', 'added', 'approved_for_update', 'updated_in_db')
+REQUEST_COUNTS_CACHE_TIMEOUT = 60 * 60
+
+
+def request_counts_cache_key(user_id):
+    """
+    Возвращает ключ кэша счетчиков заявок пользователя.
+
+    Аргументы:
+        user_id (int): Идентификатор пользователя.
+
+    Возвращает:
+        str: Ключ кэша.
+    """
+    return f'request_counts:{user_id}'
+
+
+def get_request_counts(user_id):
+    """
+    Возвращает счетчики заявок пользователя по статусам.
+
+    Счетчики вычисляются одним агрегирующим запросом с условными COUNT и кэшируются до
+    следующего изменения заявок пользователя.
+
+    Аргументы:
+        user_id (int): Идентификатор пользователя.
+
+    Возвращает:
+        dict: Словарь с ключами request_count, approved_count и rejected_count.
+    """
+    key = request_counts_cache_key(user_id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = AddDebtorUser.objects.filter(user_id=user_id).aggregate(**_request_count_aggregates())
+        cache.set(key, counts, REQUEST_COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+async def aget_request_counts(user_id):
+    """
+    Асинхронная версия get_request_counts.
+
+    Аргументы:
+        user_id (int): Идентификатор пользователя.
+
+    Возвращает:
+        dict: Словарь с ключами request_count, approved_count и rejected_count.
+    """
+    key = request_counts_cache_key(user_id)
+    counts = await cache.aget(key)
+    if counts is None:
+        counts = await AddDebtorUser.objects.filter(user_id=user_id).aaggregate(**_request_count_aggregates())
+        await cache.aset(key, counts, REQUEST_COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+def _request_count_aggregates():
+    return {
+        'request_count': Count('id'),
+        'approved_count': Count('id', filter=Q(status__in=APPROVED_STATUSES)),
+        'rejected_count': Count('id', filter=Q(status='rejected')),
+    }
+
+
+def invalidate_request_counts(*user_ids):
+    """
+    Сбрасывает кэшированные счетчики заявок указанных пользователей.
+
+    Вызывается сигналами при сохранении и удалении заявки, а также явно из массовых операций
+    (update, bulk_create, быстрое удаление), которые сигналы не отправляют.
+
+    Аргументы:
+        *user_ids (int): Идентификаторы пользователей.
+    """
+    cache.delete_many([request_counts_cache_key(user_id) for user_id in set(user_ids)])
+
+
+@receiver(post_save, sender=AddDebtorUser)
+@receiver(post_delete, sender=AddDebtorUser)
+@receiver(post_save, sender=ModerationRequest)
+@receiver(post_delete, sender=ModerationRequest)
+def reset_request_counts(sender, instance, **kwargs):
+    """
+    Сбрасывает счетчики заявок владельца при сохранении или удалении заявки.
+
+    Аргументы:
+        sender (Model): Модель AddDebtorUser.
+        instance (AddDebtorUser): Сохраненная или удаленная заявка.
+        **kwargs: Дополнительные параметры сигнала (не используются).
     """
-    Генерирует уникальный index_key для нового объекта AddDebtorUser.
+    invalidate_request_counts(instance.user_id)
+
+
+# Ключ кэша версии реестра дебиторов (см. модуль registry)
+REGISTRY_VERSION_CACHE_KEY = 'debtor_registry:version'
+# Строки Sequence с версией реестра: счетчик изменений и время последнего изменения в миллисекундах Unix
+REGISTRY_VERSION_SEQUENCE = 'debtor_registry'
+REGISTRY_MODIFIED_SEQUENCE = 'debtor_registry_modified'
 
-    Эта функция срабатывает перед сохранением нового объекта модели AddDebtorUser. Она проверяет, является ли
-    объект новым (не имеющим первичного ключа `pk`). Если объект новый, функция генерирует уникальный `index_key`,
-    основываясь на максимальном значении `index_key` среди существующих записей. Если в базе нет записей, то
-    присваивает значение `1`.
+
+def invalidate_registry_version(using=DEFAULT_DB_ALIAS):
+    """
+    Увеличивает версию реестра дебиторов и сбрасывает ее кэш после фиксации транзакции.
+
+    Версия увеличивается одним UPDATE не чаще раза за транзакцию: повторные вызовы до фиксации
+    ничего не делают, поэтому массовая операция в транзакции стоит одной записи в горячие строки
+    Sequence. Вызывается сигналами сохранения и удаления дебитора и методами DebtorQuerySet
+    (bulk_create, update, _raw_delete), которые сигналы не отправляют; изменения сырым SQL
+    должны вызывать ее явно.
+
+    Аргументы:
+        using (str): Алиас базы, в которой изменен реестр.
+    """
+    connection = connections[using]
+    pending = getattr(connection, 'registry_version_reset', None)
+    if connection.in_atomic_block and any(func is pending for _, func, _ in connection.run_on_commit):
+        return
+    Sequence.objects.using(using).filter(
+        name__in=(REGISTRY_VERSION_SEQUENCE, REGISTRY_MODIFIED_SEQUENCE)
+    ).update(value=Case(
+        When(name=REGISTRY_VERSION_SEQUENCE, then=F('value') + 1),
+        default=Greatest(F('value'), Value(int(time.time() * 1000))),
+        output_field=models.BigIntegerField(),
+    ))
+
+    def reset():
+        connection.registry_version_reset = None
+        cache.delete(REGISTRY_VERSION_CACHE_KEY)
+
+    # При откате транзакции Django отбрасывает reset, и следующий вызов снова увеличит версию
+    connection.registry_version_reset = reset
+    transaction.on_commit(reset, using=using)
+
+
+@receiver(post_save, sender=Debtor)
+@receiver(post_delete, sender=Debtor)
+def reset_registry_version(sender, instance, using, **kwargs):
+    """
+    Обновляет версию реестра при сохранении или удалении дебитора.
 
     Аргументы:
-        sender (Model): Модель, которая отправила сигнал (в данном случае AddDebtorUser).
-        instance (AddDebtorUser): Экземпляр объекта, для которого генерируется уникальный `index_key`.
+        sender (Model): Модель Debtor.
+        instance (Debtor): Сохраненный или удаленный дебитор.
+        using (str): Алиас базы.
         **kwargs: Дополнительные параметры сигнала (не используются).
+    """
+    invalidate_registry_version(using)
+
+
+# Объект пользователя кэшируется бэкендом аутентификации (см. модуль auth_backends)
+USER_CACHE_TIMEOUT = 15 * 60
+
 
-    Примечание:
-        Генерация уникального ключа осуществляется на основе максимального значения существующего ключа.
-        Это гарантирует, что новые объекты всегда получат уникальный индекс.
+def user_cache_key(user_id):
+    """
+    Возвращает ключ кэша объекта пользователя.
+
+    Аргументы:
+        user_id (int): Идентификатор пользователя.
+
+    Возвращает:
+        str: Ключ кэша.
+    """
+    return f'user:{user_id}'
+
+
+@receiver(post_save, sender=NewUsers)
+@receiver(post_delete, sender=NewUsers)
+def reset_user_cache(sender, instance, **kwargs):
+    """
+    Сбрасывает кэшированный объект пользователя при его сохранении или удалении.
+
+    Аргументы:
+        sender (Model): Модель NewUsers.
+        instance (NewUsers): Сохраненный или удаленный пользователь.
+        **kwargs: Дополнительные параметры сигнала (не используются).
+    """
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Настраивает новое соединение SQLite PRAGMA из настройки SQLITE_PRAGMAS (см. Task1.sqlite_tuning).
+
+    Аргументы:
+        sender (type): Класс обертки соединения.
+        connection (DatabaseWrapper): Открытое соединение.
+        **kwargs: Дополнительные параметры сигнала (не используются).
     """
-    if instance.pk is None:  # Новый объект
-        last_debtor = AddDebtorUser.objects.aggregate(Max('index_key'))['index_key__max']
-        instance.index_key = 1 if last_debtor is None else last_debtor + 1
+    sqlite_tuning.apply_pragmas(connection)
@@ -0,0 +1,77 @@
+"""
+Пагинация больших списков без точного COUNT(*).
+
+EstimatedCountPaginator считает строки не дальше порога EXACT_COUNT_LIMIT. Для меньших выборок
+количество точное, для больших выборок без фильтров используется оценка числа строк таблицы
+из статистики планировщика (sqlite_stat1, собираемая ANALYZE, или pg_class.reltuples). Так страница
+полного списка открывается за время чтения одной страницы, даже если в таблице миллионы строк.
+Для отфильтрованных выборок и таблиц без статистики оценить количество нечем, и выполняется
+точный COUNT(*): иначе страницы за порогом были бы недоступны.
+"""
+import logging
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_table_rows(model, using='default'):
+    """
+    Возвращает оценку количества строк таблицы модели по статистике базы данных.
+
+    Аргументы:
+        model (Model): Модель, для таблицы которой нужна оценка.
+        using (str): Псевдоним базы данных.
+
+    Возвращает:
+        int | None: Оценка количества строк или None, если статистика недоступна.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # Первое число в поле stat — количество строк индекса; у частичных индексов оно меньше,
+            # поэтому берется максимум по всем индексам таблицы
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            counts = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+            return max(counts) if counts else None
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который не выполняет полный COUNT(*) для больших выборок.
+
+    Атрибуты:
+        exact_count_limit (int): Порог, до которого количество объектов считается точно.
+    """
+
+    exact_count_limit = EXACT_COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        # COUNT по подзапросу с LIMIT читает не больше exact_count_limit + 1 строк
+        bounded = queryset.order_by()[:self.exact_count_limit + 1].count()
+        if bounded <= self.exact_count_limit:
+            return bounded
+        estimate = None
+        if not queryset.query.where:
+            estimate = estimated_table_rows(queryset.model, queryset.db)
+        if estimate is None:
+            return queryset.count()
+        logger.debug("Количество объектов %s оценено: %s.", queryset.model.__name__, estimate)
+        return max(estimate, bounded)
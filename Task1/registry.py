@@ -0,0 +1,225 @@
+"""
+Версия реестра дебиторов для условных GET-запросов и кэширования ответов.
+
+Версия — это пара (счетчик изменений, время последнего изменения) в строках Sequence, которую
+models.invalidate_registry_version увеличивает один раз за транзакцию, изменяющую таблицу Debtor
+(из сигналов сохранения и удаления и из массовых операций DebtorQuerySet). Версия кэшируется на
+VERSION_CACHE_TIMEOUT секунд, а в текущем процессе кэш сбрасывается после фиксации, поэтому
+повторный опрос неизменившегося реестра стоит одного обращения к кэшу: по версии формируются
+заголовки ETag и Last-Modified, и клиент получает ответ 304 без чтения таблицы.
+
+Полные ответы представлений также кэшируются с версией в ключе (декоратор cache_by_version):
+после изменения реестра ключ меняется, а старые записи просто истекают по таймауту.
+
+Для асинхронных представлений версия читается заранее (декоратор preload_version, функция
+aget_version): функции etag и last_modified декоратора condition вызываются синхронно и не должны
+обращаться к базе из цикла событий.
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+
+from . import replicas
+from .models import REGISTRY_MODIFIED_SEQUENCE, REGISTRY_VERSION_CACHE_KEY, REGISTRY_VERSION_SEQUENCE, Sequence
+
+logger = logging.getLogger(__name__)
+
+VERSION_SEQUENCE = REGISTRY_VERSION_SEQUENCE
+MODIFIED_SEQUENCE = REGISTRY_MODIFIED_SEQUENCE
+# Сколько секунд версия живет в кэше: на столько могут запаздывать изменения из других процессов
+VERSION_CACHE_TIMEOUT = 5
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+RESPONSE_CACHE_MAX_BYTES = 5 * 1024 * 1024
+
+
+def is_available():
+    """
+    Проверяет, поддерживается ли версия реестра текущей базой данных (строки версии создаются
+    миграцией 0010_registry_version только в SQLite).
+
+    Возвращает:
+        bool: True, если версия реестра ведется.
+    """
+    return connection.vendor == 'sqlite'
+
+
+def get_version():
+    """
+    Возвращает текущую версию реестра дебиторов.
+
+    Аргументы отсутствуют.
+
+    Возвращает:
+        tuple[int, int] | None: Счетчик изменений и время последнего изменения в миллисекундах Unix
+        или None, если версия недоступна.
+    """
+    version = cache.get(REGISTRY_VERSION_CACHE_KEY)
+    if version is None and is_available():
+        values = dict(
+            Sequence.objects.filter(name__in=(VERSION_SEQUENCE, MODIFIED_SEQUENCE)).values_list('name', 'value')
+        )
+        if len(values) == 2:
+            version = (values[VERSION_SEQUENCE], values[MODIFIED_SEQUENCE])
+            cache.set(REGISTRY_VERSION_CACHE_KEY, version, VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_version():
+    """
+    Асинхронная версия get_version.
+
+    Возвращает:
+        tuple[int, int] | None: Счетчик изменений и время последнего изменения в миллисекундах Unix
+        или None, если версия недоступна.
+    """
+    version = await cache.aget(REGISTRY_VERSION_CACHE_KEY)
+    if version is None and is_available():
+        values = {
+            name: value async for name, value in
+            Sequence.objects.filter(name__in=(VERSION_SEQUENCE, MODIFIED_SEQUENCE)).values_list('name', 'value')
+        }
+        if len(values) == 2:
+            version = (values[VERSION_SEQUENCE], values[MODIFIED_SEQUENCE])
+            await cache.aset(REGISTRY_VERSION_CACHE_KEY, version, VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def preload_version(view):
+    """
+    Читает версию реестра до вызова асинхронного представления и запоминает ее в запросе.
+
+    Должен стоять над декораторами condition и cache_by_version.
+
+    Аргументы:
+        view (callable): Асинхронное представление.
+
+    Возвращает:
+        callable: Обернутое представление.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not hasattr(request, '_debtor_registry_version'):
+            request._debtor_registry_version = await aget_version()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _request_version(request):
+    # Версия читается один раз на запрос, сколько бы раз ее ни запрашивали etag и last_modified
+    if not hasattr(request, '_debtor_registry_version'):
+        request._debtor_registry_version = get_version()
+    return request._debtor_registry_version
+
+
+def etag(request, *args, **kwargs):
+    """
+    Формирует ETag ответа по версии реестра и полному пути запроса.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+
+    Возвращает:
+        str | None: Значение ETag или None, если версия недоступна.
+    """
+    version = _request_version(request)
+    if version is None:
+        return None
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()[:16]
+    return f'{version[0]}-{path}'
+
+
+def user_etag(request, *args, **kwargs):
+    """
+    Формирует ETag для страниц, содержимое которых зависит еще и от пользователя.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+
+    Возвращает:
+        str | None: Значение ETag или None, если версия недоступна.
+    """
+    value = etag(request)
+    if value is None:
+        return None
+    return f'{value}-{request.user.pk or 0}'
+
+
+def last_modified(request, *args, **kwargs):
+    """
+    Возвращает время последнего изменения реестра для заголовка Last-Modified.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+
+    Возвращает:
+        datetime | None: Время последнего изменения или None, если версия недоступна.
+    """
+    version = _request_version(request)
+    if version is None:
+        return None
+    return datetime.fromtimestamp(version[1] / 1000, tz=timezone.utc)
+
+
+def _response_cache_key(request, version):
+    return f'debtor_registry:response:{version[0]}:{etag(request)}'
+
+
+def _cacheable(response):
+    # Ответ, собранный по отстающей реплике, не должен попасть в кэш под текущей версией
+    return (response.status_code == 200 and not response.streaming
+            and len(response.content) <= RESPONSE_CACHE_MAX_BYTES and not replicas.served_stale())
+
+
+def cache_by_version(view):
+    """
+    Кэширует успешные нестриминговые ответы представления с версией реестра в ключе.
+
+    Ответы больше RESPONSE_CACHE_MAX_BYTES и ответы, собранные по отстающей реплике, не кэшируются.
+    Поддерживаются синхронные
+    и асинхронные представления.
+
+    Аргументы:
+        view (callable): Представление, ответ которого зависит только от реестра и строки запроса.
+
+    Возвращает:
+        callable: Обернутое представление.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            version = _request_version(request)
+            if version is None or request.method != 'GET':
+                return await view(request, *args, **kwargs)
+            key = _response_cache_key(request, version)
+            cached = await cache.aget(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = await view(request, *args, **kwargs)
+            if _cacheable(response):
+                await cache.aset(key, (response.content, response['Content-Type']), RESPONSE_CACHE_TIMEOUT)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        version = _request_version(request)
+        if version is None or request.method != 'GET':
+            return view(request, *args, **kwargs)
+        key = _response_cache_key(request, version)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = view(request, *args, **kwargs)
+        if _cacheable(response):
+            cache.set(key, (response.content, response['Content-Type']), RESPONSE_CACHE_TIMEOUT)
+        return response
+    return wrapper
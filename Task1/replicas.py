@@ -0,0 +1,350 @@
+"""
+Чтение реестра с реплик базы данных.
+
+ReplicaRouter (settings.DATABASE_ROUTERS) отправляет чтения моделей из настройки REPLICA_MODELS
+на одну из реплик DATABASE_REPLICAS, а все записи — в основную базу. Реплика используется, только если:
+
+* запрос безопасный (GET, HEAD, OPTIONS) и идет через ReplicaRoutingMiddleware — вне HTTP-запросов
+  (команды, обработчик задач) чтения идут в основную базу, если не включен режим use_replica;
+* в текущем запросе еще не было записей и нет открытой транзакции (чтение после записи);
+* клиент недавно ничего не записывал: после запроса с записью выставляется cookie REPLICA_PIN_COOKIE
+  на REPLICA_MAX_LAG секунд, и его запросы читают из основной базы;
+* отставание реплики не больше REPLICA_MAX_LAG секунд (проверяется не чаще раза в REPLICA_STATUS_TTL).
+
+Для SQLite отставание определяется по версии реестра (см. registry): если счетчик изменений реплики
+меньше, чем в основной базе, отставание — время с момента, до которого реплика содержит все изменения
+(последнее обновление копии командой refresh_replica или последнее изменение в ней). Ответ, собранный
+по отстающей реплике, не получает ETag и Last-Modified и не кэшируется.
+
+Режим можно задать для представления или блока кода (use_primary, use_replica — декораторы
+и контекстные менеджеры) и для отдельного QuerySet (on_replica или штатный using('default')).
+Локальная реплика SQLite обновляется командой refresh_replica через backup API.
+"""
+import logging
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+REPLICA_PIN_COOKIE = 'db_primary'
+REPLICA_STATUS_TTL = 2
+BACKUP_PAGES = 1024
+# Строка Sequence в файле реплики: время начала последнего копирования в миллисекундах Unix
+REPLICA_REFRESHED_SEQUENCE = 'replica_refreshed'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('replica_routing', default=None)
+_status = {}
+
+
+class RoutingState:
+    """
+    Состояние маршрутизации в пределах HTTP-запроса или блока use_primary/use_replica.
+
+    Атрибуты:
+        mode (str): 'auto' — реплика для моделей REPLICA_MODELS, 'replica' — для всех моделей,
+            'primary' — только основная база.
+        wrote (bool): Была ли запись в основную базу.
+        stale (bool): Читались ли данные с отстающей реплики.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.wrote = False
+        self.stale = False
+
+
+class _Routing:
+    """
+    Временно переключает режим маршрутизации. Работает как контекстный менеджер и как декоратор
+    синхронных и асинхронных функций.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self._saved = []
+
+    def __enter__(self):
+        state = _state.get()
+        if state is None:
+            self._saved.append((None, _state.set(RoutingState(self.mode))))
+        else:
+            self._saved.append((state.mode, None))
+            state.mode = self.mode
+
+    def __exit__(self, *exc_info):
+        mode, token = self._saved.pop()
+        if token is not None:
+            _state.reset(token)
+        else:
+            _state.get().mode = mode
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Routing(self.mode):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Routing(self.mode):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def use_primary():
+    """
+    Режим, в котором все чтения идут в основную базу.
+
+    Возвращает:
+        _Routing: Контекстный менеджер и декоратор.
+    """
+    return _Routing('primary')
+
+
+def use_replica():
+    """
+    Режим, в котором на реплику идут чтения всех моделей, а не только REPLICA_MODELS
+    (например, для отчетов). Вне HTTP-запроса включает чтение с реплик для блока кода.
+
+    Возвращает:
+        _Routing: Контекстный менеджер и декоратор.
+    """
+    return _Routing('replica')
+
+
+def request_state(request):
+    """
+    Создает состояние маршрутизации для HTTP-запроса.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+
+    Возвращает:
+        Token: Токен для сброса состояния (finish_request).
+    """
+    safe = request.method in SAFE_METHODS and REPLICA_PIN_COOKIE not in request.COOKIES
+    return _state.set(RoutingState('auto' if safe else 'primary'))
+
+
+def finish_request(response, token):
+    """
+    Завершает маршрутизацию запроса: закрепляет клиента за основной базой после записи и убирает
+    заголовки кэширования у ответа, собранного по отстающей реплике.
+
+    Аргументы:
+        response (HttpResponse): Ответ.
+        token (Token): Токен из request_state.
+
+    Возвращает:
+        HttpResponse: Тот же ответ.
+    """
+    state = _state.get()
+    _state.reset(token)
+    if state.wrote and settings.DATABASE_REPLICAS:
+        response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_MAX_LAG, httponly=True, samesite='Lax')
+    if state.stale:
+        for header in ('ETag', 'Last-Modified'):
+            if header in response:
+                del response[header]
+    return response
+
+
+def served_stale():
+    """
+    Проверяет, читались ли в текущем запросе данные с отстающей реплики.
+
+    Возвращает:
+        bool: True, если ответ может не содержать последних изменений.
+    """
+    state = _state.get()
+    return state is not None and state.stale
+
+
+def _sqlite_version(alias):
+    # Модели импортируются здесь: маршрутизатор загружается при первом обращении к базе
+    from .models import Sequence
+
+    table = Sequence._meta.db_table
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            f'SELECT name, value FROM {table} WHERE name IN (%s, %s, %s)',
+            ['debtor_registry', 'debtor_registry_modified', REPLICA_REFRESHED_SEQUENCE],
+        )
+        values = dict(cursor.fetchall())
+    return (
+        values.get('debtor_registry', 0),
+        # Копия содержит все изменения, сделанные до начала копирования
+        max(values.get('debtor_registry_modified', 0), values.get(REPLICA_REFRESHED_SEQUENCE, 0)),
+    )
+
+
+def _measure(alias):
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+            lag = float(cursor.fetchone()[0] or 0)
+        return lag, lag > 0
+    primary_counter, _ = _sqlite_version(PRIMARY)
+    replica_counter, replica_current_at = _sqlite_version(alias)
+    if replica_counter >= primary_counter:
+        return 0.0, False
+    # Разница времени последних изменений не растет, пока в основную базу никто не пишет,
+    # поэтому отставание считается от момента, до которого реплика актуальна
+    return max(time.time() * 1000 - replica_current_at, 0) / 1000, True
+
+
+def replica_status(alias):
+    """
+    Возвращает отставание реплики от основной базы.
+
+    Результат запоминается в процессе на REPLICA_STATUS_TTL секунд. Недоступная реплика считается
+    отстающей бесконечно.
+
+    Аргументы:
+        alias (str): Алиас реплики.
+
+    Возвращает:
+        tuple[float, bool]: Отставание в секундах и признак того, что у реплики нет последних изменений.
+    """
+    now = time.monotonic()
+    cached = _status.get(alias)
+    if cached is not None and now - cached[0] < REPLICA_STATUS_TTL:
+        return cached[1]
+    try:
+        status = _measure(alias)
+    except DatabaseError as e:
+        logger.warning("Реплика %s недоступна: %s", alias, e)
+        status = (float('inf'), True)
+    _status[alias] = (now, status)
+    return status
+
+
+def choose_replica():
+    """
+    Выбирает случайную реплику с допустимым отставанием.
+
+    Возвращает:
+        tuple[str, bool] | None: Алиас реплики и признак отставания или None, если подходящих реплик нет.
+    """
+    healthy = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag, behind = replica_status(alias)
+        if lag <= settings.REPLICA_MAX_LAG:
+            healthy.append((alias, behind))
+    return random.choice(healthy) if healthy else None
+
+
+def on_replica(queryset):
+    """
+    Направляет QuerySet на реплику независимо от режима, если есть реплика с допустимым отставанием.
+
+    Аргументы:
+        queryset (QuerySet): Исходный QuerySet.
+
+    Возвращает:
+        QuerySet: QuerySet на реплике или исходный QuerySet.
+    """
+    choice = choose_replica()
+    if choice is None:
+        return queryset
+    alias, behind = choice
+    state = _state.get()
+    if behind and state is not None:
+        state.stale = True
+    return queryset.using(alias)
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор баз данных: чтения реестра — на реплики, записи — в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.mode == 'primary' or state.wrote or not settings.DATABASE_REPLICAS:
+            return PRIMARY
+        if state.mode == 'auto' and model._meta.label_lower not in settings.REPLICA_MODELS:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        choice = choose_replica()
+        if choice is None:
+            return PRIMARY
+        alias, behind = choice
+        if behind:
+            state.stale = True
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def refresh_sqlite_replica(alias, pages=BACKUP_PAGES):
+    """
+    Копирует основную базу SQLite в файл реплики через backup API.
+
+    Копирование идет по pages страниц, не блокируя запись в основную базу надолго; если основная
+    база меняется во время копирования, SQLite начинает копирование заново. Читатели реплики видят
+    либо старую, либо новую копию целиком. Время начала копирования записывается в копию (строка
+    Sequence REPLICA_REFRESHED_SEQUENCE), по нему считается отставание реплики.
+
+    Аргументы:
+        alias (str): Алиас реплики (база SQLite).
+        pages (int): Сколько страниц копировать за шаг.
+
+    Возвращает:
+        float: Длительность копирования в секундах.
+
+    Исключения:
+        ValueError: Если реплика не SQLite или совпадает с основной базой.
+    """
+    source, target = connections[PRIMARY], connections[alias]
+    if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+        raise ValueError('Обновлять копированием можно только реплики SQLite.')
+    if str(source.settings_dict['NAME']) == str(target.settings_dict['NAME']):
+        raise ValueError(f'Реплика {alias} указывает на файл основной базы.')
+    target.close()
+    source.ensure_connection()
+    from .models import Sequence
+
+    started = time.perf_counter()
+    refreshed_at = int(time.time() * 1000)
+    destination = sqlite3.connect(target.settings_dict['NAME'])
+    try:
+        source.connection.backup(destination, pages=pages)
+        with destination:
+            destination.execute(
+                f'INSERT INTO {Sequence._meta.db_table} (name, value) VALUES (?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET value = excluded.value',
+                [REPLICA_REFRESHED_SEQUENCE, refreshed_at],
+            )
+    finally:
+        destination.close()
+    _status.pop(alias, None)
+    return time.perf_counter() - started
@@ -0,0 +1,161 @@
+"""
+Полнотекстовый поиск по реестру дебиторов.
+
+Поиск построен на теневой таблице SQLite FTS5 ``task1_debtor_fts``, которая создается миграцией
+0007_debtor_fts и поддерживается в актуальном состоянии триггерами на таблице Task1_debtor
+(вставка, изменение текстовых полей и удаление). Триггеры срабатывают и для массовых операций
+(bulk_create, update, delete у QuerySet), которые обходят сигналы моделей.
+
+Токенизатор unicode61 приводит кириллицу к нижнему регистру; буква «ё» дополнительно заменяется
+на «е» как при индексации, так и в запросе. Каждое слово запроса ищется как префикс.
+"""
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Debtor
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'task1_debtor_fts'
+# Текстовые поля дебитора, попадающие в индекс, и их веса для ранжирования bm25
+FTS_FIELDS = ('name', 'surname', 'address', 'region', 'city')
+FTS_WEIGHTS = (10.0, 10.0, 1.0, 2.0, 2.0)
+MAX_QUERY_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def is_available():
+    """
+    Проверяет, поддерживает ли текущая база данных полнотекстовый индекс.
+
+    Возвращает:
+        bool: True для SQLite (индекс создается миграцией), False для остальных СУБД.
+    """
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    """
+    Приводит текст к виду, в котором он хранится в индексе.
+
+    Аргументы:
+        text (str): Исходный текст.
+
+    Возвращает:
+        str: Текст в нижнем регистре с заменой «ё» на «е».
+    """
+    return text.lower().replace('ё', 'е')
+
+
+def build_match_query(query):
+    """
+    Преобразует пользовательский запрос в выражение MATCH для FTS5.
+
+    Каждое слово запроса экранируется кавычками и ищется как префикс, слова объединяются по «И».
+
+    Аргументы:
+        query (str): Строка поиска, введенная пользователем.
+
+    Возвращает:
+        str | None: Выражение MATCH или None, если в запросе нет ни одного слова.
+    """
+    terms = _TERM_RE.findall(normalize(query))[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_debtor_ids(query, limit=20, offset=0):
+    """
+    Находит дебиторов по запросу и возвращает их идентификаторы в порядке релевантности.
+
+    Аргументы:
+        query (str): Строка поиска.
+        limit (int): Максимальное количество результатов.
+        offset (int): Количество пропускаемых результатов.
+
+    Возвращает:
+        list[int]: Первичные ключи найденных дебиторов, от наиболее релевантного.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+    if not is_available():
+        return list(
+            filter_debtors(Debtor.objects.all(), query).order_by('-id').values_list('id', flat=True)[offset:offset + limit]
+        )
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+async def asearch_debtor_ids(query, limit=20, offset=0):
+    """
+    Асинхронная версия search_debtor_ids.
+
+    Запрос к индексу FTS5 выполняется через курсор, у которого нет асинхронного API, поэтому
+    он передается в поток (как это делают асинхронные методы ORM).
+    """
+    return await sync_to_async(search_debtor_ids)(query, limit=limit, offset=offset)
+
+
+def filter_debtors(queryset, query):
+    """
+    Ограничивает QuerySet дебиторов записями, подходящими под поисковый запрос.
+
+    На SQLite фильтрация выполняется подзапросом к индексу FTS5, на остальных СУБД — через icontains.
+
+    Аргументы:
+        queryset (QuerySet): Исходный QuerySet модели Debtor.
+        query (str): Строка поиска.
+
+    Возвращает:
+        QuerySet: Отфильтрованный QuerySet.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return queryset
+    if is_available():
+        return queryset.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+    for term in _TERM_RE.findall(query)[:MAX_QUERY_TERMS]:
+        term_filter = Q()
+        for field in FTS_FIELDS:
+            term_filter |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(term_filter)
+    return queryset
+
+
+def rebuild_index():
+    """
+    Полностью перестраивает полнотекстовый индекс по текущему содержимому таблицы Debtor.
+
+    Возвращает:
+        int: Количество проиндексированных дебиторов.
+    """
+    if not is_available():
+        logger.warning("Полнотекстовый индекс доступен только для SQLite, перестроение пропущено.")
+        return 0
+    columns = ', '.join(FTS_FIELDS)
+    values = ', '.join(
+        f"replace(replace({field}, 'ё', 'е'), 'Ё', 'Е')" for field in FTS_FIELDS
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, {columns}) SELECT id, {values} FROM {Debtor._meta.db_table}'
+        )
+        indexed = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    logger.info("Полнотекстовый индекс перестроен: %s дебиторов.", indexed)
+    return indexed
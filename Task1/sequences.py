@@ -0,0 +1,210 @@
+"""
+Выдача уникальных значений из именованных последовательностей.
+
+Значения хранятся в таблице модели Sequence. Выделение блока — это один атомарный
+``UPDATE ... SET value = value + n`` с последующим чтением нового значения в той же транзакции:
+строка счетчика блокируется на время транзакции, поэтому два процесса не получат пересекающиеся
+диапазоны. Для снижения нагрузки процесс может резервировать блоки значений заранее
+(настройка INDEX_KEY_BLOCK_SIZE) и раздавать их из памяти; неиспользованный остаток блока
+при перезапуске процесса просто пропускается. Блок резервируется только вне транзакции
+вызывающего кода: иначе после ее отката счетчик вернулся бы назад, а процесс продолжил бы
+раздавать значения из блока, который могут получить другие процессы.
+"""
+import logging
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, models, transaction
+from django.db.models import F, Max
+
+logger = logging.getLogger(__name__)
+
+INDEX_KEY_SEQUENCE = 'index_key'
+
+
+def _sequence_model():
+    return apps.get_model('Task1', 'Sequence')
+
+
+def _initial_index_key(using):
+    """
+    Вычисляет начальное значение последовательности index_key по уже существующим записям.
+
+    Аргументы:
+        using (str): Псевдоним базы данных.
+
+    Возвращает:
+        int: Максимальный index_key среди заявок и дебиторов или 0.
+    """
+    values = [
+        apps.get_model('Task1', model_name).objects.using(using).aggregate(Max('index_key'))['index_key__max'] or 0
+        for model_name in ('AddDebtorUser', 'Debtor')
+    ]
+    return max(values)
+
+
+# Начальные значения последовательностей, для которых еще нет строки в таблице
+INITIAL_VALUES = {
+    INDEX_KEY_SEQUENCE: _initial_index_key,
+}
+
+
+def allocate(name, count=1, using=DEFAULT_DB_ALIAS):
+    """
+    Атомарно выделяет диапазон из count последовательных значений.
+
+    Аргументы:
+        name (str): Имя последовательности.
+        count (int): Количество выделяемых значений.
+        using (str): Псевдоним базы данных.
+
+    Возвращает:
+        range: Выделенные значения.
+
+    Исключения:
+        ValueError: Если count меньше единицы.
+    """
+    if count < 1:
+        raise ValueError('Количество выделяемых значений должно быть положительным.')
+    Sequence = _sequence_model()
+    with transaction.atomic(using=using):
+        updated = Sequence.objects.using(using).filter(name=name).update(value=F('value') + count)
+        if not updated:
+            _create_sequence(name, using)
+            Sequence.objects.using(using).filter(name=name).update(value=F('value') + count)
+        last = Sequence.objects.using(using).values_list('value', flat=True).get(name=name)
+    return range(last - count + 1, last + 1)
+
+
+def _create_sequence(name, using):
+    """
+    Создает строку последовательности, если ее еще нет.
+
+    Если строку параллельно создал другой процесс, ошибка уникальности игнорируется.
+
+    Аргументы:
+        name (str): Имя последовательности.
+        using (str): Псевдоним базы данных.
+    """
+    initial = INITIAL_VALUES.get(name, lambda using: 0)(using)
+    try:
+        with transaction.atomic(using=using):
+            _sequence_model().objects.using(using).create(name=name, value=initial)
+        logger.info("Создана последовательность %s с начальным значением %s.", name, initial)
+    except IntegrityError:
+        pass
+
+
+class BlockAllocator:
+    """
+    Раздает значения последовательности из блоков, зарезервированных процессом.
+
+    При block_size = 1 каждое значение берется из базы данных отдельно и ключи идут без пропусков.
+    При большем размере блока процесс резервирует сразу block_size значений одним UPDATE
+    и раздает их потокам под блокировкой. Блоки ведутся отдельно для каждой базы данных
+    и резервируются только вне транзакции (см. allocate_many).
+
+    Атрибуты:
+        name (str): Имя последовательности.
+        block_size (int | None): Размер резервируемого блока; по умолчанию берется из настройки
+            INDEX_KEY_BLOCK_SIZE.
+    """
+
+    def __init__(self, name, block_size=None):
+        self.name = name
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        # Псевдоним базы -> [следующее значение, конец блока]
+        self._blocks = {}
+
+    @property
+    def block_size(self):
+        if self._block_size is not None:
+            return self._block_size
+        return max(int(getattr(settings, 'INDEX_KEY_BLOCK_SIZE', 1)), 1)
+
+    def allocate_one(self, using=DEFAULT_DB_ALIAS):
+        """
+        Выдает одно значение последовательности.
+
+        Аргументы:
+            using (str): Псевдоним базы данных.
+
+        Возвращает:
+            int: Уникальное значение.
+        """
+        return self.allocate_many(1, using)[0]
+
+    def allocate_many(self, count, using=DEFAULT_DB_ALIAS):
+        """
+        Выдает count уникальных значений.
+
+        Сначала расходуется остаток зарезервированного блока, недостающие значения выделяются
+        одним запросом. Новый резерв запрашивается вместе с ними, только если соединение не в
+        транзакции: allocate тогда фиксирует UPDATE сразу, и блок не может быть отменен откатом.
+
+        Аргументы:
+            count (int): Количество значений.
+            using (str): Псевдоним базы данных.
+
+        Возвращает:
+            list[int]: Уникальные значения в порядке возрастания.
+        """
+        if count < 1:
+            return []
+        with self._lock:
+            block = self._blocks.setdefault(using, [0, 0])
+            taken = list(range(block[0], min(block[0] + count, block[1])))
+            block[0] += len(taken)
+            missing = count - len(taken)
+            if missing:
+                reserve = self.block_size - 1 if self.block_size > 1 else 0
+                if connections[using].in_atomic_block:
+                    reserve = 0
+                values = allocate(self.name, missing + reserve, using)
+                taken.extend(values[:missing])
+                if reserve:
+                    block[:] = [values.start + missing, values.stop]
+            return taken
+
+    def reset(self):
+        """
+        Сбрасывает зарезервированный блок, чтобы следующее значение было взято из базы данных.
+        """
+        with self._lock:
+            self._blocks.clear()
+
+
+index_keys = BlockAllocator(INDEX_KEY_SEQUENCE)
+
+
+def assign_index_keys(objs, using=DEFAULT_DB_ALIAS):
+    """
+    Присваивает index_key всем объектам без ключа одним выделением из последовательности.
+
+    Аргументы:
+        objs (list[Model]): Объекты AddDebtorUser или Debtor.
+        using (str): Псевдоним базы данных, в которую записываются объекты.
+    """
+    pending = [obj for obj in objs if obj.index_key is None]
+    for obj, key in zip(pending, index_keys.allocate_many(len(pending), using)):
+        obj.index_key = key
+
+
+class IndexKeyQuerySet(models.QuerySet):
+    """
+    QuerySet, выдающий index_key объектам, создаваемым через bulk_create.
+
+    bulk_create не отправляет сигнал pre_save, поэтому ключи присваиваются здесь одним блоком.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        # Как и сам bulk_create, ключи берутся из базы для записи, а не из реплики
+        self._for_write = True
+        assign_index_keys(objs, self.db)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+IndexKeyManager = models.Manager.from_queryset(IndexKeyQuerySet)
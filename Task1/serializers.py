@@ -0,0 +1,83 @@
+"""
+Сериализаторы REST API (см. модуль api).
+
+Все поля сериализаторов совпадают по имени со столбцами моделей: это позволяет по параметру
+?fields= не только сократить ответ, но и читать из базы только запрошенные столбцы.
+"""
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import AddDebtorUser, Debtor
+
+
+def requested_fields(request, available):
+    """
+    Возвращает поля, перечисленные в параметре ?fields= (через запятую).
+
+    Аргументы:
+        request (Request): Объект запроса DRF.
+        available (Iterable[str]): Поля сериализатора.
+
+    Возвращает:
+        list[str]: Запрошенные поля в порядке сериализатора или все поля, если параметр не передан.
+
+    Исключения:
+        ValidationError: Если запрошено неизвестное поле.
+    """
+    available = list(available)
+    value = request.query_params.get('fields') if request is not None else None
+    if not value:
+        return available
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(available)
+    if unknown:
+        raise serializers.ValidationError({'fields': f"Неизвестные поля: {', '.join(sorted(unknown))}."})
+    return [name for name in available if name in requested]
+
+
+class SparseFieldsetMixin:
+    """
+    Оставляет в сериализаторе только поля из параметра ?fields= запроса из контекста.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = set(requested_fields(self.context.get('request'), self.fields))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
+class DebtorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Дебитор реестра. Служебный первичный ключ не отдается, как и в get_debtors.
+    """
+
+    class Meta:
+        model = Debtor
+        fields = ('name', 'surname', 'amount', 'address', 'region', 'city', 'created_at', 'updated_at')
+        read_only_fields = fields
+
+
+class DebtorRequestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Заявка пользователя на добавление дебитора. Вместо пути к документу отдается ссылка
+    на представление download_document, проверяющее права доступа.
+    """
+
+    document = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AddDebtorUser
+        fields = (
+            'id', 'name', 'surname', 'amount', 'address', 'region', 'city', 'status', 'document',
+            'created_at', 'updated_at',
+        )
+        read_only_fields = fields
+
+    def get_document(self, obj):
+        if not obj.document:
+            return None
+        url = reverse('download_document', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
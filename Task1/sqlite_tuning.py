@@ -0,0 +1,161 @@
+"""
+Настройка и обслуживание баз SQLite.
+
+При открытии каждого соединения с базой SQLite выполняются PRAGMA из настройки SQLITE_PRAGMAS
+(приемник apply_sqlite_pragmas в models.py):
+
+* journal_mode=WAL — читатели не блокируют писателя и наоборот, запись идет в журнал -wal;
+* synchronous=NORMAL — в режиме WAL fsync выполняется при контрольной точке, а не на каждый COMMIT
+  (при сбое питания теряются последние транзакции, но база остается целостной);
+* busy_timeout — сколько миллисекунд ждать блокировку вместо немедленной ошибки «database is locked»;
+* cache_size, mmap_size, temp_store — кэш страниц, отображение файла в память и временные таблицы в памяти;
+* auto_vacuum=INCREMENTAL — действует для новых баз и после полного VACUUM (db_maintenance --vacuum),
+  после чего свободные страницы возвращаются командой PRAGMA incremental_vacuum.
+
+journal_mode и auto_vacuum хранятся в самом файле базы, остальные PRAGMA действуют на соединение.
+Поэтому первое же соединение (runserver, check, тесты) переводит и рабочий db.sqlite3 в режим WAL,
+и режим сохраняется при SQLITE_TUNING=0; вернуть журнал отката можно командой
+PRAGMA journal_mode=DELETE. В существующей базе с auto_vacuum=NONE свободные страницы возвращает
+только полный VACUUM (db_maintenance --vacuum), который и включает INCREMENTAL.
+Команда db_maintenance (maintain) обновляет статистику планировщика, переносит журнал WAL в базу
+и освобождает место.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Значения PRAGMA auto_vacuum
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+def _pragma_statement(name, value):
+    if not name.isidentifier():
+        raise ImproperlyConfigured(f'Некорректное имя PRAGMA в SQLITE_PRAGMAS: {name!r}')
+    if not isinstance(value, int) and not str(value).isidentifier():
+        raise ImproperlyConfigured(f'Некорректное значение PRAGMA {name} в SQLITE_PRAGMAS: {value!r}')
+    return f'PRAGMA {name} = {value}'
+
+
+def apply_pragmas(connection, pragmas=None):
+    """
+    Выполняет PRAGMA на только что открытом соединении SQLite.
+
+    Запросы идут мимо курсора Django, поэтому не попадают в connection.queries и статистику
+    QueryInstrumentationMiddleware.
+
+    Аргументы:
+        connection (DatabaseWrapper): Соединение Django.
+        pragmas (dict, optional): PRAGMA и их значения; по умолчанию SQLITE_PRAGMAS.
+
+    Возвращает:
+        dict: Значения, которые вернула SQLite (для journal_mode — фактический режим журнала).
+
+    Исключения:
+        ImproperlyConfigured: Если имя или значение PRAGMA некорректно.
+    """
+    if connection.vendor != 'sqlite':
+        return {}
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    statements = {name: _pragma_statement(name, value) for name, value in pragmas.items()}
+    applied = {}
+    for name, statement in statements.items():
+        row = connection.connection.execute(statement).fetchone()
+        applied[name] = row[0] if row else pragmas[name]
+    journal_mode = applied.get('journal_mode')
+    if journal_mode is not None and str(journal_mode).lower() != str(pragmas['journal_mode']).lower():
+        # Например, база в памяти не поддерживает WAL
+        logger.info(
+            "База %s осталась в режиме журнала %s вместо %s.",
+            connection.alias, journal_mode, pragmas['journal_mode'],
+        )
+    return applied
+
+
+def _pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def database_size(alias='default'):
+    """
+    Возвращает размер базы SQLite.
+
+    Аргументы:
+        alias (str): Алиас базы.
+
+    Возвращает:
+        dict: Размер файла базы и журнала WAL в байтах (file_bytes, wal_bytes), количество
+        страниц, размер страницы и количество свободных страниц.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        page_count, page_size, freelist = (
+            _pragma(cursor, name) for name in ('page_count', 'page_size', 'freelist_count')
+        )
+    path = str(connection.settings_dict['NAME'])
+    sizes = {}
+    for key, name in (('file_bytes', path), ('wal_bytes', path + '-wal')):
+        sizes[key] = os.path.getsize(name) if os.path.exists(name) else 0
+    return {**sizes, 'page_count': page_count, 'page_size': page_size, 'freelist_count': freelist}
+
+
+def maintain(alias='default', vacuum=False, incremental_pages=None):
+    """
+    Обслуживает базу SQLite: ANALYZE, PRAGMA optimize, VACUUM и контрольная точка WAL.
+
+    Без vacuum свободные страницы возвращаются PRAGMA incremental_vacuum, если база в режиме
+    auto_vacuum=INCREMENTAL. Полный VACUUM перестраивает файл целиком (и включает auto_vacuum
+    из SQLITE_PRAGMAS), но требует места на диске и блокирует запись на все время работы.
+
+    Аргументы:
+        alias (str): Алиас базы.
+        vacuum (bool): Выполнить полный VACUUM вместо инкрементального.
+        incremental_pages (int, optional): Сколько свободных страниц вернуть; по умолчанию все.
+
+    Возвращает:
+        dict: Размер до и после (database_size), длительность шагов в секундах и режим auto_vacuum
+        после обслуживания ('none', 'full' или 'incremental').
+
+    Исключения:
+        ValueError: Если база не SQLite или открыта транзакция.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise ValueError(f'База {alias} не является базой SQLite.')
+    if connection.in_atomic_block:
+        raise ValueError('Обслуживание базы выполняется только вне транзакции.')
+    before = database_size(alias)
+    steps = {}
+    with connection.cursor() as cursor:
+        commands = [('analyze', 'ANALYZE'), ('optimize', 'PRAGMA optimize')]
+        if vacuum:
+            commands.append(('vacuum', 'VACUUM'))
+        elif AUTO_VACUUM_MODES[_pragma(cursor, 'auto_vacuum')] == 'incremental':
+            pages = '' if incremental_pages is None else f'({int(incremental_pages)})'
+            commands.append(('incremental_vacuum', f'PRAGMA incremental_vacuum{pages}'))
+        commands.append(('wal_checkpoint', 'PRAGMA wal_checkpoint(TRUNCATE)'))
+        for step, sql in commands:
+            started = time.perf_counter()
+            cursor.execute(sql)
+            # incremental_vacuum освобождает по странице на каждую прочитанную строку результата
+            rows = cursor.fetchall()
+            steps[step] = round(time.perf_counter() - started, 3)
+        auto_vacuum = AUTO_VACUUM_MODES[_pragma(cursor, 'auto_vacuum')]
+    if rows and rows[0][0]:
+        logger.warning("Контрольная точка WAL базы %s не завершена: база занята другим соединением.", alias)
+    if auto_vacuum == 'none':
+        logger.warning(
+            "В базе %s выключен auto_vacuum: свободные страницы возвращает только полный VACUUM.", alias,
+        )
+    after = database_size(alias)
+    logger.info(
+        "Обслуживание базы %s: %s байт -> %s байт, шаги %s.",
+        alias, before['file_bytes'] + before['wal_bytes'], after['file_bytes'] + after['wal_bytes'], steps,
+    )
+    return {'before': before, 'after': after, 'steps': steps, 'auto_vacuum': auto_vacuum}
@@ -0,0 +1,210 @@
+"""
+Хранилище документов с дедупликацией по содержимому.
+
+Каждый загруженный файл при записи на диск хешируется (SHA-256) и сохраняется один раз под именем
+``blobs/<aa>/<bb>/<sha256><расширение>``; повторная загрузка того же содержимого возвращает имя уже
+существующего файла. Для каждого уникального файла в модели DocumentBlob хранится счетчик ссылок,
+который триггеры базы данных поддерживают при любом изменении полей document и deletion_document
+заявок (миграция 0012_documentblob). Файлы без ссылок удаляет команда gc_documents
+(функция collect_garbage).
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = 'blobs'
+GC_BATCH_SIZE = 500
+
+
+def blob_name(digest, original_name):
+    """
+    Возвращает имя файла в хранилище для содержимого с указанным хешем.
+
+    Аргументы:
+        digest (str): SHA-256 содержимого в шестнадцатеричном виде.
+        original_name (str): Исходное имя файла; из него берется расширение.
+
+    Возвращает:
+        str: Относительный путь вида blobs/aa/bb/<digest><расширение>.
+    """
+    extension = os.path.splitext(original_name)[1].lower()
+    return '/'.join((BLOB_PREFIX, digest[:2], digest[2:4], digest + extension))
+
+
+class DeduplicatingStorage(FileSystemStorage):
+    """
+    Файловое хранилище, которое сохраняет каждое уникальное содержимое один раз.
+
+    Содержимое записывается во временный файл рядом с итоговым каталогом с одновременным подсчетом
+    SHA-256, после чего атомарно переименовывается в имя по хешу (или удаляется, если такой файл уже
+    есть). Каталог upload_to поля при этом не используется.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым в _save, поэтому подбирать свободное имя не нужно
+        return name
+
+    def _save(self, name, content):
+        blobs_root = self.path(BLOB_PREFIX)
+        os.makedirs(blobs_root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=blobs_root, prefix='.upload-', delete=False) as temporary:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temporary.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                temporary.close()
+                os.unlink(temporary.name)
+                raise
+
+        stored_name = blob_name(digest.hexdigest(), name)
+        full_path = self.path(stored_name)
+        try:
+            # Запись DocumentBlob обновляется до проверки файла в одной транзакции: collect_garbage
+            # удаляет файл только вместе с записью, поэтому он либо увидит новое время загрузки,
+            # либо успеет удалить файл до проверки, и тогда файл будет записан заново
+            with transaction.atomic():
+                self._register(stored_name, size)
+                if os.path.exists(full_path):
+                    os.unlink(temporary.name)
+                    logger.info("Документ %s уже есть в хранилище, повторная копия не сохранена.", stored_name)
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temporary.name, self.file_permissions_mode)
+                    os.replace(temporary.name, full_path)
+        except BaseException:
+            if os.path.exists(temporary.name):
+                os.unlink(temporary.name)
+            raise
+        return stored_name
+
+    @staticmethod
+    def _register(name, size):
+        """
+        Создает запись DocumentBlob или обновляет время последней загрузки существующей.
+
+        Время загрузки защищает новый файл от gc_documents, пока ссылающаяся на него заявка
+        еще не сохранена.
+        """
+        DocumentBlob = apps.get_model('Task1', 'DocumentBlob')
+        now = timezone.now()
+        if not DocumentBlob.objects.filter(name=name).update(uploaded_at=now):
+            DocumentBlob.objects.bulk_create(
+                [DocumentBlob(name=name, size=size, uploaded_at=now)], ignore_conflicts=True
+            )
+
+
+def document_storage():
+    """
+    Возвращает хранилище документов заявок из настройки STORAGES['documents'].
+
+    Возвращает:
+        Storage: Хранилище для полей document и deletion_document.
+    """
+    return storages['documents']
+
+
+def collect_garbage(storage, grace, dry_run=False):
+    """
+    Удаляет из хранилища файлы, на которые не ссылается ни одна заявка.
+
+    Кандидаты — записи DocumentBlob с нулевым счетчиком ссылок, загруженные раньше, чем grace назад.
+    Перед удалением отсутствие ссылок перепроверяется по таблице заявок; у записей, на которые
+    ссылки нашлись, счетчик исправляется. Сначала в транзакции удаляется запись (с повторной
+    проверкой счетчика и времени загрузки под блокировкой), и только затем ее файл: если то же
+    содержимое загрузили снова, запись не удаляется и файл остается. Дополнительно удаляются файлы в каталоге blobs без записи
+    DocumentBlob (например, оставшиеся после сбоя во время загрузки).
+
+    Аргументы:
+        storage (DeduplicatingStorage): Хранилище документов.
+        grace (timedelta): Минимальный возраст файла, который можно удалить.
+        dry_run (bool): Только подсчитать, ничего не удаляя.
+
+    Возвращает:
+        tuple[int, int]: Количество удаленных файлов и освобожденный объем в байтах.
+    """
+    DocumentBlob = apps.get_model('Task1', 'DocumentBlob')
+    AddDebtorUser = apps.get_model('Task1', 'AddDebtorUser')
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+
+    candidates = DocumentBlob.objects.filter(ref_count__lte=0, uploaded_at__lt=cutoff).order_by('name')
+    last_name = ''
+    while True:
+        batch = dict(candidates.filter(name__gt=last_name).values_list('name', 'size')[:GC_BATCH_SIZE])
+        if not batch:
+            break
+        last_name = max(batch)
+        referenced = _referenced_counts(AddDebtorUser, batch)
+        for name, count in referenced.items():
+            logger.warning("Счетчик ссылок документа %s расходился с заявками и исправлен на %s.", name, count)
+            if not dry_run:
+                DocumentBlob.objects.filter(name=name).update(ref_count=count)
+        orphaned = [name for name in batch if name not in referenced]
+        if dry_run:
+            removed += len(orphaned)
+            freed += sum(batch[name] for name in orphaned)
+            continue
+        with transaction.atomic():
+            for name in orphaned:
+                deleted, _ = DocumentBlob.objects.filter(
+                    name=name, ref_count__lte=0, uploaded_at__lt=cutoff
+                ).delete()
+                if deleted:
+                    storage.delete(name)
+                    removed += 1
+                    freed += batch[name]
+
+    blobs_root = storage.path(BLOB_PREFIX)
+    cutoff_timestamp = cutoff.timestamp()
+    for directory, _, filenames in os.walk(blobs_root):
+        paths = {
+            os.path.relpath(os.path.join(directory, filename), storage.location).replace(os.sep, '/'): filename
+            for filename in filenames
+        }
+        known = set(DocumentBlob.objects.filter(name__in=paths).values_list('name', flat=True))
+        for name in paths.keys() - known:
+            full_path = storage.path(name)
+            stat = os.stat(full_path)
+            if stat.st_mtime >= cutoff_timestamp:
+                continue
+            removed += 1
+            freed += stat.st_size
+            if not dry_run:
+                os.unlink(full_path)
+
+    logger.info("Сборка мусора документов: удалено файлов %s, освобождено %s байт.", removed, freed)
+    return removed, freed
+
+
+def _referenced_counts(model, names):
+    """
+    Считает ссылки заявок на указанные файлы.
+
+    Возвращает:
+        dict[str, int]: Количество ссылок для файлов, на которые ссылается хотя бы одна заявка.
+    """
+    counts = {}
+    rows = model.objects.filter(Q(document__in=names) | Q(deletion_document__in=names)).values_list(
+        'document', 'deletion_document'
+    )
+    for row in rows:
+        for name in row:
+            if name in names:
+                counts[name] = counts.get(name, 0) + 1
+    return counts
@@ -0,0 +1,52 @@
+"""
+Вспомогательные средства для тестов: контроль бюджета SQL-запросов.
+
+assert_query_budget проверяет, что блок кода выполняет не больше заданного числа запросов и
+не повторяет одну и ту же форму запроса (см. middleware.query_shape) слишком много раз —
+типичный признак N+1 при обходе связанных объектов в цикле или в шаблоне.
+"""
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .middleware import query_shape, repeated_shapes
+
+
+@contextmanager
+def assert_query_budget(max_queries, max_repeats=3, using=connection):
+    """
+    Проверяет бюджет SQL-запросов блока кода.
+
+    Аргументы:
+        max_queries (int): Максимально допустимое количество запросов.
+        max_repeats (int): Максимально допустимое число повторов одной формы запроса.
+        using (BaseDatabaseWrapper): Соединение, запросы которого проверяются.
+
+    Возвращает:
+        CaptureQueriesContext: Перехваченные запросы, доступные внутри блока и после него.
+
+    Исключения:
+        AssertionError: Если бюджет превышен или обнаружены повторяющиеся запросы.
+    """
+    with CaptureQueriesContext(using) as captured:
+        yield captured
+
+    queries = [query['sql'] for query in captured.captured_queries]
+    problems = []
+    if len(queries) > max_queries:
+        problems.append(f'выполнено {len(queries)} запросов при бюджете {max_queries}')
+    for shape, count in repeated_shapes(queries, max_repeats + 1):
+        problems.append(f'запрос повторен {count} раз (допустимо {max_repeats}): {shape}')
+    if problems:
+        listing = '\n'.join(f'{number}. {query_shape(sql)}' for number, sql in enumerate(queries, start=1))
+        raise AssertionError('Превышен бюджет SQL-запросов: ' + '; '.join(problems) + '\n' + listing)
+
+
+class QueryBudgetMixin:
+    """
+    Примесь для TestCase с методом assertQueryBudget.
+    """
+
+    def assertQueryBudget(self, max_queries, max_repeats=3):
+        return assert_query_budget(max_queries, max_repeats=max_repeats)
@@ -1,3 +1,1153 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F, Sum
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from debitor_tracker.log_pipeline import JsonFormatter, SamplingFilter
+
+from . import benchmarks, jobs, replicas, search, sqlite_tuning, throttling
+from . import storage as storage_module
+from .admin import AddDebtorUserAdmin
+from .models import AddDebtorUser, Debtor, DebtSummary, DocumentBlob, Job, NewUsers, Sequence
+from .paginators import EstimatedCountPaginator
+from .testing import QueryBudgetMixin
+from .sequences import BlockAllocator, INDEX_KEY_SEQUENCE, allocate
+
+
+def create_user(username='creditor'):
+    return NewUsers.objects.create_user(
+        username, f'{username}@example.com', 'password', name='Иван', surname='Иванов', age=30, tg_account='@ivan',
+    )
+
+
+def debtor_fields(**extra):
+    fields = {
+        'name': 'Петр', 'surname': 'Петров', 'amount': Decimal('1000.00'),
+        'address': 'ул. Ленина, 1', 'region': 'Татарстан', 'city': 'Казань',
+    }
+    fields.update(extra)
+    return fields
+
+
+class DebtorsDatatableTests(TestCase):
+    def setUp(self):
+        user = create_user()
+        Debtor.objects.bulk_create([
+            Debtor(user=user, **debtor_fields(name=name, amount=Decimal(amount), city=city))
+            for name, amount, city in (
+                ('Анна', '300', 'Казань'), ('Борис', '100', 'Уфа'), ('Вера', '500', 'Казань'),
+                ('Глеб', '200', 'Уфа'), ('Дарья', '400', 'Уфа'),
+            )
+        ])
+
+    def get_page(self, **params):
+        response = self.client.get('/table/data/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_page_is_sorted_and_sliced_in_database(self):
+        page = self.get_page(**{'draw': 3, 'start': 1, 'length': 2, 'order[0][column]': 2, 'order[0][dir]': 'asc'})
+        self.assertEqual(page['draw'], 3)
+        self.assertEqual((page['recordsTotal'], page['recordsFiltered']), (5, 5))
+        self.assertEqual([(row[0], row[2]) for row in page['data']], [('Глеб', '200.00'), ('Анна', '300.00')])
+
+        page = self.get_page(**{'order[0][column]': 0, 'order[0][dir]': 'desc', 'length': 1})
+        self.assertEqual([row[0] for row in page['data']], ['Дарья'])
+
+    def test_search_filters_rows_and_count(self):
+        page = self.get_page(**{'search[value]': 'казань', 'order[0][column]': 0, 'order[0][dir]': 'asc'})
+        self.assertEqual((page['recordsTotal'], page['recordsFiltered']), (5, 2))
+        self.assertEqual([row[0] for row in page['data']], ['Анна', 'Вера'])
+
+    def test_invalid_parameters_fall_back_to_defaults(self):
+        page = self.get_page(**{'draw': 'x', 'start': -5, 'length': 10 ** 6, 'order[0][column]': 99})
+        self.assertEqual(page['draw'], 0)
+        self.assertEqual(len(page['data']), 5)
+
+
+class DebtorSearchTests(TestCase):
+    def setUp(self):
+        user = create_user()
+        self.fedor = Debtor.objects.create(user=user, **debtor_fields(name='Фёдор', surname='Ёлкин'))
+        self.olga = Debtor.objects.create(user=user, **debtor_fields(name='Ольга', surname='Сидорова', city='Уфа'))
+
+    def test_search_folds_case_and_yo(self):
+        self.assertEqual(search.search_debtor_ids('ФЕДОР'), [self.fedor.pk])
+        self.assertEqual(search.search_debtor_ids('елкин'), [self.fedor.pk])
+        self.assertEqual(search.search_debtor_ids('Ёлк'), [self.fedor.pk])
+        self.assertEqual(search.search_debtor_ids('уфа сидор'), [self.olga.pk])
+        self.assertEqual(search.search_debtor_ids('!!!'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        Debtor.objects.filter(pk=self.olga.pk).update(surname='Петрова')
+        self.assertEqual(search.search_debtor_ids('сидорова'), [])
+        self.assertEqual(search.search_debtor_ids('петрова'), [self.olga.pk])
+        self.fedor.delete()
+        self.assertEqual(search.search_debtor_ids('федор'), [])
+
+    def test_search_view_returns_matching_debtors(self):
+        response = self.client.get('/search/', {'q': 'фёдор'})
+        self.assertEqual([row['name'] for row in response.json()['results']], ['Фёдор'])
+
+
+class DebtSummaryTests(TestCase):
+    def summary(self):
+        return {
+            (row.region, row.city): (row.debtor_count, row.total_amount) for row in DebtSummary.objects.all()
+        }
+
+    def test_triggers_follow_inserts_updates_and_deletes(self):
+        user = create_user()
+        first = Debtor.objects.create(user=user, **debtor_fields(amount=Decimal('100')))
+        Debtor.objects.bulk_create([Debtor(user=user, **debtor_fields(amount=Decimal('50'), city='Набережные Челны'))])
+        self.assertEqual(self.summary(), {
+            ('Татарстан', 'Казань'): (1, Decimal('100')),
+            ('Татарстан', 'Набережные Челны'): (1, Decimal('50')),
+        })
+
+        Debtor.objects.filter(pk=first.pk).update(amount=Decimal('250'))
+        Debtor.objects.filter(city='Набережные Челны').update(city='Казань')
+        self.assertEqual(self.summary(), {('Татарстан', 'Казань'): (2, Decimal('300'))})
+
+        first.delete()
+        self.assertEqual(self.summary(), {('Татарстан', 'Казань'): (1, Decimal('50'))})
+        Debtor.objects.all().delete()
+        self.assertEqual(self.summary(), {})
+
+
+class IndexKeyAllocationTests(TestCase):
+    def test_single_inserts_share_one_sequence(self):
+        user = create_user()
+        request = AddDebtorUser.objects.create(user=user, **debtor_fields())
+        debtor = Debtor.objects.create(user=user, **debtor_fields())
+        self.assertIsNotNone(request.index_key)
+        self.assertEqual(debtor.index_key, request.index_key + 1)
+
+    def test_existing_index_key_is_kept(self):
+        user = create_user()
+        debtor = Debtor.objects.create(user=user, index_key=500, **debtor_fields())
+        self.assertEqual(debtor.index_key, 500)
+
+    def test_bulk_create_assigns_keys(self):
+        user = create_user()
+        requests = AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=user, **debtor_fields()) for _ in range(10)]
+        )
+        keys = [request.index_key for request in requests]
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertEqual(len(keys), 10)
+
+    def test_block_is_not_reserved_inside_transaction(self):
+        allocator = BlockAllocator('test_block', block_size=10)
+        self.assertEqual(allocator.allocate_many(3), [1, 2, 3])
+        self.assertEqual(list(allocate('test_block')), [4])
+
+
+class IndexKeyConcurrencyTests(TransactionTestCase):
+    threads = 8
+    inserts_per_thread = 25
+
+    def run_in_threads(self, target):
+        errors = []
+
+        def worker():
+            try:
+                target()
+            except Exception as e:  # pragma: no cover - выводится в сообщении теста
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_block_allocator_reserves_blocks(self):
+        allocator = BlockAllocator('test_block', block_size=10)
+        first = allocator.allocate_many(3)
+        second = allocator.allocate_many(9)
+        self.assertEqual(first + second, list(range(1, 13)))
+        # Первый запрос зарезервировал блок 1..12, второй израсходовал его остаток без обращения к базе
+        self.assertEqual(list(allocate('test_block')), [13])
+
+    def test_rolled_back_allocation_leaves_no_block(self):
+        allocator = BlockAllocator('test_block', block_size=10)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                allocator.allocate_many(2)
+                raise IntegrityError
+        keys = allocator.allocate_many(3)
+        # Другой процесс резервирует следующий блок после отката
+        other = BlockAllocator('test_block', block_size=10).allocate_many(3)
+        self.assertEqual(set(keys) & set(other), set())
+
+    def test_concurrent_inserts_get_unique_keys(self):
+        user = create_user()
+
+        def insert():
+            for i in range(self.inserts_per_thread):
+                if i % 2:
+                    AddDebtorUser.objects.create(user=user, **debtor_fields())
+                else:
+                    Debtor.objects.create(user=user, **debtor_fields())
+
+        self.run_in_threads(insert)
+        keys = list(AddDebtorUser.objects.values_list('index_key', flat=True))
+        keys += list(Debtor.objects.values_list('index_key', flat=True))
+        self.assertEqual(len(keys), self.threads * self.inserts_per_thread)
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_concurrent_block_allocation_has_no_duplicates(self):
+        allocator = BlockAllocator(INDEX_KEY_SEQUENCE, block_size=7)
+        allocated = []
+        lock = threading.Lock()
+
+        def take():
+            for _ in range(self.inserts_per_thread):
+                keys = allocator.allocate_many(3)
+                with lock:
+                    allocated.extend(keys)
+
+        self.run_in_threads(take)
+        self.assertEqual(len(allocated), self.threads * self.inserts_per_thread * 3)
+        self.assertEqual(len(set(allocated)), len(allocated))
+
+
+class AdminActionTestCase(TestCase):
+    changelist_url = '/admin/Task1/adddebtoruser/'
+
+    def setUp(self):
+        self.user = create_user()
+        self.admin = NewUsers.objects.create_superuser('admin', 'admin@example.com', 'password', name='А', surname='Б')
+        self.client.force_login(self.admin)
+
+    def run_action(self, action, requests, **extra):
+        data = {'action': action, '_selected_action': [request.pk for request in requests], **extra}
+        return self.client.post(self.changelist_url, data, follow=True)
+
+
+class ApproveSelectedTests(AdminActionTestCase):
+    def test_approves_pending_requests_in_bulk(self):
+        requests = AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=self.user, **debtor_fields(name=f'Должник{i}')) for i in range(5)]
+        )
+        rejected = AddDebtorUser.objects.create(user=self.user, status='rejected', **debtor_fields())
+
+        response = self.run_action('approve_selected', requests + [rejected])
+
+        self.assertEqual(Debtor.objects.count(), 5)
+        self.assertEqual(AddDebtorUser.objects.filter(status='added').count(), 5)
+        self.assertEqual(
+            set(Debtor.objects.values_list('index_key', flat=True)),
+            {request.index_key for request in requests},
+        )
+        messages = [str(message) for message in response.context['messages']]
+        self.assertEqual(len(messages), 1)
+        self.assertIn('5', messages[0])
+
+    def test_failed_rows_fall_back_to_row_level_handling(self):
+        requests = AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=self.user, **debtor_fields()) for _ in range(3)]
+        )
+        # Запись с тем же index_key уже есть в основной базе — вставка этой заявки нарушит уникальность
+        Debtor.objects.create(user=self.user, index_key=requests[1].index_key, **debtor_fields())
+
+        self.run_action('approve_selected', requests)
+
+        statuses = dict(AddDebtorUser.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[requests[0].pk], 'added')
+        self.assertEqual(statuses[requests[1].pk], 'pending')
+        self.assertEqual(statuses[requests[2].pk], 'added')
+        self.assertEqual(Debtor.objects.count(), 3)
+
+
+class ConfirmDeletionTests(AdminActionTestCase):
+    def test_deletes_matching_debtors_and_reports_missing(self):
+        requests = AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=self.user, status='deleting', **debtor_fields()) for _ in range(4)]
+        )
+        # Версия реестра увеличивается раз за транзакцию, поэтому подготовка фиксируется отдельно
+        with self.captureOnCommitCallbacks(execute=True):
+            for request in requests[:3]:
+                Debtor.objects.create(user=self.user, index_key=request.index_key, **debtor_fields())
+            unrelated = Debtor.objects.create(user=self.user, **debtor_fields())
+            # Совпадение по index_key с записью другого пользователя не считается
+            foreign = Debtor.objects.create(
+                user=create_user('other'), index_key=requests[3].index_key, **debtor_fields(),
+            )
+        pending = AddDebtorUser.objects.create(user=self.user, **debtor_fields())
+        version = Sequence.objects.get(name='debtor_registry').value
+
+        response = self.run_action('confirm_deletion', requests + [pending])
+
+        self.assertEqual(sorted(Debtor.objects.values_list('pk', flat=True)), [unrelated.pk, foreign.pk])
+        self.assertGreater(Sequence.objects.get(name='debtor_registry').value, version)
+        self.assertEqual(list(AddDebtorUser.objects.values_list('pk', flat=True)), [pending.pk])
+        messages = [str(message) for message in response.context['messages']]
+        self.assertIn('Удалено заявок: 4, из них найдено и удалено в основной базе: 3.', messages)
+        self.assertIn('Для 1 заявок запись в основной базе не найдена.', messages)
+
+    def test_cascaded_jobs_are_not_counted_as_requests(self):
+        requests = AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=self.user, status='deleting', **debtor_fields()) for _ in range(3)]
+        )
+        for request in requests:
+            Debtor.objects.create(user=self.user, index_key=request.index_key, **debtor_fields())
+            jobs.enqueue(jobs.PROCESS_DOCUMENT, {'field': 'document'}, debtor_request=request)
+
+        response = self.run_action('confirm_deletion', requests)
+
+        self.assertFalse(Job.objects.exists())
+        messages = [str(message) for message in response.context['messages']]
+        self.assertEqual(messages, ['Удалено заявок: 3, из них найдено и удалено в основной базе: 3.'])
+
+
+class ModerationQueueTests(AdminActionTestCase):
+    changelist_url = '/admin/Task1/moderationrequest/'
+
+    def test_queue_lists_only_active_requests_oldest_first(self):
+        AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=self.user, status='added', **debtor_fields(name='Архивный')) for _ in range(30)]
+            + [AddDebtorUser(user=self.user, status=status, **debtor_fields(name=f'Активный{i}'))
+               for i, status in enumerate(('pending', 'deleting', 'update_requested'))]
+        )
+
+        response = self.client.get(self.changelist_url)
+
+        names = [request.name for request in response.context['cl'].result_list]
+        self.assertEqual(names, ['Активный0', 'Активный1', 'Активный2'])
+        response = self.client.get(self.changelist_url, {'status': 'deleting'})
+        self.assertEqual([request.status for request in response.context['cl'].result_list], ['deleting'])
+
+    def test_paginator_estimates_large_unfiltered_counts(self):
+        AddDebtorUser.objects.bulk_create([AddDebtorUser(user=self.user, **debtor_fields()) for _ in range(30)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        paginator = EstimatedCountPaginator(AddDebtorUser.objects.order_by('pk'), 10)
+        paginator.exact_count_limit = 5
+        self.assertEqual(paginator.count, 30)
+        filtered = EstimatedCountPaginator(AddDebtorUser.objects.filter(status='pending').order_by('pk'), 10)
+        filtered.exact_count_limit = 5
+        self.assertEqual(filtered.count, 30)
+
+    def test_filtered_changelist_pages_past_exact_count_limit(self):
+        AddDebtorUser.objects.bulk_create([AddDebtorUser(user=self.user, **debtor_fields()) for _ in range(30)])
+        with mock.patch.object(EstimatedCountPaginator, 'exact_count_limit', 5), \
+                mock.patch.object(AddDebtorUserAdmin, 'list_per_page', 2):
+            response = self.client.get('/admin/Task1/adddebtoruser/', {'status__exact': 'pending', 'p': 15})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+
+class PersonalCabinetTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_login(self.user)
+
+    def test_query_count_does_not_depend_on_request_count(self):
+        AddDebtorUser.objects.bulk_create(
+            [AddDebtorUser(user=self.user, document='documents/contract.pdf', **debtor_fields()) for _ in range(30)]
+        )
+        self.client.get('/cabinet/')  # прогрев кэша счетчиков
+        # Сессия и пользователь берутся из кэша, остается только список заявок
+        with self.assertNumQueries(1):
+            response = self.client.get('/cabinet/')
+        self.assertEqual(len(response.context['requests']), 30)
+
+    def test_counts_are_invalidated_on_save_and_delete(self):
+        request = AddDebtorUser.objects.create(user=self.user, **debtor_fields())
+        AddDebtorUser.objects.create(user=self.user, status='rejected', **debtor_fields())
+        response = self.client.get('/cabinet/')
+        self.assertEqual(
+            (response.context['request_count'], response.context['approved_count'], response.context['rejected_count']),
+            (2, 0, 1),
+        )
+
+        request.status = 'added'
+        request.save()
+        response = self.client.get('/cabinet/')
+        self.assertEqual(response.context['approved_count'], 1)
+
+        request.delete()
+        response = self.client.get('/cabinet/')
+        self.assertEqual((response.context['request_count'], response.context['approved_count']), (1, 0))
+
+
+class SessionFastPathTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client.force_login(self.user)
+
+    def test_cached_session_and_user_need_no_queries(self):
+        self.client.get('/table/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/table/')
+        self.assertEqual(response.wsgi_request.user, self.user)
+
+    def test_profile_updates_refresh_cached_user(self):
+        self.client.get('/table/')
+        password = NewUsers.objects.get(pk=self.user.pk).password
+        self.client.post('/update_email', {'email': 'new@example.com'})
+        self.client.post('/update-telegram/', {'telegram': '@new'})
+
+        user = self.client.get('/table/').wsgi_request.user
+        self.assertEqual((user.email, user.tg_account), ('new@example.com', '@new'))
+        self.assertEqual(NewUsers.objects.get(pk=self.user.pk).password, password)
+
+
+@override_settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'login_ip': '100/m', 'login_username': '2/m'})
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttling._local_buckets.clear()
+        throttling._local_pruned_at = 0.0
+        throttling._local_rejections.clear()
+        throttling._cache_down = False
+
+    def test_login_is_rejected_before_authentication(self):
+        credentials = {'username': 'victim', 'password': 'wrong'}
+        with mock.patch('Task1.views.authenticate', return_value=None) as authenticate:
+            statuses = [self.client.post('/login/', credentials).status_code for _ in range(3)]
+            other = self.client.post('/login/', {'username': 'other', 'password': 'wrong'})
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual(authenticate.call_count, 3)
+        self.assertEqual(throttling.rejection_counts()['login_username'], {'shared': 1, 'process': 1})
+
+    def test_falls_back_to_process_buckets_without_cache(self):
+        with mock.patch.object(throttling, 'caches') as caches:
+            caches.__getitem__.side_effect = ConnectionError
+            statuses = [self.client.post('/login/', {'username': 'victim'}).status_code for _ in range(3)]
+            counts = throttling.rejection_counts()
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(counts['login_username'], {'shared': None, 'process': 1})
+
+    def test_concurrent_requests_are_counted_atomically(self):
+        with mock.patch.object(throttling.time, 'time', return_value=120.0):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                waits = list(executor.map(lambda _: throttling.consume('throttle:test', '5/m'), range(40)))
+            self.assertEqual(waits.count(0), 5)
+        self.assertEqual(set(waits) - {0}, {60.0})
+
+    def test_retry_after_runs_until_window_end(self):
+        with mock.patch.object(throttling.time, 'time', return_value=100.0):
+            waits = [throttling.consume('throttle:test', '2/m') for _ in range(3)]
+        self.assertEqual(waits, [0, 0, 20.0])
+        with mock.patch.object(throttling.time, 'time', return_value=120.0):
+            self.assertEqual(throttling.consume('throttle:test', '2/m'), 0)
+
+    def test_process_buckets_of_expired_windows_are_pruned(self):
+        with mock.patch.object(throttling, 'caches') as caches:
+            caches.__getitem__.side_effect = ConnectionError
+            with mock.patch.object(throttling.time, 'time', return_value=100.0):
+                for client in range(50):
+                    throttling.consume(f'throttle:test:{client}', '2/m')
+                throttling.consume('throttle:day', '2/d')
+            self.assertEqual(len(throttling._local_buckets), 51)
+            with mock.patch.object(throttling.time, 'time', return_value=200.0):
+                throttling.consume('throttle:test:new', '2/m')
+        self.assertEqual(set(throttling._local_buckets), {'throttle:day', 'throttle:test:new'})
+
+    def test_unavailable_cache_is_logged_once(self):
+        with mock.patch.object(throttling, 'caches') as caches, self.assertLogs('Task1.throttling') as logs:
+            caches.__getitem__.side_effect = ConnectionError
+            for _ in range(3):
+                self.client.post('/login/', {'username': 'victim'})
+        unavailable = [line for line in logs.output if 'Кэш ограничений недоступен' in line]
+        self.assertEqual(len(unavailable), 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BulkUploadTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_login(self.user)
+
+    def make_archive(self, *names):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name in names:
+                archive.writestr(name, b'%PDF-1.4 contract')
+        return SimpleUploadedFile('documents.zip', buffer.getvalue(), content_type='application/zip')
+
+    def test_valid_rows_are_created_and_errors_reported(self):
+        table = (
+            'Имя;Фамилия;Сумма долга;Адрес;Регион;Город;Документ\n'
+            'Петр;Петров;1500,50;ул. Ленина, 1;Татарстан;Казань;contract.pdf\n'
+            'Иван;Иванов;-5;ул. Мира, 2;Татарстан;Казань;contract.pdf\n'
+            'Анна;Смирнова;700;ул. Мира, 3;Татарстан;Казань;missing.pdf\n'
+            'Олег;Орлов;900;ул. Мира, 4;Татарстан;Казань;contract.pdf\n'
+        )
+        response = self.client.post('/bulk-upload/', {
+            'file': SimpleUploadedFile('debtors.csv', table.encode('utf-8-sig')),
+            'documents': self.make_archive('contract.pdf'),
+        })
+
+        result = response.context['result']
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [3, 4])
+        requests = list(AddDebtorUser.objects.order_by('pk'))
+        self.assertEqual([request.amount for request in requests], [Decimal('1500.50'), Decimal('900')])
+        # Один файл архива сохраняется один раз для всех строк
+        self.assertEqual(requests[0].document.name, requests[1].document.name)
+        self.assertTrue(all(request.index_key for request in requests))
+        self.assertEqual(
+            sorted(Job.objects.filter(kind=jobs.PROCESS_DOCUMENT).values_list('debtor_request_id', flat=True)),
+            [request.pk for request in requests],
+        )
+
+        report = self.client.get(f"/bulk-upload/reports/{response.context['report_id']}/")
+        content = b''.join(report.streaming_content).decode('utf-8-sig')
+        self.assertIn('missing.pdf', content)
+
+    def test_missing_columns_reject_the_file(self):
+        response = self.client.post('/bulk-upload/', {
+            'file': SimpleUploadedFile('debtors.csv', 'name,surname\nПетр,Петров\n'.encode()),
+        })
+        self.assertIsNone(response.context['result'])
+        self.assertFalse(AddDebtorUser.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DocumentStorageTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+
+    def submit(self, content, filename='contract.pdf'):
+        return AddDebtorUser.objects.create(
+            user=self.user, document=SimpleUploadedFile(filename, content), **debtor_fields()
+        )
+
+    def test_identical_uploads_share_one_reference_counted_blob(self):
+        first = self.submit(b'%PDF-1.4 contract')
+        second = self.submit(b'%PDF-1.4 contract', filename='Contract copy.PDF')
+        other = self.submit(b'%PDF-1.4 another contract')
+
+        self.assertEqual(first.document.name, second.document.name)
+        self.assertNotEqual(first.document.name, other.document.name)
+        self.assertEqual(DocumentBlob.objects.get(name=first.document.name).ref_count, 2)
+        with first.document.open('rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1.4 contract')
+
+        AddDebtorUser.objects.filter(pk=second.pk).update(deletion_document=other.document.name)
+        self.assertEqual(DocumentBlob.objects.get(name=other.document.name).ref_count, 2)
+        AddDebtorUser.objects.filter(pk__in=[first.pk, second.pk]).delete()
+        self.assertEqual(DocumentBlob.objects.get(name=first.document.name).ref_count, 0)
+        self.assertEqual(DocumentBlob.objects.get(name=other.document.name).ref_count, 1)
+
+    def test_gc_removes_only_unreferenced_blobs(self):
+        kept = self.submit(b'kept')
+        dropped = self.submit(b'dropped')
+        storage = kept.document.storage
+        dropped.delete()
+
+        call_command('gc_documents', '--grace-hours', '0', stdout=io.StringIO())
+
+        self.assertTrue(storage.exists(kept.document.name))
+        self.assertFalse(storage.exists(dropped.document.name))
+        self.assertEqual(list(DocumentBlob.objects.values_list('name', flat=True)), [kept.document.name])
+
+    def test_gc_keeps_blob_uploaded_again_during_collection(self):
+        dropped = self.submit(b'dropped')
+        name, storage = dropped.document.name, dropped.document.storage
+        dropped.delete()
+        DocumentBlob.objects.filter(name=name).update(uploaded_at=timezone.now() - timedelta(days=1))
+        referenced_counts = storage_module._referenced_counts
+
+        def upload_again(model, names):
+            # То же содержимое загружают между выбором кандидатов и удалением
+            self.assertEqual(storage.save('again.pdf', SimpleUploadedFile('again.pdf', b'dropped')), name)
+            return referenced_counts(model, names)
+
+        with mock.patch.object(storage_module, '_referenced_counts', side_effect=upload_again):
+            removed, _ = storage_module.collect_garbage(storage, timedelta(hours=1))
+
+        self.assertEqual(removed, 0)
+        self.assertTrue(storage.exists(name))
+        self.assertTrue(DocumentBlob.objects.filter(name=name).exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client.force_login(self.user)
+
+    def test_uploaded_document_is_processed_by_worker(self):
+        pdf = b'%PDF-1.4\n1 0 obj << /Type /Pages /Count 2 >>\n2 0 obj << /Type /Page >>\n3 0 obj << /Type/Page >>'
+        self.client.post('/add-debtor/', {
+            **debtor_fields(amount='1500'), 'document': SimpleUploadedFile('contract.pdf', pdf),
+        })
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.status), (jobs.PROCESS_DOCUMENT, 'queued'))
+
+        call_command('run_worker', '--once', stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.result['mime_type'], 'application/pdf')
+        self.assertEqual(job.result['pages'], 2)
+        self.assertContains(self.client.get('/cabinet/'), 'Документ проверен')
+
+    def test_pool_worker_survives_unexpected_job_error(self):
+        class InlineExecutor(ThreadPoolExecutor):
+            # Пул в тестовом процессе: задачи видят подмененный jobs.run
+            def __init__(self, max_workers, initializer):
+                super().__init__(max_workers=1)
+
+        jobs.enqueue('broken')
+        jobs.enqueue('healthy')
+        run = mock.Mock(side_effect=[RuntimeError('процесс упал'), 'done'])
+        output = io.StringIO()
+        with mock.patch.multiple('Task1.management.commands.run_worker',
+                                 ProcessPoolExecutor=InlineExecutor, connections=mock.DEFAULT), \
+                mock.patch.object(jobs, 'run', run), self.assertLogs('Task1.management.commands.run_worker', 'ERROR'):
+            call_command('run_worker', '--once', '--concurrency', '2', stdout=output)
+        self.assertEqual(run.call_count, 2)
+        self.assertIn('Выполнено задач: 1', output.getvalue())
+
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        job = jobs.enqueue('flaky', max_attempts=2)
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': mock.Mock(side_effect=OSError('диск занят'))}):
+            [(job_id, lease)] = jobs.claim('worker-a', 10)
+            self.assertEqual(job_id, job.pk)
+            self.assertEqual(jobs.run(job.pk, 'worker-a', lease), 'queued')
+            job.refresh_from_db()
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(jobs.claim('worker-a', 10), [])
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            [(_, lease)] = jobs.claim('worker-a', 10)
+            self.assertEqual(jobs.run(job.pk, 'worker-a', lease), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.last_error), (2, "OSError('диск занят')"))
+
+    def test_leased_job_is_not_claimed_twice_until_lease_expires(self):
+        job = jobs.enqueue('slow')
+        [(_, lease)] = jobs.claim('worker-a', 10)
+        self.assertEqual(jobs.claim('worker-b', 10), [])
+
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([job_id for job_id, _ in jobs.claim('worker-b', 10)], [job.pk])
+        # Результат упавшего обработчика, потерявшего аренду, не записывается
+        with mock.patch.dict(jobs.HANDLERS, {'slow': lambda job: None}):
+            jobs.run(job.pk, 'worker-a', lease)
+        self.assertEqual(Job.objects.get(pk=job.pk).locked_by, 'worker-b')
+
+    def test_stale_run_of_same_worker_does_not_overwrite_new_claim(self):
+        job = jobs.enqueue('slow')
+        [(_, stale_lease)] = jobs.claim('host:1', 10)
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        # Процессы пула захватывают задачи под общим идентификатором обработчика
+        [(_, lease)] = jobs.claim('host:1', 10)
+
+        with mock.patch.dict(jobs.HANDLERS, {'slow': lambda job: {'run': 'stale'}}):
+            jobs.run(job.pk, 'host:1', stale_lease)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_until), ('running', lease))
+
+        with mock.patch.dict(jobs.HANDLERS, {'slow': lambda job: {'run': 'current'}}):
+            self.assertEqual(jobs.run(job.pk, 'host:1', lease), 'done')
+        self.assertEqual(Job.objects.get(pk=job.pk).result, {'run': 'current'})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DocumentDownloadTests(TestCase):
+    content = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    def setUp(self):
+        self.owner = create_user()
+        self.debtor_request = AddDebtorUser.objects.create(
+            user=self.owner, document=SimpleUploadedFile('scan.pdf', self.content), **debtor_fields()
+        )
+        self.url = f'/requests/{self.debtor_request.pk}/document/'
+
+    def test_owner_gets_file_with_range_and_etag_support(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-18')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 9-18/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[9:19])
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-').status_code, 416)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_only_owner_and_staff_have_access(self):
+        self.client.force_login(create_user('stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        staff = create_user('moderator')
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(DOCUMENT_SENDFILE_BACKEND='x-accel-redirect')
+    def test_front_proxy_mode_sends_only_headers(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.debtor_request.document.name)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RestApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+
+    def test_debtors_cursor_pages_with_sparse_fields_and_filters(self):
+        for amount in ('100.00', '200.00', '300.00'):
+            Debtor.objects.create(user=self.user, **debtor_fields(amount=Decimal(amount)))
+        Debtor.objects.create(user=self.user, **debtor_fields(region='Москва'))
+
+        page = self.client.get('/api/debtors/', {'page_size': 2, 'fields': 'surname,amount', 'region': 'Татарстан'}).json()
+        self.assertEqual(page['results'], [{'surname': 'Петров', 'amount': '100.00'}, {'surname': 'Петров', 'amount': '200.00'}])
+        self.assertEqual([row['amount'] for row in self.client.get(page['next']).json()['results']], ['300.00'])
+
+        page = self.client.get('/api/debtors/', {'amount_min': '150', 'amount_max': '250', 'fields': 'amount'}).json()
+        self.assertEqual(page['results'], [{'amount': '200.00'}])
+        self.assertEqual(self.client.get('/api/debtors/', {'fields': 'password'}).status_code, 400)
+
+    def test_requests_list_only_own_records(self):
+        AddDebtorUser.objects.create(user=self.user, status='rejected', **debtor_fields())
+        AddDebtorUser.objects.create(user=self.user, **debtor_fields())
+        AddDebtorUser.objects.create(user=create_user('other'), **debtor_fields())
+        self.assertEqual(self.client.get('/api/requests/').status_code, 403)
+
+        self.client.force_login(self.user)
+        results = self.client.get('/api/requests/', {'status': 'pending,rejected', 'fields': 'status'}).json()['results']
+        self.assertEqual(results, [{'status': 'rejected'}, {'status': 'pending'}])
+
+    def test_basic_credentials_are_not_checked(self):
+        # Пароли проверяет только вход с ограничением частоты, API их не принимает
+        credentials = base64.b64encode(b'creditor:password').decode()
+        with mock.patch.object(NewUsers, 'check_password') as check_password:
+            response = self.client.get('/api/requests/', HTTP_AUTHORIZATION=f'Basic {credentials}')
+        self.assertEqual(response.status_code, 403)
+        check_password.assert_not_called()
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_token_clients_use_api_without_csrf(self):
+        token = Token.objects.create(user=self.user)
+        client = Client(enforce_csrf_checks=True, HTTP_AUTHORIZATION=f'Token {token.key}')
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('contract.pdf', b'%PDF-1.4 contract')
+        response = client.post('/api/requests/bulk/', {
+            'requests': json.dumps([debtor_fields(amount='100', document='contract.pdf')]),
+            'documents': SimpleUploadedFile('docs.zip', archive.getvalue()),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(client.get('/api/requests/').json()['results'][0]['id'], response.json()['ids'][0])
+
+    @override_settings(THROTTLE_RATES={**settings.THROTTLE_RATES, 'api_token_failure_ip': '2/m'})
+    def test_invalid_tokens_are_throttled_before_lookup(self):
+        statuses = [
+            self.client.get('/api/requests/', HTTP_AUTHORIZATION=f'Token wrong{i}').status_code for i in range(2)
+        ]
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/requests/', HTTP_AUTHORIZATION='Token wrong')
+        self.assertEqual(statuses, [403, 403])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        self.client.force_login(self.user)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('contract.pdf', b'%PDF-1.4 contract')
+        items = [debtor_fields(amount=str(100 + i), document='contract.pdf') for i in range(300)]
+
+        def post(items):
+            archive.seek(0)
+            return self.client.post('/api/requests/bulk/', {
+                'requests': json.dumps(items), 'documents': SimpleUploadedFile('docs.zip', archive.getvalue()),
+            })
+
+        response = post(items + [debtor_fields(amount='0', document='missing.pdf')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']['300']), {'amount', 'document'})
+        self.assertFalse(AddDebtorUser.objects.exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = post(items)
+        # Заявки и задачи пишутся пачками, а не по одной
+        self.assertLess(len(queries), 30)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 300)
+        self.assertEqual(AddDebtorUser.objects.filter(user=self.user).values('document').distinct().count(), 1)
+        self.assertEqual(Job.objects.filter(kind=jobs.PROCESS_DOCUMENT).count(), 300)
+
+
+class ExportDebtorsCsvTests(TestCase):
+    def test_streams_filtered_rows_with_bom(self):
+        user = create_user()
+        Debtor.objects.create(user=user, **debtor_fields(name='Пётр'))
+        Debtor.objects.create(user=user, **debtor_fields(city='Москва', region='Московская область'))
+
+        response = self.client.get('/export/debtors.csv', {'region': 'Татарстан'})
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        lines = content.splitlines()
+        self.assertTrue(content.startswith('\ufeffИмя;Фамилия'))
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Пётр;Петров;1000.00', lines[1])
+
+    def test_invalid_date_is_rejected(self):
+        response = self.client.get('/export/debtors.csv', {'created_from': '01.01.2024'})
+        self.assertEqual(response.status_code, 400)
+
+
+class GenerateDebtorsCommandTests(TestCase):
+    def test_generates_requested_count_with_historical_timestamps(self):
+        create_user()
+        call_command('generate_debtors', count=25, batch_size=10, workers=2, seed=7, stdout=io.StringIO())
+
+        self.assertEqual(Debtor.objects.count(), 25)
+        self.assertEqual(DebtSummary.objects.aggregate(total=Sum('debtor_count'))['total'], 25)
+        oldest = Debtor.objects.order_by('created_at').first()
+        self.assertLess(oldest.created_at, timezone.now() - timedelta(days=1))
+        self.assertFalse(Debtor.objects.filter(updated_at__lt=F('created_at')).exists())
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    def test_flags_only_regressions_beyond_threshold(self):
+        baseline = {'scales': {'10000': {
+            'get_debtors_page': {'wall_ms': 10.0, 'queries': 1, 'peak_kb': 100.0},
+            'table_view': {'wall_ms': 5.0, 'queries': 0, 'peak_kb': 50.0},
+        }}}
+        current = {'scales': {'10000': {
+            'get_debtors_page': {'wall_ms': 11.5, 'queries': 1, 'peak_kb': 100.0},
+            'table_view': {'wall_ms': 7.0, 'queries': 1, 'peak_kb': 50.0},
+            'personal_cabinet': {'wall_ms': 30.0, 'queries': 4, 'peak_kb': 400.0},
+        }}}
+
+        regressions = benchmarks.compare(baseline, current, threshold=0.2)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(regression.startswith('10000 table_view') for regression in regressions))
+
+
+class BenchmarkScenarioTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.create(user=create_user(), **debtor_fields())
+
+    def run_scenario(self, name):
+        scenario = next(scenario for scenario in benchmarks.SCENARIOS if scenario.name == name)
+        context = benchmarks.BenchmarkContext()
+        queries = []
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                scenario.setup(context)
+            with CaptureQueriesContext(connection) as captured:
+                scenario.run(context)
+            queries.append(len(captured))
+        return queries
+
+    def test_cold_runs_bypass_response_cache(self):
+        self.assertTrue(all(self.run_scenario('get_debtors_full')))
+        self.assertEqual(self.run_scenario('get_debtors_full_cached'), [0, 0])
+
+
+class QueryInstrumentationTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = create_user()
+        Debtor.objects.bulk_create([Debtor(user=self.user, **debtor_fields()) for _ in range(20)])
+
+    def test_server_timing_header_reports_queries(self):
+        response = self.client.get('/table/data/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+')
+
+    def test_statistics_are_logged_as_json_when_formatted(self):
+        with self.assertLogs('Task1.sql', logging.INFO) as logs:
+            self.client.get('/table/data/')
+        record = logs.records[0]
+        self.assertNotIsInstance(record.args[0], str)
+        self.assertEqual(json.loads(record.getMessage())['path'], '/table/data/')
+
+    def test_budget_detects_repeated_query_shapes(self):
+        with self.assertRaisesRegex(AssertionError, 'повторен 20 раз'):
+            with self.assertQueryBudget(100):
+                for debtor in Debtor.objects.all():
+                    debtor.user.username
+
+    def test_hot_views_stay_within_budget(self):
+        self.client.force_login(self.user)
+        with self.assertQueryBudget(3):
+            self.client.get('/table/data/', {'search[value]': 'Казань'})
+        with self.assertQueryBudget(4):
+            self.client.get('/cabinet/')
+
+
+class LogPipelineTests(SimpleTestCase):
+    @staticmethod
+    def make_record(name, level, msg, *args):
+        return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+    def test_json_formatter_writes_one_line_per_record(self):
+        line = JsonFormatter().format(self.make_record('Task1.views', logging.INFO, "Дебитор %s\nдобавлен", 'Иванов'))
+        self.assertNotIn('\n', line)
+        entry = json.loads(line)
+        self.assertEqual(entry['logger'], 'Task1.views')
+        self.assertEqual(entry['message'], 'Дебитор Иванов\nдобавлен')
+
+    def test_sampling_filter_uses_longest_prefix_and_keeps_warnings(self):
+        sampling = SamplingFilter({'Task1': 1.0, 'Task1.sql': 0.0})
+        self.assertTrue(sampling.filter(self.make_record('Task1.views', logging.INFO, 'ok')))
+        self.assertFalse(sampling.filter(self.make_record('Task1.sql', logging.INFO, 'stats')))
+        self.assertTrue(sampling.filter(self.make_record('Task1.sql', logging.WARNING, 'repeats')))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        # Версия увеличивается один раз до фиксации: фиксацию изображает выполнение on_commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.create(user=self.user, **debtor_fields())
+
+    def test_unchanged_registry_answers_304_without_queries(self):
+        response = self.client.get('/get_debtors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/get_debtors/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_any_debtor_write_changes_etag(self):
+        etag = self.client.get('/get_debtors/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.create(user=self.user, **debtor_fields(surname='Сидоров'))
+
+        response = self.client.get('/get_debtors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['debtors']), 2)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.bulk_create([Debtor(user=self.user, **debtor_fields())])
+        response = self.client.get('/get_debtors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.filter(surname='Сидоров').delete()
+        self.assertEqual(self.client.get('/get_debtors/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_queryset_update_changes_etag(self):
+        etag = self.client.get('/get_debtors/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.filter(user=self.user).update(amount=Decimal('5.00'))
+
+        response = self.client.get('/get_debtors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['debtors'][0]['amount'], '5.00')
+
+    def test_version_is_bumped_once_per_transaction(self):
+        counter = Sequence.objects.filter(name='debtor_registry')
+        before = counter.get().value
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            for _ in range(3):
+                Debtor.objects.create(user=self.user, **debtor_fields())
+        self.assertEqual(counter.get().value, before + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Debtor.objects.create(user=self.user, **debtor_fields())
+        self.assertEqual(counter.get().value, before + 2)
+
+
+class AsyncViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        Debtor.objects.bulk_create([Debtor(user=self.user, **debtor_fields(surname=f'Петров{i}')) for i in range(3)])
+        AddDebtorUser.objects.create(user=self.user, document='documents/contract.pdf', **debtor_fields())
+
+    async def test_registry_views_under_asgi(self):
+        response = await self.async_client.get('/get_debtors/', {'stream': 'ndjson'})
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 3)
+
+        page = (await self.async_client.get('/get_debtors/', {'limit': 2})).json()
+        self.assertEqual(len(page['debtors']), 2)
+        self.assertIsNotNone(page['next_cursor'])
+
+        response = await self.async_client.get('/search/', {'q': 'петров1'})
+        self.assertEqual([row['surname'] for row in response.json()['results']], ['Петров1'])
+        # Запросы асинхронного ORM попадают в статистику промежуточного слоя
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/table/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (await self.async_client.get('/table/', headers={'If-None-Match': response['ETag']})).status_code, 304
+        )
+        response = await self.async_client.get('/cabinet/')
+        self.assertEqual((len(response.context['requests']), response.context['request_count']), (1, 1))
+
+    def test_streaming_under_wsgi_stays_synchronous(self):
+        response = self.client.get('/get_debtors/', {'stream': 'json'})
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # Реплика в тестах — зеркало default: маршрутизатор выбирает ее, а данные общие
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        replicas._status.clear()
+        # TransactionTestCase очищает таблицы, включая строки версии реестра из миграции
+        Sequence.objects.bulk_create(
+            [Sequence(name=name, value=1) for name in ('debtor_registry', 'debtor_registry_modified')],
+            ignore_conflicts=True,
+        )
+        self.user = create_user()
+
+    def test_reads_use_replica_until_first_write(self):
+        self.assertEqual(Debtor.objects.all().db, 'default')
+        with replicas.use_replica():
+            self.assertEqual(Debtor.objects.all().db, 'replica')
+            with replicas.use_primary():
+                self.assertEqual(Debtor.objects.all().db, 'default')
+            Debtor.objects.create(user=self.user, **debtor_fields())
+            self.assertEqual(Debtor.objects.all().db, 'default')
+
+    def test_lagging_replica_is_skipped(self):
+        with mock.patch.object(replicas, '_measure', return_value=(120.0, True)), replicas.use_replica():
+            self.assertEqual(Debtor.objects.all().db, 'default')
+            self.assertEqual(replicas.on_replica(Debtor.objects.all()).db, 'default')
+
+    def test_writes_pin_client_and_stale_responses_lose_validators(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/update-telegram/', {'telegram': '@new'})
+        self.assertIn(replicas.REPLICA_PIN_COOKIE, response.cookies)
+
+        anonymous = Client()
+        with mock.patch.object(replicas, '_measure', return_value=(1.0, True)):
+            response = anonymous.get('/get_debtors/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('ETag', self.client.get('/get_debtors/'))
+
+    async def test_async_stream_checks_replica_lag_outside_event_loop(self):
+        await Debtor.objects.acreate(user=self.user, **debtor_fields())
+        response = await self.async_client.get('/get_debtors/', {'stream': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('replica', replicas._status)
+
+    def test_refresh_copies_primary_with_backup_api(self):
+        Debtor.objects.create(user=self.user, **debtor_fields())
+        with self.assertRaises(ValueError):  # зеркало указывает на файл основной базы
+            replicas.refresh_sqlite_replica('replica')
+
+        path = tempfile.mktemp(suffix='.sqlite3')
+        with mock.patch.dict(connections['replica'].settings_dict, {'NAME': path}):
+            replicas.refresh_sqlite_replica('replica', pages=1)
+        with sqlite3.connect(path) as replica:
+            self.assertEqual(replica.execute('SELECT COUNT(*) FROM Task1_debtor').fetchone()[0], 1)
+
+    def test_lag_grows_while_replica_misses_a_write(self):
+        path = tempfile.mktemp(suffix='.sqlite3')
+        connections['replica'].close()
+        self.addCleanup(connections['replica'].close)
+        with mock.patch.dict(connections['replica'].settings_dict, {'NAME': path}):
+            replicas.refresh_sqlite_replica('replica')
+            self.assertEqual(replicas._measure('replica'), (0.0, False))
+
+            Debtor.objects.create(user=self.user, **debtor_fields())
+            lag, behind = replicas._measure('replica')
+            self.assertTrue(behind)
+            self.assertLess(lag, settings.REPLICA_MAX_LAG)
+            # Новых записей нет, но реплика все дольше остается без последнего изменения
+            with mock.patch.object(replicas.time, 'time', return_value=time.time() + 600):
+                lag, behind = replicas._measure('replica')
+            self.assertGreaterEqual(lag, 600)
+
+
+class SqliteTuningTests(TransactionTestCase):
+    # Обслуживание (ANALYZE, VACUUM, контрольная точка) выполняется вне транзакции
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_get_configured_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+
+    def test_invalid_pragma_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            sqlite_tuning.apply_pragmas(connection, {'journal_mode': 'WAL; DROP TABLE Task1_debtor'})
+
+    def test_maintenance_reports_sizes(self):
+        result = sqlite_tuning.maintain()
+        self.assertEqual(list(result['steps'])[:2], ['analyze', 'optimize'])
+        self.assertEqual(list(result['steps'])[-1], 'wal_checkpoint')
+        self.assertGreater(result['after']['file_bytes'], 0)
+
+        output = io.StringIO()
+        call_command('db_maintenance', stdout=output)
+        self.assertIn('Освобождено', output.getvalue())
+
+    def test_maintenance_reports_disabled_auto_vacuum(self):
+        def restore():
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            sqlite_tuning.maintain(vacuum=True)
+
+        self.addCleanup(restore)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA auto_vacuum = NONE')
+            cursor.execute('VACUUM')
+        self.assertEqual(sqlite_tuning.maintain()['auto_vacuum'], 'none')
+
+        output = io.StringIO()
+        call_command('db_maintenance', stdout=output)
+        self.assertIn('db_maintenance --vacuum', output.getvalue())
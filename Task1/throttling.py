@@ -0,0 +1,312 @@
+"""
+Ограничение частоты запросов счетчиками фиксированных окон.
+
+Для каждой пары (область, ключ) — например, вход по IP-адресу или вход по имени пользователя —
+ведется счетчик запросов в текущем окне длиной в период лимита; запрос отклоняется, если счетчик
+превысил N, до начала следующего окна. Счетчики лежат в общем кэше (настройка THROTTLE_CACHE) под
+ключом с номером окна и увеличиваются атомарно (cache.add и cache.incr), поэтому лимит действует
+для всех процессов и не теряет одновременные запросы. Если кэш недоступен, используются счетчики
+в памяти процесса; счетчики истекших окон удаляются из них при записи не чаще раза в
+LOCAL_PRUNE_INTERVAL секунд. На стыке окон возможен всплеск до 2N запросов.
+
+Декоратор throttle проверяет лимиты до вызова представления, то есть до хеширования пароля
+и записи в базу данных. Неудачные проверки учетных данных можно считать отдельно (record_failure)
+и отклонять следующие попытки до проверки (failure_wait). Отклоненные запросы считаются по областям и ключам (rejection_counts).
+Лимиты задаются в настройке THROTTLE_RATES в виде '<количество>/<s|m|h|d>'.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+REJECTED_KEY = 'throttle:rejected:{}'
+# Как часто удалять счетчики истекших окон из памяти процесса, в секундах
+LOCAL_PRUNE_INTERVAL = 60
+
+# Ключ счетчика -> (номер окна, количество запросов, конец окна)
+_local_buckets = {}
+_local_pruned_at = 0.0
+_local_rejections = Counter()
+_local_lock = threading.Lock()
+# Недоступность кэша логируется один раз, а не на каждый запрос
+_cache_down = False
+
+
+def parse_rate(rate):
+    """
+    Разбирает лимит вида '5/m'.
+
+    Аргументы:
+        rate (str): Количество запросов и период (s, m, h или d).
+
+    Возвращает:
+        tuple[int, int]: Количество запросов в окне и длина окна в секундах.
+    """
+    count, unit = rate.split('/')
+    return int(count), RATE_UNITS[unit[0]]
+
+
+def _cache_failed(error):
+    global _cache_down
+    if not _cache_down:
+        _cache_down = True
+        logger.warning("Кэш ограничений недоступен (%s), используются счетчики процесса.", error)
+
+
+def _cache_restored():
+    global _cache_down
+    if _cache_down:
+        _cache_down = False
+        logger.info("Кэш ограничений снова доступен.")
+
+
+def _incr_shared(key, timeout):
+    cache = caches[settings.THROTTLE_CACHE]
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Ключ истек между add и incr
+        cache.add(key, 0, timeout)
+        return cache.incr(key)
+
+
+def _incr_local(key, window, expires, now):
+    global _local_pruned_at
+    with _local_lock:
+        if now - _local_pruned_at >= LOCAL_PRUNE_INTERVAL:
+            # Без очистки словарь растет на каждый новый IP-адрес или пользователя
+            for stale in [k for k, (_, _, end) in _local_buckets.items() if end <= now]:
+                del _local_buckets[stale]
+            _local_pruned_at = now
+        current, count, _ = _local_buckets.get(key, (window, 0, expires))
+        count = count + 1 if current == window else 1
+        _local_buckets[key] = (window, count, expires)
+    return count
+
+
+def consume(key, rate):
+    """
+    Учитывает запрос в счетчике текущего окна ключа key.
+
+    Аргументы:
+        key (str): Ключ счетчика.
+        rate (str): Лимит вида '5/m'.
+
+    Возвращает:
+        float: 0, если запрос разрешен, иначе количество секунд до начала следующего окна.
+    """
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    try:
+        # Запас в секунду, чтобы ключ не истек раньше конца окна
+        count = _incr_shared(f'{key}:{window}', period + 1)
+    except Exception as e:
+        _cache_failed(e)
+        count = _incr_local(key, window, (window + 1) * period, now)
+    else:
+        _cache_restored()
+    if count <= limit:
+        return 0
+    return (window + 1) * period - now
+
+
+def peek(key, rate):
+    """
+    Проверяет счетчик текущего окна ключа key, не учитывая запрос.
+
+    Аргументы:
+        key (str): Ключ счетчика.
+        rate (str): Лимит вида '5/m'.
+
+    Возвращает:
+        float: 0, если в окне еще есть место, иначе количество секунд до начала следующего окна.
+    """
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    try:
+        count = caches[settings.THROTTLE_CACHE].get(f'{key}:{window}', 0)
+    except Exception as e:
+        _cache_failed(e)
+        with _local_lock:
+            current, count, _ = _local_buckets.get(key, (window, 0, None))
+            count = count if current == window else 0
+    else:
+        _cache_restored()
+    if count < limit:
+        return 0
+    return (window + 1) * period - now
+
+
+def _record_rejection(name):
+    with _local_lock:
+        _local_rejections[name] += 1
+    try:
+        _incr_shared(REJECTED_KEY.format(name), None)
+    except Exception as e:
+        _cache_failed(e)
+
+
+def rejection_counts():
+    """
+    Возвращает счетчики отклоненных запросов по лимитам из THROTTLE_RATES.
+
+    Возвращает:
+        dict[str, dict]: Для каждого лимита — общее значение из кэша ('shared', None при
+        недоступном кэше) и значение текущего процесса ('process').
+    """
+    names = list(settings.THROTTLE_RATES)
+    try:
+        shared = caches[settings.THROTTLE_CACHE].get_many([REJECTED_KEY.format(name) for name in names])
+    except Exception:
+        shared = None
+    return {
+        name: {
+            'shared': None if shared is None else shared.get(REJECTED_KEY.format(name), 0),
+            'process': _local_rejections[name],
+        }
+        for name in names
+    }
+
+
+def client_ip(request):
+    """
+    Возвращает IP-адрес клиента.
+
+    Заголовок X-Forwarded-For учитывается, только если включена настройка THROTTLE_TRUST_X_FORWARDED_FOR
+    (приложение стоит за доверенным прокси).
+    """
+    if settings.THROTTLE_TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def authorization_token(request):
+    """
+    Возвращает токен из заголовка Authorization: Token <ключ> без проверки или пустую строку.
+    """
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    return parts[1] if len(parts) == 2 and parts[0].lower() == 'token' else ''
+
+
+# Функции, извлекающие из запроса значение ключа ограничения
+KEY_FUNCTIONS = {
+    'ip': client_ip,
+    'token': authorization_token,
+    'username': lambda request: request.POST.get('username', '').strip().lower(),
+    'user': lambda request: str(request.user.pk) if request.user.is_authenticated else '',
+}
+
+
+def _counter_key(name, identity):
+    digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+    return f'throttle:{name}:{digest}'
+
+
+def check(request, scope, keys):
+    """
+    Учитывает запрос в счетчиках всех ключей и считает отклонения.
+
+    Для каждого ключа используется лимит THROTTLE_RATES['<scope>_<ключ>']; ключи с пустым
+    значением (например, имя пользователя не передано) пропускаются.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+        scope (str): Область ограничения (например, 'login').
+        keys (Iterable[str]): Ключи из KEY_FUNCTIONS: 'ip', 'token', 'username', 'user'.
+
+    Возвращает:
+        float: 0, если запрос разрешен, иначе количество секунд до начала окна, в котором
+        разрешены все ключи.
+    """
+    retry_after = 0
+    for key in keys:
+        identity = KEY_FUNCTIONS[key](request)
+        if not identity:
+            continue
+        name = f'{scope}_{key}'
+        wait = consume(_counter_key(name, identity), settings.THROTTLE_RATES[name])
+        if wait:
+            _record_rejection(name)
+            retry_after = max(retry_after, wait)
+    if retry_after:
+        logger.warning("Запрос к %s отклонен ограничением частоты (%s).", request.path, scope)
+    return retry_after
+
+
+def record_failure(request, scope, key='ip'):
+    """
+    Учитывает неудачную проверку учетных данных в лимите THROTTLE_RATES['<scope>_<ключ>'].
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+        scope (str): Область неудачных попыток (например, 'api_token_failure').
+        key (str): Ключ из KEY_FUNCTIONS.
+    """
+    identity = KEY_FUNCTIONS[key](request)
+    if identity:
+        name = f'{scope}_{key}'
+        consume(_counter_key(name, identity), settings.THROTTLE_RATES[name])
+
+
+def failure_wait(request, scope, key='ip'):
+    """
+    Проверяет, исчерпан ли лимит неудачных попыток (см. record_failure), не учитывая запрос.
+
+    Возвращает:
+        float: 0, если попытка разрешена, иначе количество секунд до начала следующего окна.
+    """
+    identity = KEY_FUNCTIONS[key](request)
+    if not identity:
+        return 0
+    name = f'{scope}_{key}'
+    wait = peek(_counter_key(name, identity), settings.THROTTLE_RATES[name])
+    if wait:
+        _record_rejection(name)
+        logger.warning("Запрос к %s отклонен: исчерпан лимит неудачных попыток (%s).", request.path, scope)
+    return wait
+
+
+def throttle(scope, *keys):
+    """
+    Ограничивает частоту POST-запросов к представлению.
+
+    Запрос отклоняется ответом 429 с заголовком Retry-After, если исчерпан хотя бы один лимит
+    (см. check).
+
+    Аргументы:
+        scope (str): Область ограничения (например, 'login').
+        *keys (str): Ключи из KEY_FUNCTIONS: 'ip', 'username', 'user'.
+
+    Возвращает:
+        callable: Декоратор представления.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == 'POST':
+                retry_after = check(request, scope, keys)
+                if retry_after:
+                    response = HttpResponse(
+                        'Слишком много запросов. Повторите попытку позже.',
+                        status=429, content_type='text/plain; charset=utf-8',
+                    )
+                    response['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
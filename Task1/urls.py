@@ -1,10 +1,15 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from . import api, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('get_debtors/', views.get_debtors, name='get_debtors'),
+    path('search/', views.search_debtors, name='search_debtors'),
+    path('stats/regions/', views.debt_summary, name='debt_summary'),
+    path('stats/throttling/', views.throttling_stats, name='throttling_stats'),
+    path('export/debtors.csv', views.export_debtors_csv, name='export_debtors_csv'),
     path('table/', views.table_view, name='table'),
+    path('table/data/', views.debtors_datatable, name='debtors_datatable'),
     path('register/', views.user_register, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
@@ -17,7 +22,13 @@ urlpatterns = [
     path('update_full_name', views.update_full_name, name='update_full_name'),
     path('update_email', views.update_email, name='update_email'),
     path('add-debtor/', views.add_debtor, name='add_debtor'),
+    path('bulk-upload/', views.bulk_upload_debtors, name='bulk_upload'),
+    path('bulk-upload/reports/<slug:report_id>/', views.bulk_upload_report, name='bulk_upload_report'),
     path('edit-debtor/<int:debtor_id>/', views.edit_debtor, name='edit_debtor'),
+    path('requests/<int:pk>/document/', views.download_document, name='download_document'),
+    path('requests/<int:pk>/deletion-document/', views.download_document, {'field': 'deletion_document'},
+         name='download_deletion_document'),
+    path('api/', include(api.router.urls)),
     path('request_deletion/<int:debtor_id>/', views.request_deletion, name='request_deletion'),
     path('delete-debtor/<int:debtor_id>/', views.request_deletion, name='delete_debtor'),
 
@@ -1,19 +1,76 @@
+import base64
+import binascii
+import json
 import logging
+import os
+from datetime import datetime
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from .forms import UserRegistrationForm, LoginForm, DebtorRequestForm, DeletionRequestForm
-from .models import Debtor, AddDebtorUser, NewUsers
-from django.http import JsonResponse
+from .forms import UserRegistrationForm, LoginForm, DebtorRequestForm, DeletionRequestForm, BulkDebtorUploadForm
+from .models import Debtor, AddDebtorUser, Job, NewUsers, aget_request_counts
+from . import aggregates, bulk_upload, downloads, export, jobs, registry, replicas, search, throttling
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import authenticate, login as auth_login, logout
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import condition
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.dateformat import format as date_format
+from django.utils.timezone import localtime
 from decimal import Decimal, InvalidOperation
+from functools import wraps
 
 # Логирование для отслеживания действий
 logger = logging.getLogger(__name__)
 
+# Колонки таблицы дебиторов в порядке их следования в шаблоне first/table.html
+DATATABLE_COLUMNS = ('name', 'surname', 'amount', 'address', 'region', 'city', 'created_at', 'updated_at')
+DATATABLE_DEFAULT_LENGTH = 10
+DATATABLE_MAX_LENGTH = 100
+
+# Поля дебитора, отдаваемые через get_debtors
+DEBTOR_FIELDS = ('name', 'surname', 'amount', 'address', 'region', 'city', 'created_at', 'updated_at')
+# Размер пачки строк, которую серверный итератор читает из базы за один раз
+DEBTORS_STREAM_CHUNK_SIZE = 2000
+DEBTORS_PAGE_MAX_LIMIT = 1000
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Сколько ошибочных строк массовой загрузки показывать на странице
+BULK_UPLOAD_ERRORS_PREVIEW = 20
+
+# Поля заявки, которые выводятся в личном кабинете
+CABINET_REQUEST_FIELDS = (
+    'id', 'user_id', 'name', 'surname', 'amount', 'address', 'region', 'city', 'created_at', 'status', 'document',
+)
+
+
+def _load_user(view):
+    """
+    Загружает пользователя асинхронно (request.auser()) до вызова асинхронного представления.
+
+    Шаблоны, контекстные процессоры и registry.user_etag читают request.user синхронно; без
+    предварительной загрузки это было бы обращение к сессии и базе из цикла событий.
+
+    Аргументы:
+        view (callable): Асинхронное представление.
+
+    Возвращает:
+        callable: Обернутое представление.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
 
 def index(request):
     """
@@ -87,31 +144,289 @@ def table(request):
     return render(request, 'first/table.html')
 
 
-def get_debtors(request):
+@registry.preload_version
+@condition(etag_func=registry.etag, last_modified_func=registry.last_modified)
+@registry.cache_by_version
+async def get_debtors(request):
     """
-    Получает данные о всех дебиторах и возвращает их в формате JSON.
+    Получает данные о дебиторах и возвращает их в формате JSON.
 
     Эта функция извлекает информацию о дебиторах из базы данных, включая их имя, фамилию,
-    сумму долга, адрес, регион, город, а также дату создания и обновления. Данные затем
-    преобразуются в список словарей и отправляются в ответе в формате JSON.
+    сумму долга, адрес, регион, город, а также дату создания и обновления. Поддерживаются три режима:
+
+    * без параметров — весь реестр одним JSON-объектом {'debtors': [...]} (исходное поведение);
+    * ``limit`` и ``cursor`` — keyset-пагинация по паре (created_at, id): в ответе возвращается
+      страница дебиторов и непрозрачный курсор ``next_cursor`` для запроса следующей страницы;
+    * ``stream=ndjson`` или ``stream=json`` — потоковая выдача всего реестра (начиная с курсора,
+      если он передан) построчно в NDJSON или одним JSON-массивом без загрузки таблицы в память.
+
+    Ответ снабжается заголовками ETag и Last-Modified по версии реестра: если реестр не менялся,
+    клиент с If-None-Match/If-Modified-Since получает 304. Нестриминговые ответы кэшируются до
+    следующего изменения реестра.
+
+    Представление асинхронное: под ASGI чтение из базы не занимает поток на все время запроса.
 
     Аргументы:
         request (HttpRequest): Объект запроса, содержащий информацию о запросе пользователя.
 
     Возвращает:
-        JsonResponse: Ответ с данными о дебиторах в формате JSON, включающий информацию о каждом дебиторе.
+        JsonResponse | StreamingHttpResponse: Ответ с данными о дебиторах в формате JSON.
     """
     logger.info("Получение данных о дебиторах.")
-    # Получение всех дебиторов и их информации
-    debtors = Debtor.objects.all().values(
-        'name', 'surname', 'amount', 'address', 'region', 'city', 'created_at', 'updated_at'
-    )
-    debtor_list = list(debtors)  # Преобразуем QuerySet в список словарей
-    logger.info(f"Данные о дебиторах получены: {debtor_list}")
+    debtors = Debtor.objects.order_by('created_at', 'id').values('id', *DEBTOR_FIELDS)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = _decode_cursor(cursor)
+        except ValueError:
+            logger.warning("Получен некорректный курсор: %s", cursor)
+            return JsonResponse({'error': 'Некорректный курсор.'}, status=400)
+        debtors = debtors.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=last_id))
+
+    stream = request.GET.get('stream')
+    if stream in ('ndjson', 'json'):
+        response = await _streaming_debtors_response(request, debtors, stream)
+        logger.info("Запущена потоковая выдача дебиторов в формате %s.", stream)
+        return response
+
+    if 'limit' in request.GET:
+        limit = _parse_int(request.GET.get('limit'), DEBTORS_PAGE_MAX_LIMIT)
+        limit = min(max(limit, 1), DEBTORS_PAGE_MAX_LIMIT)
+        page = [row async for row in debtors[:limit + 1]]
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = _encode_cursor(page[-1]['created_at'], page[-1]['id'])
+        for row in page:
+            del row['id']
+        logger.info("Отдана страница из %s дебиторов.", len(page))
+        return JsonResponse({'debtors': page, 'next_cursor': next_cursor})
+
+    debtor_list = [_public_debtor(row) async for row in debtors]
+    logger.info("Данные о дебиторах получены: %s записей.", len(debtor_list))
     # Возвращаем информацию о дебиторах в формате JSON
     return JsonResponse({'debtors': debtor_list})
 
 
+def _public_debtor(row):
+    """
+    Убирает служебный первичный ключ из строки дебитора перед отдачей клиенту.
+
+    Аргументы:
+        row (dict): Строка дебитора, полученная через values().
+
+    Возвращает:
+        dict: Та же строка без ключа 'id'.
+    """
+    row.pop('id', None)
+    return row
+
+
+def _encode_debtor(row):
+    return json.dumps(_public_debtor(row), cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _stream_ndjson(rows):
+    """
+    Генерирует строки NDJSON: по одному JSON-объекту дебитора на строку.
+
+    Аргументы:
+        rows (Iterator[dict]): Серверный итератор строк дебиторов.
+
+    Возвращает:
+        Iterator[str]: Строки ответа.
+    """
+    for row in rows:
+        yield _encode_debtor(row) + '\n'
+
+
+async def _astream_ndjson(rows):
+    """
+    Асинхронная версия _stream_ndjson.
+    """
+    async for row in rows:
+        yield _encode_debtor(row) + '\n'
+
+
+def _stream_json_array(rows):
+    """
+    Генерирует JSON-массив дебиторов по частям, не собирая его в памяти целиком.
+
+    Аргументы:
+        rows (Iterator[dict]): Серверный итератор строк дебиторов.
+
+    Возвращает:
+        Iterator[str]: Фрагменты JSON-массива.
+    """
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + _encode_debtor(row)
+        separator = ','
+    yield ']'
+
+
+async def _astream_json_array(rows):
+    """
+    Асинхронная версия _stream_json_array.
+    """
+    yield '['
+    separator = ''
+    async for row in rows:
+        yield separator + _encode_debtor(row)
+        separator = ','
+    yield ']'
+
+
+async def _streaming_debtors_response(request, debtors, stream):
+    """
+    Формирует потоковый ответ с дебиторами.
+
+    Под ASGI строки читаются асинхронным итератором (aiterator), под WSGI — обычным: если тип
+    итератора не совпадает с сервером, Django собирает весь ответ в памяти.
+    База выбирается в потоке: маршрутизатор может проверять отставание реплики запросом.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+        debtors (QuerySet): Строки дебиторов (values()).
+        stream (str): Формат: 'ndjson' или 'json'.
+
+    Возвращает:
+        StreamingHttpResponse: Потоковый ответ.
+    """
+    # База выбирается сейчас: строки читаются уже после выхода из ReplicaRoutingMiddleware
+    debtors = debtors.using(await sync_to_async(lambda: debtors.db)())
+    if isinstance(request, ASGIRequest):
+        rows = debtors.aiterator(chunk_size=DEBTORS_STREAM_CHUNK_SIZE)
+        content = _astream_ndjson(rows) if stream == 'ndjson' else _astream_json_array(rows)
+    else:
+        rows = debtors.iterator(chunk_size=DEBTORS_STREAM_CHUNK_SIZE)
+        content = _stream_ndjson(rows) if stream == 'ndjson' else _stream_json_array(rows)
+    content_type = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def _encode_cursor(created_at, debtor_id):
+    """
+    Кодирует позицию keyset-пагинации в непрозрачный курсор.
+
+    Аргументы:
+        created_at (datetime): Дата создания последнего отданного дебитора.
+        debtor_id (int): Первичный ключ последнего отданного дебитора.
+
+    Возвращает:
+        str: Курсор в виде URL-безопасной строки base64.
+    """
+    payload = json.dumps([created_at.isoformat(), debtor_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """
+    Декодирует курсор, полученный от _encode_cursor.
+
+    Аргументы:
+        cursor (str): Курсор из параметра запроса.
+
+    Возвращает:
+        tuple[datetime, int]: Дата создания и первичный ключ последней отданной записи.
+
+    Исключения:
+        ValueError: Если курсор поврежден или имеет неверный формат.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, debtor_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(debtor_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f'Некорректный курсор: {cursor}') from e
+
+
+async def search_debtors(request):
+    """
+    Выполняет полнотекстовый поиск по реестру дебиторов.
+
+    Эта функция ищет дебиторов по имени, фамилии, адресу, региону и городу. Каждое слово запроса
+    сопоставляется как префикс без учета регистра (включая кириллицу, «ё» приравнивается к «е»),
+    результаты упорядочены по релевантности.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса с параметрами q, limit и offset.
+
+    Возвращает:
+        JsonResponse: Ответ со списком найденных дебиторов в поле 'results'.
+    """
+    query = request.GET.get('q', '').strip()
+    limit = min(max(_parse_int(request.GET.get('limit'), SEARCH_DEFAULT_LIMIT), 1), SEARCH_MAX_LIMIT)
+    offset = max(_parse_int(request.GET.get('offset'), 0), 0)
+
+    ids = await search.asearch_debtor_ids(query, limit=limit, offset=offset)
+    rows = {row['id']: row async for row in Debtor.objects.filter(id__in=ids).values('id', *DEBTOR_FIELDS)}
+    results = [rows[debtor_id] for debtor_id in ids if debtor_id in rows]
+    logger.info("Поиск дебиторов по запросу '%s': найдено %s.", query, len(results))
+    return JsonResponse({'query': query, 'results': results})
+
+
+def debt_summary(request):
+    """
+    Возвращает сводку долгов по регионам или по городам выбранного региона.
+
+    Данные читаются из сводной таблицы DebtSummary, которая поддерживается при каждом изменении
+    дебиторов, поэтому стоимость запроса зависит от количества регионов, а не от размера реестра.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса; необязательный параметр region выбирает регион.
+
+    Возвращает:
+        JsonResponse: Итоги по регионам ('regions') или по городам региона ('cities').
+    """
+    region = request.GET.get('region')
+    if region:
+        logger.info("Запрошена сводка по городам региона %s.", region)
+        return JsonResponse({'region': region, 'cities': aggregates.city_totals(region)})
+    logger.info("Запрошена сводка по регионам.")
+    return JsonResponse({
+        'total_debtors': aggregates.total_debtors(),
+        'regions': aggregates.region_totals(),
+    })
+
+
+@replicas.use_replica()
+def export_debtors_csv(request):
+    """
+    Выгружает реестр дебиторов в CSV потоком.
+
+    Эта функция поддерживает фильтры region, city, created_from и created_to (даты в формате
+    ГГГГ-ММ-ДД). Строки читаются из базы серверным итератором и отправляются клиенту по мере
+    чтения, поэтому выгрузка начинается сразу и не зависит по памяти от размера реестра.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса с параметрами фильтрации.
+
+    Возвращает:
+        StreamingHttpResponse: CSV-файл в кодировке UTF-8 с BOM.
+    """
+    try:
+        debtors = export.filter_debtors(
+            region=request.GET.get('region'),
+            city=request.GET.get('city'),
+            created_from=request.GET.get('created_from'),
+            created_to=request.GET.get('created_to'),
+        )
+    except export.ExportFilterError as e:
+        logger.warning("Некорректный фильтр выгрузки: %s", e)
+        return JsonResponse({'error': str(e)}, status=400)
+
+    logger.info("Запущена выгрузка дебиторов в CSV с фильтрами %s.", dict(request.GET.items()))
+    # База выбирается сейчас: строки читаются уже после выхода из ReplicaRoutingMiddleware
+    debtors = debtors.using(debtors.db)
+    response = StreamingHttpResponse(export.iter_csv(debtors), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="debtors.csv"'
+    return response
+
+
+@throttling.throttle('register', 'ip')
 def user_register(request):
     """
     Обрабатывает процесс регистрации нового пользователя.
@@ -138,16 +453,17 @@ def user_register(request):
             user.save()
             auth_login(request, user)  # Автоматический вход после регистрации
             messages.success(request, 'Ваш аккаунт был создан и вы автоматически вошли в систему.')
-            logger.info(f"Пользователь {user.username} успешно зарегистрирован.")
+            logger.info("Пользователь %s успешно зарегистрирован.", user.username)
             return redirect('index')
         else:
             messages.error(request, 'Пожалуйста, исправьте ошибки в форме.')
-            logger.warning(f"Ошибка при регистрации: {form.errors}")
+            logger.warning("Ошибка при регистрации: %s", form.errors)
     else:
         form = UserRegistrationForm()
     return render(request, 'first/register.html', {'form': form})
 
 
+@throttling.throttle('login', 'ip', 'username')
 def login_view(request):
     """
     Обрабатывает процесс входа пользователя.
@@ -173,19 +489,33 @@ def login_view(request):
             user = authenticate(request, username=username, password=password)
             if user is not None:
                 auth_login(request, user)
-                logger.info(f"Пользователь {username} успешно вошёл в систему.")
+                logger.info("Пользователь %s успешно вошёл в систему.", username)
                 return redirect('index')
             else:
                 messages.error(request, 'Неправильное имя пользователя или пароль.')
-                logger.warning(f"Неудачная попытка входа для {username}")
+                logger.warning("Неудачная попытка входа для %s", username)
         else:
             messages.error(request, 'Пожалуйста, исправьте ошибки в форме.')
-            logger.warning(f"Ошибка при входе: {form.errors}")
+            logger.warning("Ошибка при входе: %s", form.errors)
     else:
         form = LoginForm()
     return render(request, 'first/login.html', {'form': form})
 
 
+@staff_member_required
+def throttling_stats(request):
+    """
+    Возвращает счетчики запросов, отклоненных ограничением частоты.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+
+    Возвращает:
+        JsonResponse: Для каждого лимита — общий счетчик ('shared') и счетчик текущего процесса ('process').
+    """
+    return JsonResponse(throttling.rejection_counts())
+
+
 def logout_view(request):
     """
     Обрабатывает процесс выхода пользователя из системы.
@@ -224,29 +554,33 @@ def change_password(request):
     if not request.user.is_authenticated:
         return redirect('login')
 
-    logger.info(f"Запрос на изменение пароля для пользователя {request.user.username}")
+    logger.info("Запрос на изменение пароля для пользователя %s", request.user.username)
     if request.method == 'POST':
         form = PasswordChangeForm(user=request.user, data=request.POST)
         if form.is_valid():
             form.save()
             update_session_auth_hash(request, form.user)  # Обновляем сессию для пользователя
             messages.success(request, 'Ваш пароль был успешно изменен.')
-            logger.info(f"Пароль для пользователя {request.user.username} успешно изменён.")
+            logger.info("Пароль для пользователя %s успешно изменён.", request.user.username)
             return redirect('index')
         else:
             messages.error(request, 'Пожалуйста, исправьте ошибки в форме.')
-            logger.warning(f"Ошибка при изменении пароля для пользователя {request.user.username}: {form.errors}")
+            logger.warning("Ошибка при изменении пароля для пользователя %s: %s", request.user.username, form.errors)
     else:
         form = PasswordChangeForm(user=request.user)
     return render(request, 'first/change_password.html', {'form': form})
 
 
-def table_view(request):
+@_load_user
+@registry.preload_version
+@condition(etag_func=registry.user_etag, last_modified_func=registry.last_modified)
+async def table_view(request):
     """
-    Отображает таблицу с данными о дебиторах.
+    Отображает страницу таблицы дебиторов.
 
-    Эта функция получает все данные о дебиторах из базы данных и передает их в шаблон для отображения.
-    В журнал записывается информация о доступе к таблице и полученных данных.
+    Представление асинхронное и отдает только разметку страницы, не читая дебиторов из базы данных:
+    строки таблица запрашивает постранично у debtors_datatable (серверный режим DataTables).
+    Ответ кэшируется по ETag версии реестра. В журнал записывается факт доступа к таблице.
 
     Аргументы:
         request (HttpRequest): Объект запроса, содержащий информацию о текущем запросе.
@@ -255,31 +589,116 @@ def table_view(request):
         HttpResponse: Отображает страницу с таблицей дебиторов.
     """
     logger.info("Доступ к просмотру таблицы.")
-    # Отображение таблицы с дебиторами
+    # Строки таблицы подгружаются постранично через debtors_datatable
+    return render(request, 'first/table.html')
+
+
+def debtors_datatable(request):
+    """
+    Отдает страницу таблицы дебиторов в формате серверного режима DataTables.
+
+    Эта функция принимает параметры протокола DataTables (draw, start, length, order, search),
+    выполняет фильтрацию, сортировку и постраничную выборку на стороне базы данных и возвращает
+    только строки текущей страницы. Благодаря этому стоимость загрузки страницы не зависит от
+    общего количества дебиторов в реестре.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса с параметрами DataTables в строке запроса.
+
+    Возвращает:
+        JsonResponse: Ответ с полями draw, recordsTotal, recordsFiltered и data.
+    """
+    params = request.GET
+    draw = _parse_int(params.get('draw'), 0)
+    start = max(_parse_int(params.get('start'), 0), 0)
+    length = _parse_int(params.get('length'), DATATABLE_DEFAULT_LENGTH)
+    if length <= 0 or length > DATATABLE_MAX_LENGTH:
+        length = DATATABLE_MAX_LENGTH
+    search_value = params.get('search[value]', '').strip()
+
+    # Сортировка разрешена только по известным колонкам, id добавляется для стабильного порядка
+    column_index = _parse_int(params.get('order[0][column]'), len(DATATABLE_COLUMNS) - 2)
+    if not 0 <= column_index < len(DATATABLE_COLUMNS):
+        column_index = len(DATATABLE_COLUMNS) - 2
+    direction = '-' if params.get('order[0][dir]', 'desc') == 'desc' else ''
+    ordering = [f'{direction}{DATATABLE_COLUMNS[column_index]}', f'{direction}id']
+
     debtors = Debtor.objects.all()
-    logger.info(f"Данные о дебиторах: {debtors}")
-    return render(request, 'first/table.html', {'debtors': debtors})
+    # Общее количество берется из сводной таблицы, чтобы не выполнять COUNT(*) по всему реестру
+    records_total = aggregates.total_debtors()
+    if search_value:
+        debtors = search.filter_debtors(debtors, search_value)
+        records_filtered = debtors.count()
+    else:
+        records_filtered = records_total
+
+    rows = debtors.order_by(*ordering).values_list(*DATATABLE_COLUMNS)[start:start + length]
+    data = [
+        [
+            name, surname, str(amount), address, region, city,
+            date_format(localtime(created_at), 'd.m.Y H:i'),
+            date_format(localtime(updated_at), 'd.m.Y H:i'),
+        ]
+        for name, surname, amount, address, region, city, created_at, updated_at in rows
+    ]
+    logger.debug("DataTables: страница %s+%s, найдено %s из %s.", start, length, records_filtered, records_total)
+    return JsonResponse({
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': data,
+    })
+
+
+def _parse_int(value, default):
+    """
+    Преобразует параметр запроса в целое число.
+
+    Аргументы:
+        value (str | None): Значение параметра.
+        default (int): Значение по умолчанию, если параметр отсутствует или некорректен.
+
+    Возвращает:
+        int: Преобразованное число или значение по умолчанию.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
 
 
 @login_required
-def personal_cabinet(request):
+@_load_user
+async def personal_cabinet(request):
     """
     Отображает личный кабинет пользователя с его заявками.
 
     Эта функция отображает личный кабинет пользователя, где он может видеть свои заявки
-    на добавление дебиторов. Доступ к кабинету разрешен только аутентифицированным пользователям.
+    на добавление дебиторов и счетчики заявок по статусам. Счетчики берутся из кэша
+    (см. models.aget_request_counts), поэтому количество запросов не зависит от числа заявок.
+    Доступ к кабинету разрешен только аутентифицированным пользователям.
     В журнал записывается информация о доступе пользователя к его кабинету.
 
+    К каждой заявке в том же запросе подгружается статус последней фоновой задачи по ее документу.
+
     Аргументы:
         request (HttpRequest): Объект запроса, содержащий информацию о текущем пользователе.
 
     Возвращает:
         HttpResponse: Отображает страницу личного кабинета с заявками пользователя.
     """
-    logger.info(f"Доступ к личному кабинету пользователя {request.user.username}")
-    # Отображение личного кабинета пользователя, где он может видеть свои заявки
-    requests = AddDebtorUser.objects.filter(user=request.user)
-    return render(request, 'first/personalAccount.html', {'requests': requests})
+    logger.info("Доступ к личному кабинету пользователя %s", request.user.username)
+    _latest_job = Job.objects.filter(debtor_request=OuterRef('pk')).order_by('-id')
+    # Заявки загружаются одним запросом и только с колонками, которые выводит шаблон
+    requests = [
+        debtor_request async for debtor_request in
+        AddDebtorUser.objects.filter(user=request.user).only(*CABINET_REQUEST_FIELDS).annotate(
+            document_job_status=Subquery(_latest_job.values('status')[:1]),
+            document_job_error=Subquery(_latest_job.values('last_error')[:1]),
+        )
+    ]
+    context = {'requests': requests, **await aget_request_counts(request.user.pk)}
+    return render(request, 'first/personalAccount.html', context)
 
 
 @login_required
@@ -306,7 +725,8 @@ def add_request(request):
             debtor_request = form.save(commit=False)
             debtor_request.user = request.user
             debtor_request.save()
-            logger.info(f"Заявка на дебитора добавлена пользователем {request.user.username}")
+            jobs.enqueue_document_processing(debtor_request)
+            logger.info("Заявка на дебитора добавлена пользователем %s", request.user.username)
             return redirect('personal_cabinet')
     else:
         form = DebtorRequestForm()
@@ -336,7 +756,9 @@ def edit_request(request, pk):
         form = DebtorRequestForm(request.POST, request.FILES, instance=debtor_request)
         if form.is_valid():
             form.save()
-            logger.info(f"Заявка на дебитора обновлена пользователем {request.user.username}")
+            if 'document' in form.changed_data:
+                jobs.enqueue_document_processing(debtor_request)
+            logger.info("Заявка на дебитора обновлена пользователем %s", request.user.username)
             return redirect('personal_cabinet')
     else:
         form = DebtorRequestForm(instance=debtor_request)
@@ -363,7 +785,7 @@ def delete_request(request, pk):
     debtor_request = get_object_or_404(AddDebtorUser, pk=pk, user=request.user)
     if request.method == 'POST':
         debtor_request.delete()
-        logger.info(f"Заявка на дебитора удалена пользователем {request.user.username}")
+        logger.info("Заявка на дебитора удалена пользователем %s", request.user.username)
         return redirect('personal_cabinet')
     return render(request, 'delete_request.html', {'request_obj': debtor_request})
 
@@ -387,12 +809,12 @@ def update_telegram(request):
         telegram = request.POST.get('telegram')
         if telegram:
             request.user.tg_account = telegram
-            request.user.save()
+            request.user.save(update_fields=['tg_account', 'updated_at'])
             messages.success(request, 'Ваш Telegram успешно обновлен!')
-            logger.info(f"Пользователь {request.user.username} обновил свой Telegram.")
+            logger.info("Пользователь %s обновил свой Telegram.", request.user.username)
         else:
             messages.error(request, 'Поле Telegram не может быть пустым.')
-            logger.warning(f"Ошибка при обновлении Telegram для пользователя {request.user.username} - поле пустое.")
+            logger.warning("Ошибка при обновлении Telegram для пользователя %s - поле пустое.", request.user.username)
         return redirect('personal_cabinet')
     return redirect('personal_cabinet')
 
@@ -419,13 +841,13 @@ def update_full_name(request):
         if name and surname:
             request.user.name = name
             request.user.surname = surname
-            request.user.save()
+            request.user.save(update_fields=['name', 'surname', 'updated_at'])
             messages.success(request, 'Ваши Имя и Фамилия успешно обновлены!')
-            logger.info(f"Пользователь {request.user.username} обновил Имя и Фамилию.")
+            logger.info("Пользователь %s обновил Имя и Фамилию.", request.user.username)
         else:
             messages.error(request, 'Поле Имя и Фамилия не может быть пустым.')
             logger.warning(
-                f"Ошибка при обновлении Имени и Фамилии для пользователя {request.user.username} - поля пустые.")
+                "Ошибка при обновлении Имени и Фамилии для пользователя %s - поля пустые.", request.user.username)
         return redirect('personal_cabinet')
     return redirect('personal_cabinet')
 
@@ -452,20 +874,21 @@ def update_email(request):
             if NewUsers.objects.filter(email=email).exists():
                 messages.error(request, 'Этот Email уже зарегистрирован другим пользователем.')
                 logger.warning(
-                    f"Ошибка при обновлении Email для пользователя {request.user.username} - email уже используется.")
+                    "Ошибка при обновлении Email для пользователя %s - email уже используется.", request.user.username)
             else:
                 request.user.email = email
-                request.user.save()
+                request.user.save(update_fields=['email', 'updated_at'])
                 messages.success(request, 'Ваш Email успешно обновлен!')
-                logger.info(f"Пользователь {request.user.username} обновил свой Email.")
+                logger.info("Пользователь %s обновил свой Email.", request.user.username)
         else:
             messages.error(request, 'Поле Email не может быть пустым.')
-            logger.warning(f"Ошибка при обновлении Email для пользователя {request.user.username} - поле пустое.")
+            logger.warning("Ошибка при обновлении Email для пользователя %s - поле пустое.", request.user.username)
         return redirect('personal_cabinet')
     return redirect('personal_cabinet')
 
 
 @login_required
+@throttling.throttle('add_debtor', 'ip', 'user')
 def add_debtor(request):
     """
     Обрабатывает добавление нового дебитора в систему.
@@ -493,7 +916,7 @@ def add_debtor(request):
         # Проверка обязательных полей
         if name and surname and amount and address and region and city:
             try:
-                AddDebtorUser.objects.create(
+                debtor_request = AddDebtorUser.objects.create(
                     name=name,
                     surname=surname,
                     amount=Decimal(amount),  # Преобразование строки в число
@@ -503,14 +926,16 @@ def add_debtor(request):
                     document=document,
                     user=request.user
                 )
+                # Проверка документа выполняется в фоне (run_worker), ответ не ждет ее окончания
+                jobs.enqueue_document_processing(debtor_request)
                 messages.success(request, 'Дебитор успешно добавлен!')
-                logger.info(f"Дебитор {name} {surname} добавлен пользователем {request.user.username}.")
+                logger.info("Дебитор %s %s добавлен пользователем %s.", name, surname, request.user.username)
             except InvalidOperation:
                 messages.error(request, 'Неверно введена сумма!')
-                logger.warning(f"Ошибка при добавлении дебитора {name} {surname} - неверная сумма.")
+                logger.warning("Ошибка при добавлении дебитора %s %s - неверная сумма.", name, surname)
         else:
             messages.error(request, 'Заполнены не все обязательные поля!')
-            logger.warning(f"Дебитор {name} {surname} не добавлен - отсутствуют обязательные поля.")
+            logger.warning("Дебитор %s %s не добавлен - отсутствуют обязательные поля.", name, surname)
 
         return redirect('personal_cabinet')
     return redirect('personal_cabinet')
@@ -557,11 +982,11 @@ def update_debtor(request, debtor_id):
 
             messages.success(request, 'Информация о дебиторе успешно обновлена!')
             logger.info(
-                f"Информация о дебиторе обновлена пользователем {request.user.username} для дебитора {debtor_id}")
+                "Информация о дебиторе обновлена пользователем %s для дебитора %s", request.user.username, debtor_id)
             return redirect('personal_cabinet')
         except AddDebtorUser.DoesNotExist:
             messages.error(request, 'Дебитор не найден.')
-            logger.error(f"Дебитор с id {debtor_id} не найден для пользователя {request.user.username}.")
+            logger.error("Дебитор с id %s не найден для пользователя %s.", debtor_id, request.user.username)
             return redirect('personal_cabinet')
     return redirect('personal_cabinet')
 
@@ -598,24 +1023,24 @@ def edit_debtor(request, debtor_id):
         created_at = request.POST.get('created_at')
 
         # Логирование начала процесса редактирования
-        logger.info(f"Пользователь {request.user.username} начал редактирование дебитора с id {debtor_id}.")
+        logger.info("Пользователь %s начал редактирование дебитора с id %s.", request.user.username, debtor_id)
 
         # Находим дебитора по ID и текущему пользователю
         try:
             debtor = AddDebtorUser.objects.get(id=debtor_id, user=request.user)
-            logger.info(f"Дебитор с ID {debtor_id} найден. Начинаем обновление данных.")
+            logger.info("Дебитор с ID %s найден. Начинаем обновление данных.", debtor_id)
         except AddDebtorUser.DoesNotExist:
             messages.error(request, "Дебитор не найден.")
-            logger.error(f"Дебитор с ID {debtor_id} не найден для пользователя {request.user.username}.")
+            logger.error("Дебитор с ID %s не найден для пользователя %s.", debtor_id, request.user.username)
             return redirect('personal_cabinet')
 
         # Обновляем данные, только если они были переданы в запросе
         if name:
             debtor.name = name
-            logger.info(f"Имя дебитора изменено на {name}.")
+            logger.info("Имя дебитора изменено на %s.", name)
         if surname:
             debtor.surname = surname
-            logger.info(f"Фамилия дебитора изменена на {surname}.")
+            logger.info("Фамилия дебитора изменена на %s.", surname)
 
         if amount:
             try:
@@ -623,42 +1048,44 @@ def edit_debtor(request, debtor_id):
                 amount = amount.replace(',', '.')
                 # Преобразуем строку в Decimal
                 debtor.amount = Decimal(amount)
-                logger.info(f"Сумма дебитора изменена на {debtor.amount}.")
+                logger.info("Сумма дебитора изменена на %s.", debtor.amount)
             except (InvalidOperation, ValueError):
                 # Если преобразование не удалось, отправляем ошибку
                 messages.error(request, "Неверный формат суммы.")
-                logger.error(f"Ошибка преобразования суммы: неверный формат {amount}.")
+                logger.error("Ошибка преобразования суммы: неверный формат %s.", amount)
                 return redirect('personal_cabinet')
 
         if address:
             debtor.address = address
-            logger.info(f"Адрес дебитора изменен на {address}.")
+            logger.info("Адрес дебитора изменен на %s.", address)
         if region:
             debtor.region = region
-            logger.info(f"Регион дебитора изменен на {region}.")
+            logger.info("Регион дебитора изменен на %s.", region)
         if city:
             debtor.city = city
-            logger.info(f"Город дебитора изменен на {city}.")
+            logger.info("Город дебитора изменен на %s.", city)
         if update_description:  # Если описание изменений есть
             debtor.update_description = update_description
-            logger.info(f"Добавлено описание изменений: {update_description}.")
+            logger.info("Добавлено описание изменений: %s.", update_description)
         if document:  # Если есть новый документ
             debtor.document = document
-            logger.info(f"Загружен новый документ для дебитора.")
+            logger.info("Загружен новый документ для дебитора.")
         if created_at:
             debtor.created_at = created_at
-            logger.info(f"Дата создания дебитора обновлена на {created_at}.")
+            logger.info("Дата создания дебитора обновлена на %s.", created_at)
 
         # Устанавливаем статус на "На обновление"
         debtor.status = status
-        logger.info(f"Статус дебитора обновлен на 'update_requested'.")
+        logger.info("Статус дебитора обновлен на 'update_requested'.")
 
         # Сохраняем изменения
         debtor.save()
+        if document:
+            jobs.enqueue_document_processing(debtor)
 
         # Уведомляем пользователя об успешном обновлении
         messages.success(request, 'Дебитор успешно обновлен! Ожидайте подтверждения от администратора.')
-        logger.info(f"Дебитор с ID {debtor_id} успешно обновлен пользователем {request.user.username}.")
+        logger.info("Дебитор с ID %s успешно обновлен пользователем %s.", debtor_id, request.user.username)
 
         # Перенаправляем после успешного редактирования
         return redirect('personal_cabinet')
@@ -666,7 +1093,7 @@ def edit_debtor(request, debtor_id):
     else:
         # Для GET запроса, возвращаем на личный кабинет
         logger.warning(
-            f"Пользователь {request.user.username} пытался редактировать дебитора с ID {debtor_id} через GET-запрос.")
+            "Пользователь %s пытался редактировать дебитора с ID %s через GET-запрос.", request.user.username, debtor_id)
         return redirect('personal_cabinet')
 
 
@@ -701,16 +1128,17 @@ def request_deletion(request, debtor_id):
                 debtor.deletion_document = form.cleaned_data.get('document')
                 debtor.status = 'deleting'  # Меняем статус на 'Удаляется'
                 debtor.save()
+                jobs.enqueue_document_processing(debtor, 'deletion_document')
 
                 # Уведомляем пользователя об успешном запросе на удаление
                 messages.success(request, 'Запрос на удаление успешно отправлен!')
                 logger.info(
-                    f"Пользователь {request.user.username} отправил запрос на удаление дебитора {debtor.name} {debtor.surname}.")
+                    "Пользователь %s отправил запрос на удаление дебитора %s %s.", request.user.username, debtor.name, debtor.surname)
             else:
                 # Если форма не прошла валидацию, выводим ошибку
                 messages.error(request, 'Ошибка при отправке запроса. Пожалуйста, попробуйте снова.')
                 logger.warning(
-                    f"Пользователь {request.user.username} не смог отправить запрос на удаление дебитора {debtor.name} {debtor.surname} - ошибка в форме.")
+                    "Пользователь %s не смог отправить запрос на удаление дебитора %s %s - ошибка в форме.", request.user.username, debtor.name, debtor.surname)
 
         else:
             # В случае GET-запроса, просто показываем сообщение
@@ -718,7 +1146,100 @@ def request_deletion(request, debtor_id):
 
     except AddDebtorUser.DoesNotExist:
         messages.error(request, 'Дебитор не найден.')
-        logger.error(f"Дебитор с id {debtor_id} не найден для пользователя {request.user.username}.")
+        logger.error("Дебитор с id %s не найден для пользователя %s.", debtor_id, request.user.username)
 
     # Перенаправляем обратно на личный кабинет
     return redirect('personal_cabinet')
+
+
+@login_required
+def bulk_upload_debtors(request):
+    """
+    Обрабатывает массовую загрузку заявок на добавление дебиторов.
+
+    Эта функция принимает таблицу дебиторов в формате CSV (или XLSX, если установлен openpyxl)
+    и ZIP-архив с документами. Строки проверяются по тем же правилам, что и одиночная заявка,
+    и записываются пачками. По строкам с ошибками формируется отчет, доступный для скачивания.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса, содержащий загружаемые файлы.
+
+    Возвращает:
+        HttpResponse: Страница загрузки с формой и итогами последней загрузки.
+    """
+    result = None
+    if request.method == 'POST':
+        form = BulkDebtorUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = bulk_upload.import_debtor_requests(
+                    request.user, upload, upload.name, documents=form.cleaned_data.get('documents')
+                )
+            except bulk_upload.BulkImportError as e:
+                messages.error(request, str(e))
+                logger.warning("Массовая загрузка пользователя %s отклонена: %s", request.user.username, e)
+            else:
+                messages.success(request, f'Создано заявок: {result.created}. Строк с ошибками: {len(result.errors)}.')
+        else:
+            messages.error(request, 'Пожалуйста, исправьте ошибки в форме.')
+    else:
+        form = BulkDebtorUploadForm()
+
+    context = {'form': form, 'result': result}
+    if result and result.report_name:
+        context['report_id'] = os.path.splitext(os.path.basename(result.report_name))[0]
+        context['errors_preview'] = result.errors[:BULK_UPLOAD_ERRORS_PREVIEW]
+    return render(request, 'first/bulk_upload.html', context)
+
+
+@login_required
+def bulk_upload_report(request, report_id):
+    """
+    Отдает CSV-отчет об ошибках массовой загрузки его владельцу.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+        report_id (str): Идентификатор отчета.
+
+    Возвращает:
+        FileResponse: Файл отчета.
+
+    Исключения:
+        Http404: Если отчет не найден среди отчетов текущего пользователя.
+    """
+    name = bulk_upload.report_path(request.user.pk, report_id)
+    if not default_storage.exists(name):
+        raise Http404('Отчет не найден.')
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=f'errors_{report_id}.csv')
+
+
+@login_required
+def download_document(request, pk, field='document'):
+    """
+    Отдает документ заявки ее владельцу или сотруднику.
+
+    Файл отдается через downloads.serve_document: с ETag, Cache-Control и поддержкой HTTP Range,
+    а при настроенном DOCUMENT_SENDFILE_BACKEND — силами фронтового сервера.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса.
+        pk (int): Идентификатор заявки.
+        field (str): Поле документа: 'document' или 'deletion_document'.
+
+    Возвращает:
+        HttpResponse: Ответ с документом.
+
+    Исключения:
+        Http404: Если заявка не найдена среди доступных пользователю или у нее нет документа.
+    """
+    requests = AddDebtorUser.objects.only('id', 'user_id', field)
+    if not request.user.is_staff:
+        requests = requests.filter(user=request.user)
+    debtor_request = get_object_or_404(requests, pk=pk)
+    document = getattr(debtor_request, field)
+    if not document or not document.storage.exists(document.name):
+        raise Http404('Документ не найден.')
+    extension = os.path.splitext(document.name)[1]
+    logger.info("Пользователь %s скачивает %s заявки %s.", request.user.username, field, pk)
+    return downloads.serve_document(request, document, f'{field}_{pk}{extension}')
@@ -0,0 +1,102 @@
+"""
+Неблокирующий конвейер логирования.
+
+Обработчики логгеров кладут записи в очередь (QueueListenerHandler), а запись на диск и в консоль
+выполняет отдельный поток QueueListener. Форматирование сообщений тоже происходит в этом потоке,
+поэтому поток запроса тратит на вызов логгера только постановку записи в очередь.
+
+Модуль также содержит JSON-форматтер (одна запись — одна строка JSON) и фильтр выборочного
+логирования по именам логгеров. Конфигурация подключается через LOGGING в settings.py.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматирует запись лога как одну строку JSON.
+
+    В строку попадают время (UTC, ISO 8601), уровень, имя логгера, модуль, текст сообщения и,
+    при наличии, трассировка исключения.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только часть записей указанных логгеров.
+
+    Доля задается для префикса имени логгера, применяется самый длинный подходящий префикс.
+    Записи уровня WARNING и выше пропускаются всегда.
+
+    Аргументы:
+        rates (dict[str, float]): Доля пропускаемых записей (от 0 до 1) по префиксам имен логгеров.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name):
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return rate
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Обработчик, передающий записи в очередь, которую разбирает фоновый поток.
+
+    Аргументы:
+        handlers (list[logging.Handler]): Обработчики, которые выполняют фактическую запись;
+            в dictConfig указываются ссылками вида 'cfg://handlers.<имя>'.
+        queue_size (int): Максимальный размер очереди; при переполнении записи отбрасываются,
+            а не блокируют поток запроса.
+
+    Атрибуты:
+        dropped (int): Количество записей, отброшенных из-за переполнения очереди.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        # dictConfig передает ConvertingList: ссылки cfg:// разрешаются при обращении по индексу
+        targets = [handlers[index] for index in range(len(handlers))]
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Форматирование откладывается до потока слушателя
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -36,10 +36,13 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'Task1',
 ]
 
 MIDDLEWARE = [
+    'Task1.middleware.QueryInstrumentationMiddleware',
+    'Task1.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,11 +81,81 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',  # Используем SQLite
         'NAME': BASE_DIR / 'db.sqlite3',  # Файл базы данных
+        # Тестовая база в файле, а не в памяти: тесты конкурентного доступа работают из нескольких потоков
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# PRAGMA, выполняемые при открытии каждого соединения SQLite (см. Task1.sqlite_tuning). WAL позволяет
+# читать во время записи, synchronous=NORMAL в режиме WAL не делает fsync на каждый COMMIT;
+# cache_size < 0 — размер кэша страниц в КиБ. SQLITE_TUNING=0 оставляет настройки SQLite по умолчанию,
+# но journal_mode и auto_vacuum записываются в файл базы: однажды открытая с WAL база (и db.sqlite3
+# из репозитория) остается в WAL. auto_vacuum действует для новых баз и после db_maintenance --vacuum
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'auto_vacuum': 'INCREMENTAL',
+} if os.environ.get('SQLITE_TUNING', '1') == '1' else {}
+
+# Локальная реплика для чтения реестра: копия db.sqlite3, которую обновляет команда refresh_replica
+# (backup API SQLite). В тестах она указывает на тестовую базу default.
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db_replica.sqlite3',
+    'TEST': {
+        'MIRROR': 'default',
+    },
+}
+
+# Маршрутизация чтений на реплики (см. Task1.replicas). DATABASE_REPLICAS — алиасы реплик через
+# запятую; пустой список — все запросы идут в default
+DATABASE_ROUTERS = ['Task1.replicas.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in os.environ.get('DATABASE_REPLICAS', '').split(',') if alias]
+# Модели, чтения которых в безопасных запросах идут на реплику (app_label.model_name)
+REPLICA_MODELS = ('Task1.debtor', 'Task1.debtsummary')
+# Максимальное отставание реплики в секундах и время, на которое клиент после записи читает из default
+REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', 30))
+
+# Статистика SQL-запросов (Task1.middleware.QueryInstrumentationMiddleware)
+SQL_INSTRUMENTATION_SLOWEST = 3
+SQL_INSTRUMENTATION_REPEAT_THRESHOLD = 5
+SQL_INSTRUMENTATION_SERVER_TIMING = True
+
+# Размер блока значений index_key, резервируемого процессом заранее (1 — без резервирования)
+INDEX_KEY_BLOCK_SIZE = int(os.environ.get('INDEX_KEY_BLOCK_SIZE', 1))
+
 AUTH_USER_MODEL = 'Task1.NewUsers'
 
+# Пользователь берется из кэша на каждом запросе (см. Task1.auth_backends)
+AUTHENTICATION_BACKENDS = ['Task1.auth_backends.CachedModelBackend']
+
+# Сессии читаются из кэша с записью в базу ('cached_db') или хранятся в подписанной cookie
+# ('signed_cookies', без обращений к серверу, но с ограничением размера и без серверного отзыва)
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('SESSION_BACKEND', 'cached_db')
+
+# Ограничение частоты запросов (см. Task1.throttling). Счетчики хранятся в кэше THROTTLE_CACHE, который
+# должен быть общим для всех процессов (Redis, Memcached); лимиты — '<количество>/<s|m|h|d>'
+THROTTLE_CACHE = 'default'
+THROTTLE_TRUST_X_FORWARDED_FOR = os.environ.get('THROTTLE_TRUST_X_FORWARDED_FOR') == '1'
+THROTTLE_RATES = {
+    'login_ip': '20/m',
+    'login_username': '5/m',
+    'register_ip': '5/h',
+    'add_debtor_ip': '60/m',
+    'add_debtor_user': '20/m',
+    'api_ip': '60/m',
+    'api_user': '300/m',
+    'api_token': '300/m',
+    # Неверные токены API с одного IP-адреса; после исчерпания токен не проверяется до конца окна
+    'api_token_failure_ip': '10/m',
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -128,40 +201,89 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    # Документы заявок хранятся один раз на уникальное содержимое (см. Task1.storage)
+    'documents': {
+        'BACKEND': 'Task1.storage.DeduplicatingStorage',
+    },
+}
+
+# Кто отдает байты документов после проверки прав (см. Task1.downloads): None — сам Django,
+# 'x-accel-redirect' — nginx (internal location с префиксом ниже, alias на MEDIA_ROOT),
+# 'x-sendfile' — Apache mod_xsendfile или lighttpd
+DOCUMENT_SENDFILE_BACKEND = os.environ.get('DOCUMENT_SENDFILE_BACKEND') or None
+DOCUMENT_ACCEL_REDIRECT_PREFIX = os.environ.get('DOCUMENT_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Логи пишутся в отдельном потоке (debitor_tracker.log_pipeline): поток запроса только ставит
+# запись в очередь. Файл содержит по одной JSON-записи в строке и ротируется по размеру.
+LOG_FILE = os.environ.get('LOG_FILE', 'debug.log')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# Доля сохраняемых записей уровней ниже WARNING по префиксам имен логгеров
+LOG_SAMPLING_RATES = {
+    'Task1.sql': float(os.environ.get('LOG_SQL_SAMPLE_RATE', 0.1)),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
+        'json': {
+            '()': 'debitor_tracker.log_pipeline.JsonFormatter',
         },
         'simple': {
             'format': '{levelname} {message}',
             'style': '{',
         },
     },
-    'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': 'debug.log',
-            'formatter': 'verbose',
+    'filters': {
+        'sampling': {
+            '()': 'debitor_tracker.log_pipeline.SamplingFilter',
+            'rates': LOG_SAMPLING_RATES,
         },
+    },
+    'handlers': {
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
+        'file': {
+            'level': 'DEBUG',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': LOG_FILE,
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'formatter': 'json',
+        },
+        # Обработчики выше вызываются только из потока слушателя очереди
+        'queue': {
+            '()': 'debitor_tracker.log_pipeline.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'filters': ['sampling'],
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'Task1': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
         },
-        'my_app': {  # Логирование только для вашего приложения
-            'handlers': ['file'],
+        'Task1.sql': {  # Статистика SQL-запросов по каждому HTTP-запросу
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },